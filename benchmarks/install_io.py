@@ -0,0 +1,271 @@
+"""
+End-to-end timings of the download and install paths against a local mock server
+
+Runs GameBananaHandler.handle_url (cold, then with the artifact store warm),
+install_mod extraction, batched mod info lookups and the BepInEx / MonoMod /
+HKAPI install, all against benchmarks/mock_server.py. Results are medians
+over --repeat runs and can be saved and compared, failing (exit code 1)
+when anything got slower than the baseline by more than --tolerance.
+
+    python benchmarks/install_io.py --size 8 --files 100 --output before.json
+    python benchmarks/install_io.py --size 8 --files 100 --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "hmm"))
+
+import tracing  # noqa: E402
+from oneclick.oneclick import GameBananaHandler  # noqa: E402
+from oneclick.artifacts import ArtifactStore  # noqa: E402
+from oneclick.httpcache import HttpCache  # noqa: E402
+from oneclick.installer import install_modding_stack  # noqa: E402
+from mock_server import MockServer  # noqa: E402
+
+
+# Lower is better for these, a result regresses when it grows past the tolerance
+COMPARED = ("seconds",)
+
+
+class Workspace:
+    """Fresh install folder, artifact store and API cache for one run"""
+
+    def __init__(self, root, name):
+        self.path = os.path.join(root, name)
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.mods = os.path.join(self.path, "mods")
+        self.game = os.path.join(self.path, "game")
+        for path in (self.mods, self.game):
+            os.makedirs(path)
+        self.store = ArtifactStore(os.path.join(self.path, "artifacts"))
+        self.cache = HttpCache(os.path.join(self.path, "http"))
+
+    def handler(self, session):
+        return GameBananaHandler(install_path=self.mods, store=self.store, session=session, cache=self.cache)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+# --- Benchmarks ---
+# Each takes (args, mock, root) and returns {result name: [{"seconds": ..., "bytes": ..., ...} per run]}
+
+
+def bench_handle_url(args, mock, root):
+    """Every mod through handle_url with empty caches, then again with the artifact store warm"""
+    cold, warm = [], []
+    for run in range(args.repeat):
+        space = Workspace(root, f"handle_url_{run}")
+        handler = space.handler(mock.session())
+        for results in (cold, warm):
+            latencies = []
+            requests_before = mock.request_count()
+            start = time.perf_counter()
+            for mod_id in args.mod_ids:
+                begin = time.perf_counter()
+                success, result = handler.handle_url(f"hmm://install/{mod_id}")
+                if not success:
+                    raise RuntimeError(f"handle_url failed for {mod_id}: {result}")
+                latencies.append(time.perf_counter() - begin)
+            results.append({
+                "seconds": time.perf_counter() - start,
+                "bytes": sum(args.mod_sizes.values()),
+                "latency_ms": statistics.median(latencies) * 1000,
+                "requests": mock.request_count() - requests_before,
+            })
+        space.clear()
+    return {"handle_url.cold": cold, "handle_url.warm": warm}
+
+
+def bench_install_mod(args, mock, root):
+    """Extraction only: install_mod on an archive that is already downloaded"""
+    space = Workspace(root, "install_mod")
+    handler = space.handler(mock.session())
+    mod_id = args.mod_ids[0]
+    success, mod_file = handler.download_mod(mod_id)
+    if not success:
+        raise RuntimeError(f"download_mod failed: {mod_file}")
+
+    runs = []
+    for _ in range(args.repeat):
+        shutil.rmtree(os.path.join(space.mods, f"mod_{mod_file.replace('.zip', '')}"), ignore_errors=True)
+        start = time.perf_counter()
+        success, result = handler.install_mod(mod_file)
+        if not success:
+            raise RuntimeError(f"install_mod failed: {result}")
+        runs.append({"seconds": time.perf_counter() - start, "bytes": args.mod_sizes[mod_id], "files": args.files})
+    space.clear()
+    return {"install_mod": runs}
+
+
+def bench_mod_info(args, mock, root):
+    """get_mods_info for every mod at once, cold API cache"""
+    runs = []
+    for run in range(args.repeat):
+        space = Workspace(root, f"mod_info_{run}")
+        handler = space.handler(mock.session())
+        start = time.perf_counter()
+        results = list(handler.get_mods_info(args.mod_ids))
+        elapsed = time.perf_counter() - start
+        failed = [mod_id for mod_id, success, _ in results if not success]
+        if failed:
+            raise RuntimeError(f"get_mods_info failed for {failed}")
+        runs.append({"seconds": elapsed, "mods": len(results)})
+        space.clear()
+    return {"mod_info": runs}
+
+
+def bench_bepinex(args, mock, root):
+    """The modding stack into an empty game folder, then a repair where nothing changed"""
+    fresh, repair = [], []
+    for run in range(args.repeat):
+        space = Workspace(root, f"bepinex_{run}")
+        session = mock.session()
+        for results in (fresh, repair):
+            requests_before = mock.request_count()
+            start = time.perf_counter()
+            result = install_modding_stack(space.game, components=args.components, store=space.store, session=session)
+            results.append({
+                "seconds": time.perf_counter() - start,
+                "bytes": args.stack_bytes,
+                "written": len(result["written"]),
+                "unchanged": len(result["unchanged"]),
+                "requests": mock.request_count() - requests_before,
+            })
+        space.clear()
+    return {"bepinex.fresh": fresh, "bepinex.repair": repair}
+
+
+BENCHMARKS = {
+    "handle_url": bench_handle_url,
+    "install_mod": bench_install_mod,
+    "mod_info": bench_mod_info,
+    "bepinex": bench_bepinex,
+}
+
+
+# --- Results ---
+
+
+def summarize(name, runs):
+    """Median of every field over the runs, plus min / max seconds and throughput"""
+    result = {"benchmark": name, "runs": len(runs)}
+    for key in runs[0]:
+        values = [run[key] for run in runs]
+        # Counts stay whole numbers, timings are averaged around the middle
+        median = statistics.median_low if all(isinstance(v, int) for v in values) else statistics.median
+        result[key] = median(values)
+    result["min_seconds"] = min(run["seconds"] for run in runs)
+    result["max_seconds"] = max(run["seconds"] for run in runs)
+    if "bytes" in result and result["seconds"]:
+        result["mb_per_s"] = result["bytes"] / result["seconds"] / (1024 * 1024)
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in result.items()}
+
+
+def environment(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {
+            "mods": args.mods, "size_mb": args.size, "files": args.files, "stack_size_mb": args.stack_size,
+            "rate_mb_s": args.rate, "latency_ms": args.latency, "repeat": args.repeat,
+        },
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """
+    Results that got slower than the baseline by more than tolerance
+
+    Returns:
+        list: (benchmark, key, baseline value, new value) tuples
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result["benchmark"]: result for result in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        old = baseline.get(result["benchmark"])
+        if not old:
+            continue
+        for key in COMPARED:
+            if key in old and key in result and result[key] > old[key] * (1 + tolerance):
+                regressions.append((result["benchmark"], key, old[key], result[key]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--mods", type=int, default=4, help="Mods installed per handle_url run")
+    parser.add_argument("--size", type=float, default=4, help="Mod archive size in MB")
+    parser.add_argument("--files", type=int, default=50, help="Files per archive")
+    parser.add_argument("--stack-size", type=float, default=2, help="Size of each modding stack archive in MB")
+    parser.add_argument("--rate", type=float, default=0, help="Per-connection cap in MB/s, 0 for none")
+    parser.add_argument("--latency", type=float, default=0, help="Server delay before every response in ms")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, the median is reported")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline, 0.25 = 25%%")
+    parser.add_argument("--trace", metavar="PATH", help="Record a Chrome trace of the whole run")
+    args = parser.parse_args()
+
+    if args.trace:
+        tracing.get_tracer().enable(trace_path=args.trace)
+
+    mock = MockServer(rate=args.rate * 1024 * 1024 or None, latency=args.latency / 1000)
+    args.mod_ids = [str(100000 + i) for i in range(args.mods)]
+    args.mod_sizes = {mod_id: mock.add_mod(mod_id, int(args.size * 1024 * 1024), args.files)
+                      for mod_id in args.mod_ids}
+    args.components = [(*component, None) for component in
+                       mock.add_modding_stack(int(args.stack_size * 1024 * 1024), args.files)]
+    args.stack_bytes = sum(len(data) for path, data in mock.files.items() if "/releases/" in path)
+
+    results = []
+    with mock, tempfile.TemporaryDirectory(prefix="hmm-bench-") as root:
+        for name in args.only or BENCHMARKS:
+            for benchmark, runs in BENCHMARKS[name](args, mock, root).items():
+                result = summarize(benchmark, runs)
+                results.append(result)
+                if not args.json:
+                    throughput = f"{result['mb_per_s']:8.2f} MB/s" if "mb_per_s" in result else " " * 13
+                    print(f"{benchmark:<16} {result['seconds'] * 1000:9.1f} ms  {throughput}"
+                          f"  (min {result['min_seconds'] * 1000:.1f}, max {result['max_seconds'] * 1000:.1f})")
+
+    report = {"environment": environment(args), "results": results}
+    if args.json:
+        print(json.dumps(report, indent=4))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for benchmark, key, old, new in regressions:
+            print(f"REGRESSION {benchmark} {key}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        if not args.json:
+            print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Local stand-in for the GameBanana API, its file server and GitHub releases
+
+Serves generated zip archives of any size and file count, with optional
+per-connection throttling and a delay before every response, so the
+download and install paths can be measured without the internet.
+session() returns a requests session that sends gamebanana.com,
+api.gamebanana.com and github.com requests here.
+
+    python benchmarks/mock_server.py --mods 3 --size 8 --files 50
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import zipfile
+import argparse
+import threading
+import http.server
+import urllib.parse
+from collections import Counter
+
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "hmm"))
+
+from oneclick.httpcache import create_session  # noqa: E402
+from oneclick.installer import modding_stack  # noqa: E402
+
+
+# Hosts the app talks to, all answered by the mock server
+MOCKED_HOSTS = ("https://gamebanana.com", "https://api.gamebanana.com", "https://github.com")
+
+DOWNLOAD_PAGE = re.compile(r"^/apiv11/Mod/(\d+)/DownloadPage$")
+SLICE_SIZE = 65536
+
+
+def make_zip(size, files, seed=0, level=1):
+    """
+    A deflated zip of `files` members adding up to about `size` bytes
+
+    Member contents are random (like compiled DLLs they barely compress)
+    and depend only on the seed, so runs are comparable.
+    """
+    rng = random.Random(seed)
+    files = max(1, files)
+    per_file = max(1, size // files)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as zf:
+        for i in range(files):
+            zf.writestr(f"plugins/{seed}/file_{i:04d}.dll", rng.randbytes(per_file))
+    return buffer.getvalue()
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Sends every request to `target`, keeping the path and query"""
+
+    def __init__(self, target, **kwargs):
+        self.target = target.rstrip("/")
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urllib.parse.urlsplit(request.url)
+        request.url = self.target + parts.path + (f"?{parts.query}" if parts.query else "")
+        return super().send(request, **kwargs)
+
+
+class MockServer:
+    """
+    Threaded HTTP server answering like GameBanana and GitHub
+
+    Args:
+        rate: Optional cap per connection in bytes per second for files
+        latency: Seconds to wait before answering any request
+    """
+
+    def __init__(self, rate=None, latency=0.0):
+        self.rate = rate
+        self.latency = latency
+        self.files = {}
+        self.drops = {}
+        self.ranges = []
+        self.pages = {}
+        self.items = {}
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+        self.base_url = None
+
+    # --- Content ---
+
+    def add_file(self, path, data, drop_after=None, drops=1):
+        """
+        Serve raw bytes at path, with range support
+
+        With drop_after the first `drops` responses for the file are cut off
+        after that many bytes of body, like a flaky connection.
+        """
+        self.files[path] = data
+        if drop_after is not None:
+            self.drops[path] = [drop_after, drops]
+
+    def add_mod(self, mod_id, size, files, name=None):
+        """
+        A GameBanana mod: its DownloadPage, Core/Item/Data entry and archive
+
+        Returns:
+            int: Size of the archive in bytes
+        """
+        mod_id = str(mod_id)
+        data = make_zip(size, files, seed=int(mod_id))
+        path = f"/dl/mod_{mod_id}.zip"
+        self.files[path] = data
+        self.pages[mod_id] = {
+            "_bIsTrashed": False,
+            "_aFiles": [{
+                "_idRow": int(mod_id),
+                "_sFile": f"mod_{mod_id}.zip",
+                "_nFilesize": len(data),
+                "_sDownloadUrl": path,  # made absolute when served
+                "_sMd5Checksum": hashlib.md5(data).hexdigest(),
+            }],
+        }
+        self.items[mod_id] = [
+            name or f"Mock mod {mod_id}", "mock-author", [], 0, 0, 0,
+            "Generated by benchmarks/mock_server.py", "Hollow Knight", "Mods", 0,
+            [{"_sFile": f"mod_{mod_id}.zip", "_nFilesize": len(data)}],
+        ]
+        return len(data)
+
+    def add_modding_stack(self, size, files, osbep="win", beparch="x64"):
+        """
+        Archives for every GitHub release URL BepInExMenu downloads
+
+        Returns:
+            list: modding_stack() entries, URLs still pointing at github.com
+        """
+        components = modding_stack(osbep, beparch)
+        for seed, (name, url, _, _) in enumerate(components, start=1):
+            self.files[urllib.parse.urlsplit(url).path] = make_zip(size, files, seed=seed * 1000)
+        return components
+
+    # --- Server ---
+
+    def start(self):
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def session(self):
+        """A create_session() session whose GameBanana / GitHub requests land here"""
+        session = create_session()
+        for host in MOCKED_HOSTS:
+            session.mount(host, RedirectAdapter(self.base_url))
+        return session
+
+    def request_count(self, route=None):
+        with self._lock:
+            return self.requests[route] if route else sum(self.requests.values())
+
+    def _count(self, route):
+        with self._lock:
+            self.requests[route] += 1
+
+    def _make_handler(self):
+        mock = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if mock.latency:
+                    time.sleep(mock.latency)
+                parts = urllib.parse.urlsplit(self.path)
+                page = DOWNLOAD_PAGE.match(parts.path)
+                if page:
+                    mock._count("download_page")
+                    body = mock.pages.get(page.group(1))
+                    if body is not None:
+                        body = json.loads(json.dumps(body))
+                        for entry in body["_aFiles"]:
+                            entry["_sDownloadUrl"] = mock.base_url + entry["_sDownloadUrl"]
+                    self._send_json(body)
+                elif parts.path == "/Core/Item/Data":
+                    mock._count("item_data")
+                    query = urllib.parse.parse_qs(parts.query)
+                    self._send_json(mock.items.get(query.get("itemid", [""])[0]))
+                elif parts.path in mock.files:
+                    mock._count("file")
+                    with mock._lock:
+                        mock.ranges.append((parts.path, self.headers.get("Range")))
+                    self._send_file(parts.path, mock.files[parts.path])
+                else:
+                    mock._count("not_found")
+                    self._send_json({"error": "not found"}, status=404)
+
+            def _send_json(self, body, status=200):
+                if body is None:
+                    body, status = {"error": "not found"}, 404
+                data = json.dumps(body).encode()
+                etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_file(self, path, data):
+                start, end = 0, len(data) - 1
+                range_header = self.headers.get("Range")
+                if range_header:
+                    first, _, last = range_header.split("=", 1)[1].partition("-")
+                    start = int(first)
+                    end = min(int(last), end) if last else end
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/zip")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", '"' + hashlib.sha1(data[:4096]).hexdigest() + '"')
+                self.end_headers()
+
+                last = end
+                with mock._lock:
+                    drop = mock.drops.get(path)
+                    # Only responses it really shortens count, and never the one-byte range probe
+                    if drop and drop[1] > 0 and start + drop[0] <= end and end > start:
+                        drop[1] -= 1
+                        last = min(end, start + drop[0] - 1)
+
+                # Send in 64 KB slices, sleeping to hold this connection at `rate`
+                try:
+                    for pos in range(start, last + 1, SLICE_SIZE):
+                        piece = data[pos:min(pos + SLICE_SIZE, last + 1)]
+                        self.wfile.write(piece)
+                        if mock.rate:
+                            time.sleep(len(piece) / mock.rate)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up, e.g. a cancelled download
+                if last < end:
+                    # Cut off mid-body: the client sees fewer bytes than Content-Length
+                    self.wfile.flush()
+                    self.close_connection = True
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mods", type=int, default=3, help="Mods to serve, IDs 1 to N")
+    parser.add_argument("--size", type=float, default=4, help="Archive size in MB")
+    parser.add_argument("--files", type=int, default=20, help="Files per archive")
+    parser.add_argument("--rate", type=float, default=0, help="Per-connection cap in MB/s, 0 for none")
+    parser.add_argument("--latency", type=float, default=0, help="Delay before every response in ms")
+    args = parser.parse_args()
+
+    mock = MockServer(rate=args.rate * 1024 * 1024 or None, latency=args.latency / 1000)
+    size = int(args.size * 1024 * 1024)
+    for mod_id in range(1, args.mods + 1):
+        mock.add_mod(mod_id, size, args.files)
+    components = mock.add_modding_stack(size, args.files)
+
+    with mock:
+        print(f"Serving on {mock.base_url}")
+        for mod_id in range(1, args.mods + 1):
+            print(f"  {mock.base_url}/apiv11/Mod/{mod_id}/DownloadPage")
+        for _, url, _, _ in components:
+            print(f"  {mock.base_url}{urllib.parse.urlsplit(url).path}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
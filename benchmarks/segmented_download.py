@@ -0,0 +1,68 @@
+"""
+Single stream vs segmented download against a local throttled server
+
+Every connection is capped at --rate bytes per second, like a CDN edge that
+throttles per connection, so the speedup from parallel ranges shows up even
+on loopback.
+
+    python benchmarks/segmented_download.py --size 32 --rate 4
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "hmm"))
+
+from oneclick.downloader import download, download_segmented  # noqa: E402
+from mock_server import MockServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=32, help="File size in MB")
+    parser.add_argument("--rate", type=float, default=4, help="Per-connection cap in MB/s")
+    parser.add_argument("--connections", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    data = os.urandom(args.size * 1024 * 1024)
+    server = MockServer(rate=args.rate * 1024 * 1024)
+    server.add_file("/pack.zip", data)
+    server.start()
+    url = f"{server.base_url}/pack.zip"
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [("single", 1)] + [(f"segmented x{n}", n) for n in args.connections]
+        for label, connections in runs:
+            dest = os.path.join(tmp, f"{connections}.zip")
+            start = time.perf_counter()
+            if connections == 1:
+                download(url, dest)
+            else:
+                download_segmented(url, dest, connections=connections, min_segment_size=1024 * 1024)
+            elapsed = time.perf_counter() - start
+            with open(dest, "rb") as f:
+                assert f.read() == data, f"{label} produced a corrupt file"
+            results.append({
+                "mode": label,
+                "connections": connections,
+                "seconds": round(elapsed, 3),
+                "mb_per_s": round(args.size / elapsed, 2),
+            })
+
+    server.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+    baseline = results[0]["seconds"]
+    for result in results:
+        print(f"{result['mode']:<15} {result['seconds']:>8.2f}s {result['mb_per_s']:>8.2f} MB/s  x{baseline / result['seconds']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
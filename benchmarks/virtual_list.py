@@ -0,0 +1,118 @@
+"""
+Render time of the mod list vs number of mods: one widget row per mod vs VirtualList
+
+Needs a display (run it on a desktop, or under xvfb-run on a server).
+
+    python benchmarks/virtual_list.py --sizes 100 1000 5000
+"""
+import os
+import sys
+import time
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "hmm"))
+
+import customtkinter  # noqa: E402
+from menus.virtuallist import VirtualList, SequenceSource  # noqa: E402
+
+
+COLUMNS = [("Name", "name", 3), ("Author", "author", 2), ("Downloads", "downloads", 1), ("Date", "date", 1)]
+
+
+def make_mods(count):
+    rng = random.Random(count)
+    return [{
+        "name": f"Mod {i:05d}",
+        "author": f"author{rng.randrange(200)}",
+        "downloads": rng.randrange(1_000_000),
+        "date": 1_500_000_000 + rng.randrange(300_000_000),
+    } for i in range(count)]
+
+
+def render(mod):
+    return mod["name"], mod["author"], str(mod["downloads"]), time.strftime("%Y-%m-%d", time.gmtime(mod["date"]))
+
+
+def bench_naive(root, mods):
+    """What the Mods tab would do without virtualization: a frame and labels per mod"""
+    start = time.perf_counter()
+    frame = customtkinter.CTkScrollableFrame(root, width=500, height=400)
+    frame.pack(fill="both", expand=True)
+    for mod in mods:
+        row = customtkinter.CTkFrame(frame, fg_color="transparent")
+        for i, text in enumerate(render(mod)):
+            customtkinter.CTkLabel(row, text=text, anchor="w").grid(row=0, column=i, sticky="ew")
+        row.pack(fill="x")
+    root.update()
+    elapsed = time.perf_counter() - start
+    frame.destroy()
+    root.update()
+    return elapsed, None
+
+
+def bench_virtual(root, mods, scroll_steps=200):
+    source = SequenceSource(mods, keys={
+        "name": lambda m: m["name"],
+        "author": lambda m: m["author"],
+        "downloads": lambda m: m["downloads"],
+        "date": lambda m: m["date"],
+    }, text=lambda m: m["name"])
+    start = time.perf_counter()
+    view = VirtualList(root, source, COLUMNS, render, width=500, height=400)
+    view.pack(fill="both", expand=True)
+    root.update()
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(scroll_steps):
+        view.scroll(3)
+        root.update_idletasks()
+    per_scroll = (time.perf_counter() - start) / scroll_steps
+
+    start = time.perf_counter()
+    view.sort_by("downloads")
+    root.update_idletasks()
+    sort_time = time.perf_counter() - start
+
+    view.destroy()
+    root.update()
+    return elapsed, {"scroll_ms": per_scroll * 1000, "sort_ms": sort_time * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000, 2000])
+    parser.add_argument("--naive-limit", type=int, default=2000,
+                        help="Skip the per-row widget version above this many mods, it takes too long")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    try:
+        root = customtkinter.CTk()
+    except Exception as e:
+        print(f"Cannot open a window ({e}), run this with a display or under xvfb-run")
+        sys.exit(1)
+    root.geometry("560x480")
+
+    results = []
+    for size in args.sizes:
+        mods = make_mods(size)
+        virtual, extra = bench_virtual(root, mods)
+        result = {"mods": size, "virtual_ms": virtual * 1000, **extra}
+        if size <= args.naive_limit:
+            result["naive_ms"] = bench_naive(root, mods)[0] * 1000
+        results.append(result)
+        if not args.json:
+            naive = f"{result['naive_ms']:8.0f} ms" if "naive_ms" in result else "   skipped"
+            print(f"{size:6d} mods: per-row widgets {naive}, virtual list {result['virtual_ms']:6.0f} ms "
+                  f"(scroll {result['scroll_ms']:.1f} ms, sort {result['sort_ms']:.1f} ms)")
+    root.destroy()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
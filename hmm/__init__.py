@@ -1 +1,9 @@
-import hmm.base as base
\ No newline at end of file
+import importlib
+
+
+def __getattr__(name):
+    # Importing hmm.oneclick (or any other subpackage) must not drag in the GUI,
+    # so hmm.base is only loaded when it is actually asked for
+    if name == "base":
+        return importlib.import_module("hmm.base")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,22 @@
+import time
+startup_begin = time.perf_counter()
+
 try:
+    # HMM_TRACE=trace.json records startup, installs and mod loading, see tracing.py
+    import tracing
+    tracing.enable_from_env()
+
     import customtkinter
-    import json
     import os
-    from tkinter import filedialog
-    from PIL import Image
-    from menus.BepInExInstall import BepInExMenu  # The class name is ModInstaller
-    from menus.SettingsMenu import Settings
+    # tkinter.filedialog, the image cache and the BepInEx / Settings windows are imported
+    # where they are first used, they are not needed to show the main window
     from CTkMenuBar import * #type:ignore
     import platform
+    tracing.record("startup.imports", startup_begin)
+
+    # Time from process start to the main window being drawn, in ms.
+    # Profile the imports with: python -X importtime base.py
+    STARTUP_BUDGET_MS = int(os.environ.get("HMM_STARTUP_BUDGET_MS", 1500))
     
     sys = (platform.system())
 
@@ -23,59 +32,18 @@ try:
         pass
 
 
-    # Settings defaults
-    defaults = {
-        "theme": "system",
-        "hollowknightpath": "",
-    }
+    # --- Step 1: Load settings ---
+    # The store fills in missing keys, keeps everything in memory and is shared
+    # with the Settings and BepInEx windows
+    with tracing.span("startup.settings"):
+        from settingsstore import get_store
+        settings_store = get_store()
 
-    settings_path = "settings.json"
+    # --- Step 2: Apply theme ---
+    customtkinter.set_appearance_mode(settings_store.get("theme"))
+    print(f"Applied theme: {settings_store.get('theme')}")
 
-    # --- Step 1: Check if file exists, otherwise create it ---
-    if not os.path.exists(settings_path):
-        with open(settings_path, "w") as j:
-            json.dump(defaults, j, indent=4)
-        print("Settings file created with defaults.")
-
-    # --- Step 2: Load settings ---
-    try:
-        with open(settings_path, "r") as jr:
-            settings = json.load(jr)
-    except json.JSONDecodeError:
-        print("Settings file corrupted. Restoring defaults.")
-        settings = defaults.copy()
-    except Exception as ex:
-        print(f"Error reading settings: {ex}")
-        settings = defaults.copy()
-
-    # --- Step 3: Compare defaults vs current and fix missing/extra values ---
-    changed = False
-    
-    # Add missing keys from defaults
-    for key, value in defaults.items():
-        if key not in settings:
-            settings[key] = value
-            changed = True
-            print(f"Added missing setting: {key} = {value}")
-    
-    # Remove keys that aren't in defaults
-    keys_to_remove = [key for key in settings if key not in defaults]
-    for key in keys_to_remove:
-        del settings[key]
-        changed = True
-        print(f"Removed unknown setting: {key}")
-
-    # If any change was made, update the file
-    if changed:
-        with open(settings_path, "w") as jw:
-            json.dump(settings, jw, indent=4)
-        print("Settings file updated.")
-
-    # --- Step 4: Apply theme ---
-    customtkinter.set_appearance_mode(settings["theme"])
-    print(f"Applied theme: {settings['theme']}")
-
-    # --- Step 5: Create app ---
+    # --- Step 3: Create app ---
     class App(customtkinter.CTk):
         def __init__(self):
             super().__init__()
@@ -86,8 +54,7 @@ try:
             if os.path.exists("./icon.ico"):
                 self.iconbitmap("./icon.ico")
             
-            self.settings = settings.copy()
-            self.last_modified = os.path.getmtime(settings_path)
+            self.settings = settings_store
             
             # Menu bar
             if sys == "Windows":
@@ -117,22 +84,29 @@ try:
             )
             self.label.pack(pady=10, padx=10)
             
-            # Load images with error handling
+            # Load images with error handling. Thumbnails are pre-scaled for this
+            # window's DPI, cached on disk and shared by the light and dark variants
+            from menus.assets import load_thumbnail
+            image_size = (200, 120)
+            scaling = customtkinter.ScalingTracker.get_window_scaling(self)
+            thumb_size = (round(image_size[0] * scaling), round(image_size[1] * scaling))
             try:
+                hollow_thumb = load_thumbnail("images/HollowKnight.png", thumb_size)
                 self.hollow_image = customtkinter.CTkImage(
-                    light_image=Image.open("images/HollowKnight.png"), 
-                    dark_image=Image.open("images/HollowKnight.png"),
-                    size=(200, 120)
+                    light_image=hollow_thumb, 
+                    dark_image=hollow_thumb,
+                    size=image_size
                 )
             except Exception as e:
                 print(f"Could not load Hollow Knight image: {e}")
                 self.hollow_image = None
             
             try:
+                silksong_thumb = load_thumbnail("images/silksong.png", thumb_size)
                 self.silksong_image = customtkinter.CTkImage(
-                    light_image=Image.open("images/silksong.png"),
-                    dark_image=Image.open("images/silksong.png"),
-                    size=(200, 120)
+                    light_image=silksong_thumb,
+                    dark_image=silksong_thumb,
+                    size=image_size
                 )
             except Exception as e:
                 print(f"Could not load Silksong image: {e}")
@@ -186,12 +160,28 @@ try:
             )
             self.theme_button.place(x=510, y=10)
             
-            # Start monitoring settings file
-            self.check_settings_update()
+            # React to settings changes, made here or by another process editing
+            # settings.json. Callbacks are handed to the Tk thread through the bus
+            from menus.progressbus import ProgressBus
+            self.bus = ProgressBus(self).start()
+            self.settings.subscribe("theme", self.on_theme_changed, dispatch=self.bus.call)
+            self.settings.watch()
+
+            # Measure time-to-first-window once Tk has drawn everything
+            self.after_idle(self.report_startup_time)
+
+        def report_startup_time(self):
+            """Print how long startup took and warn when it is over budget"""
+            elapsed = (time.perf_counter() - startup_begin) * 1000
+            tracing.record("startup", startup_begin, budget_ms=STARTUP_BUDGET_MS)
+            print(f"Startup: main window ready in {elapsed:.0f} ms (budget {STARTUP_BUDGET_MS} ms)")
+            if elapsed > STARTUP_BUDGET_MS:
+                print("⚠️ Startup is over budget, run `python -X importtime base.py` to see where the time goes")
 
         def open_settings(self):
             """Open the settings menu"""
             try:
+                from menus.SettingsMenu import Settings
                 settings_menu = Settings(self)
                 settings_menu.show_again()
             except Exception as e:
@@ -199,43 +189,57 @@ try:
 
         def find_hollow_knight_dir(self):
             """Open dialog to select Hollow Knight directory"""
+            from tkinter import filedialog
+            from steamlibrary import find_install, HOLLOW_KNIGHT_APPID
+            # Start in the Steam install if there is one, otherwise where the dialog likes
             selected_dir = filedialog.askdirectory(
                 title="Select The Hollow Knight Directory", 
-                initialdir=r"C:\Program Files (x86)\Steam\steamapps\common\Hollow Knight"
+                initialdir=find_install(HOLLOW_KNIGHT_APPID) or self.settings.get('hollowknightpath') or None
             )
             if selected_dir:
-                self.settings['hollowknightpath'] = selected_dir
-                with open(settings_path, 'w') as f:
-                    json.dump(self.settings, f, indent=4)
+                self.settings.set('hollowknightpath', selected_dir)
                 print(f"Hollow Knight path saved: {selected_dir}")
             return selected_dir
         
         def find_silksong_dir(self):
             """Open dialog to select Silksong directory"""
+            from tkinter import filedialog
+            from steamlibrary import find_install, SILKSONG_APPID
+            # Start in the Steam install if there is one, otherwise where the dialog likes
             selected_dir = filedialog.askdirectory(
                 title="Select The Hollow Knight Silksong Directory", 
-                initialdir=r"C:\Program Files (x86)\Steam\steamapps\common\Hollow Knight Silksong"
+                initialdir=find_install(SILKSONG_APPID) or self.settings.get('silksongpath') or None
             )
             if selected_dir:
-                self.settings['silksongpath'] = selected_dir
-                with open(settings_path, 'w') as f:
-                    json.dump(self.settings, f, indent=4)
+                self.settings.set('silksongpath', selected_dir)
                 print(f"Silksong path saved: {selected_dir}")
             return selected_dir
         
+        def detect_game_dir(self, key):
+            """Save the game's Steam install path if exactly one was found, return it"""
+            from steamlibrary import get_scanner
+            installs = get_scanner().find_games()[key]
+            if len(installs) != 1:
+                # None, or several libraries with a copy: let the user pick
+                return None
+            self.settings.set(key, installs[0].path)
+            print(f"Found {installs[0].name} in Steam library: {installs[0].path}")
+            return installs[0].path
+
         def work_hollow_button(self):
             """Handle Hollow Knight button click"""
             try:
-                with open('settings.json', 'r') as f:
-                    data = json.load(f)
-                    hollowpath = data.get('hollowknightpath', '')
+                # Pulls in requests and the installer, only needed once this is clicked
+                from menus.BepInExInstall import BepInExMenu
+
+                hollowpath = self.settings.get('hollowknightpath', '')
                 
                 if hollowpath and os.path.exists(hollowpath):
                     # Path exists, open mod installer with saved path
                     mod_installer = BepInExMenu(self)
                 else:
-                    # No path or invalid path, ask user to select
-                    selected_path = self.find_hollow_knight_dir()
+                    # No path or invalid path, look in the Steam libraries and ask the user if it is not there
+                    selected_path = self.detect_game_dir('hollowknightpath') or self.find_hollow_knight_dir()
                     if selected_path:
                         # After saving, open mod installer with new path
                         mod_installer = BepInExMenu(self)
@@ -245,16 +249,14 @@ try:
         def work_silksong_button(self):
             """Handle Silksong button click"""
             try:
-                with open('settings.json', 'r') as f:
-                    data = json.load(f)
-                    silksongpath = data.get('silksongpath', '')
+                silksongpath = self.settings.get('silksongpath', '')
                 
                 if silksongpath and os.path.exists(silksongpath):
                     # Path exists, open mod menu
                     print("too lazy to remove silksong functions 😭😭")
                 else:
-                    # No path or invalid path, ask user to select
-                    selected_path = self.find_silksong_dir()
+                    # No path or invalid path, look in the Steam libraries and ask the user if it is not there
+                    selected_path = self.detect_game_dir('silksongpath') or self.find_silksong_dir()
                     if selected_path:
                         # After saving, open mod menu
                         print("too lazy to remove silksong functions 😭😭")
@@ -267,50 +269,23 @@ try:
             current_index = themes.index(self.settings.get("theme", "system"))
             next_theme = themes[(current_index + 1) % len(themes)]
             
-            # Update settings
-            self.settings["theme"] = next_theme
-            
-            # Save to file
-            with open(settings_path, "w") as f:
-                json.dump(self.settings, f, indent=4)
-            
-            # Apply immediately
-            customtkinter.set_appearance_mode(next_theme)
+            # Update settings, the theme subscriber applies it
+            self.settings.set("theme", next_theme)
+        
+        def on_theme_changed(self, key, old, new):
+            """Apply a theme change, whether it came from this window or settings.json"""
+            customtkinter.set_appearance_mode(new)
             
             # Update button icon
             icons = {"system": "🌓", "light": "☀️", "dark": "🌙"}
-            self.theme_button.configure(text=icons[next_theme])
-            
-            print(f"Theme changed to: {next_theme}")
-        
-        def check_settings_update(self):
-            """Check if settings file has been modified and reload if needed"""
-            try:
-                current_modified = os.path.getmtime(settings_path)
-                
-                if current_modified != self.last_modified:
-                    self.last_modified = current_modified
-                    
-                    # Reload settings
-                    with open(settings_path, "r") as f:
-                        new_settings = json.load(f)
-                    
-                    # Check if theme changed
-                    if new_settings.get("theme") != self.settings.get("theme"):
-                        customtkinter.set_appearance_mode(new_settings["theme"])
-                        print(f"Theme updated to: {new_settings['theme']}")
-                    
-                    self.settings = new_settings
-                    
-            except Exception as e:
-                print(f"Error checking settings: {e}")
+            self.theme_button.configure(text=icons.get(new, "🌓"))
             
-            # Check again in 500ms
-            self.after(500, self.check_settings_update)
+            print(f"Theme changed to: {new}")
 
     
     if __name__ == "__main__":
-        app = App()
+        with tracing.span("startup.window"):
+            app = App()
         app.mainloop()
 
 except KeyboardInterrupt:
@@ -0,0 +1,225 @@
+"""
+HornetMM without the window, for installing mods on many machines
+
+    python hmm/cli.py install 12345 hmm://install/67890 --jobs 8
+    python hmm/cli.py install --bepinex --game-path "D:/Games/Hollow Knight" 12345 --json
+    python hmm/cli.py lock modpack.hmmlock
+    python hmm/cli.py restore modpack.hmmlock --jobs 8
+
+Every item gets a status code (0 installed, 2 invalid, 3 download failed,
+4 install failed, 5 cancelled) and the command exits with the highest one.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tracing  # noqa: E402
+from modindex import LOCAL_MODS_DIR  # noqa: E402
+from oneclick.oneclick import GameBananaHandler  # noqa: E402
+from oneclick.installer import detect_platform  # noqa: E402
+from oneclick.batch import BatchInstaller, DEFAULT_NETWORK_JOBS, DEFAULT_DISK_JOBS, INVALID, OK  # noqa: E402
+from oneclick import lockfile  # noqa: E402
+
+
+def _game_path(args):
+    """--game-path, else the saved Hollow Knight folder, else the Steam install"""
+    if args.game_path:
+        return args.game_path
+    from settingsstore import get_store
+    path = get_store().get("hollowknightpath")
+    if path and os.path.isdir(path):
+        return path
+    from steamlibrary import find_install, HOLLOW_KNIGHT_APPID
+    return find_install(HOLLOW_KNIGHT_APPID)
+
+
+def _refresh_index(game_path, mods_dir, log):
+    """Let the Mods tab see what was just installed"""
+    try:
+        from modindex import ModIndex, mod_roots
+        index = ModIndex()
+        try:
+            index.rescan(mod_roots(game_path, mods_dir))
+        finally:
+            index.close()
+    except Exception as e:
+        log(f"⚠️ Could not update the mod index: {e}")
+
+
+def _logger(args):
+    def log(text):
+        if not args.quiet:
+            print(text, file=sys.stderr, flush=True)
+    return log
+
+
+def install(args):
+    log = _logger(args)
+
+    if not args.items and not args.bepinex:
+        log("✗ Nothing to install, give mod IDs / hmm:// URLs or --bepinex")
+        return INVALID
+
+    game_path = None
+    osbep = beparch = None
+    if args.bepinex:
+        game_path = _game_path(args)
+        if not game_path or not os.path.isdir(game_path):
+            log(f"✗ Hollow Knight directory not found: {game_path}, pass --game-path")
+            return INVALID
+        osbep, beparch = detect_platform()
+        if osbep == "unknown" or beparch != "x64":
+            log(f"✗ No modding stack build for this system ({osbep} {beparch})")
+            return INVALID
+
+    return _run_batch(args, log, args.items, game_path=game_path, osbep=osbep, beparch=beparch)
+
+
+def _run_batch(args, log, items, **options):
+    """Run a BatchInstaller over items and report like install does, returns the exit code"""
+    game_path = options.get('game_path')
+    os.makedirs(args.mods_dir, exist_ok=True)
+    handler = GameBananaHandler(install_path=args.mods_dir)
+    installer = BatchInstaller(handler, network_jobs=args.jobs, disk_jobs=args.disk_jobs,
+                               extract=not args.download_only, log=log)
+
+    start = time.perf_counter()
+    results = installer.run(items, **options)
+    elapsed = time.perf_counter() - start
+
+    if any(result['code'] == OK for result in results):
+        _refresh_index(game_path or args.game_path, args.mods_dir, log)
+
+    exit_code = max((result['code'] for result in results), default=OK)
+    summary = {
+        'exit_code': exit_code,
+        'installed': sum(result['code'] == OK for result in results),
+        'failed': sum(result['code'] != OK for result in results),
+        'seconds': round(elapsed, 3),
+        'network_jobs': installer.network_jobs,
+        'disk_jobs': installer.disk_jobs,
+        'items': results,
+    }
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4)
+    if args.json:
+        print(json.dumps(summary, indent=4))
+    else:
+        for result in results:
+            mark = "✓" if result['code'] == OK else "✗"
+            detail = result.get('install_path') or result['error'] or ""
+            print(f"{mark} {result['item']:<40} {result['status']:<16} {detail}")
+        print(f"{summary['installed']} installed, {summary['failed']} failed in {elapsed:.1f}s")
+    return exit_code
+
+
+def lock(args):
+    """Write the installed mods (and modding stack) to a lockfile"""
+    log = _logger(args)
+    game_path = None
+    if not args.no_stack:
+        game_path = _game_path(args)
+        if not game_path or not os.path.isdir(game_path):
+            log("⚠️ Hollow Knight directory not found, locking mods only")
+            game_path = None
+
+    handler = GameBananaHandler(install_path=args.mods_dir)
+    try:
+        pack = lockfile.create_lock(handler, args.items or None, game_path=game_path, log=log)
+    except lockfile.LockfileError as e:
+        log(f"✗ {e}")
+        return INVALID
+    if not pack['mods'] and not pack['stack']:
+        log(f"✗ Nothing to lock, no GameBanana mods in {args.mods_dir} and no modding stack")
+        return INVALID
+
+    size = lockfile.write_lockfile(args.lockfile, pack)
+    stack = ", ".join(f"{c['name']} {c['version']}" for c in pack['stack']['components']) if pack['stack'] else "no modding stack"
+    print(f"✓ Locked {len(pack['mods'])} mods and {stack} to {args.lockfile} ({size} bytes)")
+    return OK
+
+
+def restore(args):
+    """Install exactly what a lockfile lists"""
+    log = _logger(args)
+    try:
+        pack = lockfile.read_lockfile(args.lockfile)
+    except lockfile.LockfileError as e:
+        log(f"✗ {e}")
+        return INVALID
+
+    game_path = None
+    stack = None if args.no_stack else lockfile.stack_components(pack)
+    if stack:
+        game_path = _game_path(args)
+        if not game_path or not os.path.isdir(game_path):
+            log(f"✗ Hollow Knight directory not found: {game_path}, pass --game-path or --no-stack")
+            return INVALID
+        locked = (pack['stack']['os'], pack['stack']['arch'])
+        if locked != detect_platform():
+            log(f"✗ The modding stack was locked on {' '.join(locked)}, pass --no-stack to restore only the mods")
+            return INVALID
+
+    pins = lockfile.pins(pack)
+    return _run_batch(args, log, list(pins), game_path=game_path, pins=pins, stack=stack)
+
+
+def _add_batch_options(parser):
+    parser.add_argument("--jobs", "-j", type=int, default=DEFAULT_NETWORK_JOBS,
+                        help="Concurrent downloads (default %(default)s)")
+    parser.add_argument("--disk-jobs", type=int, default=DEFAULT_DISK_JOBS,
+                        help="Concurrent extractions (default %(default)s)")
+    parser.add_argument("--game-path", help="Hollow Knight folder, defaults to the saved or Steam one")
+    parser.add_argument("--mods-dir", default=LOCAL_MODS_DIR,
+                        help="Where mods are downloaded and extracted (default %(default)s)")
+    parser.add_argument("--download-only", action="store_true", help="Download mods without extracting")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON on stdout")
+    parser.add_argument("--summary", metavar="PATH", help="Also write the JSON summary to this file")
+    parser.add_argument("--quiet", "-q", action="store_true", help="No progress lines on stderr")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="hmm", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    install_parser = commands.add_parser("install", help="Download and install mods (and the modding stack)")
+    install_parser.add_argument("items", nargs="*", metavar="MOD",
+                                help="GameBanana mod ID, hmm://install/<id> URL or gamebanana.com/mods/<id> page")
+    install_parser.add_argument("--bepinex", action="store_true",
+                                help="Also install BepInEx, MonoMod and the modding API into the game folder")
+    _add_batch_options(install_parser)
+    install_parser.set_defaults(run=install)
+
+    lock_parser = commands.add_parser("lock", help="Pin the installed mods and modding stack to a lockfile")
+    lock_parser.add_argument("lockfile", help=f"File to write, e.g. modpack{lockfile.LOCKFILE_EXTENSION}")
+    lock_parser.add_argument("items", nargs="*", metavar="MOD_ID",
+                             help="GameBanana mod IDs to lock, defaults to every one in --mods-dir")
+    lock_parser.add_argument("--game-path", help="Hollow Knight folder, defaults to the saved or Steam one")
+    lock_parser.add_argument("--mods-dir", default=LOCAL_MODS_DIR,
+                             help="Where the mods are installed (default %(default)s)")
+    lock_parser.add_argument("--no-stack", action="store_true", help="Lock the mods only")
+    lock_parser.add_argument("--quiet", "-q", action="store_true", help="No warnings on stderr")
+    lock_parser.set_defaults(run=lock)
+
+    restore_parser = commands.add_parser("restore", help="Install exactly what a lockfile lists, verifying every hash")
+    restore_parser.add_argument("lockfile", help="Lockfile written by the lock command")
+    restore_parser.add_argument("--no-stack", action="store_true", help="Restore the mods only")
+    _add_batch_options(restore_parser)
+    restore_parser.set_defaults(run=restore)
+    return parser
+
+
+def main(argv=None):
+    tracing.enable_from_env()
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,63 +1,315 @@
 from lupa import LuaRuntime
 from pathlib import Path
 import sys
+import os
+import json
+import hashlib
+import tempfile
+import time
+import threading
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from lupa import LuaError, LuaMemoryError
+from platformdirs import user_cache_dir
+try:
+    from .manifestparser import parse_manifest
+except ImportError:
+    from manifestparser import parse_manifest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from tracing import span
+
+
+MANIFEST_CACHE_PATH = os.path.join(user_cache_dir("HornetMM"), "lua_manifests.json")
+# Bump when the loader starts collecting different data, so old cache entries are ignored
+MANIFEST_CACHE_VERSION = 5
+
+# Limits for one script (its main chunk plus hmm.info() and hmm.extfeatures()),
+# 0 disables either
+DEFAULT_INSTRUCTION_BUDGET = 10_000_000
+DEFAULT_MEMORY_LIMIT = 16 * 1024 * 1024
+# The budget is checked every this many VM instructions
+INSTRUCTION_STEP = 1000
+
+
+# Runs one mod's source in a fresh environment table. Only the safe parts of
+# the standard library are visible, library tables are copied so a mod
+# cannot change them for the next one, and require("hmm") returns this mod's
+# own hmm table from its own package.preload.
+#
+# A count hook on the script's coroutine charges it INSTRUCTION_STEP instructions at a time.
+# Once the budget is spent the hook fires on every instruction, so a script
+# that catches the error with pcall is stopped again right away.
+#
+# The hook never fires inside C functions, so library functions whose running
+# time the script controls are charged up front instead: string.rep and
+# table.move what they loop over, pattern matching its worst case
+# (subject length to the power of the backtracking quantifiers, plus one for
+# trying every start position). string methods ("x"):find() go through the
+# same guarded table while the script runs.
+#
+# Returns: ok, hmm table or error kind, error message, instructions used.
+# stats.used follows the count, for when Lua itself fails (LuaMemoryError)
+SANDBOX_LUA = r'''
+local SAFE_GLOBALS = {
+    "assert", "error", "ipairs", "next", "pairs", "pcall", "select",
+    "tonumber", "tostring", "type", "unpack", "xpcall", "rawequal", "rawget", "rawlen", "rawset",
+}
+local SAFE_LIBRARIES = {"string", "table", "math", "utf8"}
+local SAFE_OS = {"time", "clock", "date", "difftime"}
+local MAX_COST = 2 ^ 53
+
+-- The real functions, the guarded copies call these
+local find, match, gmatch, gsub, rep, sub = string.find, string.match, string.gmatch, string.gsub, string.rep, string.sub
+local move = table.move
+local string_meta = getmetatable("")
+
+local function pattern_cost(s, pattern, plain)
+    local n = #tostring(s) + 1
+    pattern = tostring(pattern)
+    if plain or not find(pattern, "[%^%$%*%+%-%?%.%(%)%[%]%%]") then
+        return n
+    end
+    local quantifiers, i = 0, 1
+    while i <= #pattern do
+        local c = sub(pattern, i, i)
+        if c == "%" then
+            i = i + 1
+        elseif c == "[" then
+            i = i + 1
+            if sub(pattern, i, i) == "^" then i = i + 1 end
+            repeat
+                if sub(pattern, i, i) == "%" then i = i + 1 end
+                i = i + 1
+            until i > #pattern or sub(pattern, i, i) == "]"
+        elseif c == "*" or c == "+" or c == "-" or c == "?" then
+            quantifiers = quantifiers + 1
+        end
+        i = i + 1
+    end
+    return math.min(n ^ (quantifiers + 1), MAX_COST)
+end
+
+return function(api, code, chunkname, log, budget, step, stats)
+    local used, exceeded, script = 0, false, nil
+    local charge
+    local function stop()
+        if not exceeded then
+            exceeded = true
+            debug.sethook(script, charge, "", 1)
+        end
+        error("instruction budget exceeded", 0)
+    end
+    -- The hook charges for instructions already run
+    charge = function()
+        -- Once over budget the hook fires on every instruction
+        used = math.min(used + (exceeded and 1 or step), MAX_COST)
+        stats.used = used
+        if budget > 0 and used > budget then stop() end
+    end
+    -- C functions are charged before they run, and not at all if they cannot afford it
+    local function spend(cost)
+        if budget > 0 and used + cost > budget then stop() end
+        used = math.min(used + cost, MAX_COST)
+        stats.used = used
+    end
+
+    local env = {}
+    for _, name in ipairs(SAFE_GLOBALS) do env[name] = _G[name] end
+    for _, name in ipairs(SAFE_LIBRARIES) do
+        if _G[name] then
+            local copy = {}
+            for k, v in pairs(_G[name]) do copy[k] = v end
+            env[name] = copy
+        end
+    end
+    env.string.find = function(s, pattern, init, plain)
+        spend(pattern_cost(s, pattern, plain))
+        return find(s, pattern, init, plain)
+    end
+    env.string.match = function(s, pattern, init)
+        spend(pattern_cost(s, pattern))
+        return match(s, pattern, init)
+    end
+    env.string.gmatch = function(s, pattern, init)
+        spend(pattern_cost(s, pattern))
+        return gmatch(s, pattern, init)
+    end
+    env.string.gsub = function(s, pattern, repl, n)
+        spend(pattern_cost(s, pattern))
+        return gsub(s, pattern, repl, n)
+    end
+    env.string.rep = function(s, n, sep)
+        spend(math.max(0, (#tostring(s) + #tostring(sep or "") + 1) * (tonumber(n) or 0)))
+        return rep(s, n, sep)
+    end
+    env.table.move = function(a1, f, e, t, a2)
+        spend(math.max(0, (tonumber(e) or 0) - (tonumber(f) or 0) + 1))
+        return move(a1, f, e, t, a2)
+    end
+    env.os = {}
+    for _, name in ipairs(SAFE_OS) do env.os[name] = os[name] end
+    env.print = log
+    env._G = env
+
+    local hmm = {}
+    for k, v in pairs(api) do hmm[k] = v end
+    env.hmm = hmm
+
+    local loaded = {}
+    env.package = {preload = {hmm = function() return hmm end}, loaded = loaded}
+    env.require = function(name)
+        if loaded[name] == nil then
+            local loader = env.package.preload[name]
+            if not loader then error("module '" .. tostring(name) .. "' not found", 2) end
+            loaded[name] = loader(name)
+        end
+        return loaded[name]
+    end
+
+    local chunk, err = load(code, chunkname, "t", env)
+    if not chunk then return false, "syntax", err, 0 end
+
+    -- The script runs in its own coroutine so the hook never fires in this function
+    script = coroutine.create(function()
+        chunk()
+        if hmm.info then
+            log("\nCalling hmm.info()...")
+            hmm.info()
+        end
+        if hmm.extfeatures then
+            log("\nCalling hmm.extfeatures()...")
+            hmm.extfeatures()
+        end
+    end)
+
+    debug.sethook(script, charge, "", step)
+    string_meta.__index = env.string
+    local ok, result = coroutine.resume(script)
+    string_meta.__index = string
+
+    if exceeded then
+        return false, "budget", "instruction budget of " .. budget .. " exceeded", used
+    elseif not ok and result == "not enough memory" then
+        return false, "memory", result, used
+    elseif not ok then
+        return false, "runtime", tostring(result), used
+    end
+    return true, hmm, nil, used
+end
+'''
+
+
+def _deny_attribute(obj, name, is_setting):
+    """
+    attribute_filter for every runtime: Lua gets no Python attributes at all
+
+    Scripts are handed Python callables (the hmm.* functions, print), and
+    without this a script could walk from one of them to anything, e.g.
+    hmm.setname.__self__.__class__.__init__.__globals__["os"]. Calling
+    them keeps working, it does not go through attributes.
+    """
+    raise AttributeError(f"Lua scripts cannot access Python attributes ({name})")
+
+
+class LuaRuntimePool:
+    """
+    Reusable LuaRuntimes, so loading a mod does not pay for starting Lua
+
+    Mods never share state through a pooled runtime: each one runs in its
+    own sandbox environment (see SANDBOX_LUA) that is dropped afterwards.
+    A runtime is only used by one thread at a time.
+    """
+
+    def __init__(self, size=4):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def _create(self):
+        # max_memory=0 turns on lupa's allocation tracking, scripts get their limit via set_max_memory().
+        # No python.eval / python.builtins and no attribute access on Python objects, see _deny_attribute
+        lua = LuaRuntime(unpack_returned_tuples=True, max_memory=0, register_eval=False,
+                         register_builtins=False, attribute_filter=_deny_attribute)
+        return lua, lua.execute(SANDBOX_LUA)
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._create()
+
+    def release(self, runtime):
+        # Drop the memory limit so it is only ever set for the next script
+        runtime[0].set_max_memory(0)
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(runtime)
+
+
+_runtime_pool = LuaRuntimePool()
 
 
 class LuaModLoader:
-    def __init__(self):
-        self.lua = LuaRuntime(unpack_returned_tuples=True)
+    def __init__(self, verbose=True, pool=None,
+                 instruction_budget=DEFAULT_INSTRUCTION_BUDGET, memory_limit=DEFAULT_MEMORY_LIMIT):
+        self.pool = pool or _runtime_pool
+        self.instruction_budget = instruction_budget
+        self.memory_limit = memory_limit
         self.mod_info = {}
         self.features = []
-        
-        # Set up the hmm (HollowKnight Mod Manager?) API
-        self._setup_api()
+        # Print progress as mods load; batch loading turns this off
+        self.verbose = verbose
+        # Why the last load failed: error_kind is one of "io", "syntax",
+        # "runtime", "budget" or "memory", error the message
+        self.error = None
+        self.error_kind = None
+        # How long the last script ran (seconds) and how many instructions it used:
+        # VM instructions rounded down to INSTRUCTION_STEP, plus what the
+        # C functions it called were charged (see SANDBOX_LUA)
+        self.elapsed = 0.0
+        self.instructions = 0
     
-    def _setup_api(self):
-        """Create the hmm table and its methods in Lua"""
-        # Create the hmm table
-        self.lua.execute("hmm = {}")
-        
-        # Register Python functions that Lua can call
-        self.lua.globals()['hmm']['setname'] = self._set_name
-        self.lua.globals()['hmm']['setathour'] = self._set_author
-        self.lua.globals()['hmm']['setdescription'] = self._set_description
-        self.lua.globals()['hmm']['setversion'] = self._set_version
-        self.lua.globals()['hmm']['addextfeaturevalue'] = self._add_feature_value
-        self.lua.globals()['hmm']['addextfeature'] = self._add_feature
-        self.lua.globals()['hmm']['forswitch'] = self._for_switch
-        
-        # Set up package.preload so require("hmm") returns the hmm table
-        self.lua.execute('''
-            package.preload["hmm"] = function()
-                return hmm
-            end
-        ''')
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+    
+    def _api(self, lua):
+        """The functions behind this mod's hmm table (HollowKnight Mod Manager?)"""
+        return lua.table_from({
+            'setname': self._set_name,
+            'setathour': self._set_author,
+            'setdescription': self._set_description,
+            'setversion': self._set_version,
+            'addextfeaturevalue': self._add_feature_value,
+            'addextfeature': self._add_feature,
+            'forswitch': self._for_switch,
+        })
     
     def _set_name(self, name):
         """Set mod name"""
         self.mod_info['name'] = name
-        print(f"Mod Name: {name}")
+        self._log(f"Mod Name: {name}")
     
     def _set_author(self, author):
         """Set mod author"""
         self.mod_info['author'] = author
-        print(f"Author: {author}")
+        self._log(f"Author: {author}")
     
     def _set_description(self, desc):
         """Set mod description"""
         self.mod_info['description'] = desc
-        print(f"Description: {desc}")
+        self._log(f"Description: {desc}")
     
     def _set_version(self, version=None):
         """Set mod version"""
         self.mod_info['version'] = version or "Unknown"
-        print(f"Version: {self.mod_info['version']}")
+        self._log(f"Version: {self.mod_info['version']}")
     
     def _add_feature_value(self, feature):
         """Add a specific feature"""
         if feature:
             self.features.append(feature)
-            print(f"Added feature: {feature}")
+            self._log(f"Added feature: {feature}")
     
     def _add_feature(self, manualfeature):
         """Add manual features"""
@@ -68,53 +320,91 @@ class LuaModLoader:
             else:
                 features_list = [manualfeature]
             self.features.extend(features_list)
-            print(f"Added manual features: {features_list}")
+            self._log(f"Added manual features: {features_list}")
     def _for_switch(self, switch_table):
         """Handle for switch table"""
-        print("Received forswitch table:")
+        self._log("Received forswitch table:")
         for key, value in switch_table.items():
-            print(f"  {key}: {value}")
+            self._log(f"  {key}: {value}")
     
     def load_mod(self, lua_file_path):
         """Load a Lua mod file"""
-        lua_path = Path(lua_file_path)
-        
-        if not lua_path.exists():
-            print(f"Error: File {lua_file_path} not found!")
-            return False
-        
-        print(f"\n{'='*50}")
-        print(f"Loading mod from: {lua_path.name}")
-        print(f"{'='*50}\n")
-        
-        try:
-            # Execute the Lua file
-            with open(lua_path, 'r', encoding='utf-8') as f:
-                lua_code = f.read()
+        with span("load_mod", file=os.path.basename(lua_file_path)):
+            lua_path = Path(lua_file_path)
             
-            self.lua.execute(lua_code)
+            if not lua_path.exists():
+                self.error, self.error_kind = f"File {lua_file_path} not found", "io"
+                self._log(f"Error: File {lua_file_path} not found!")
+                return False
             
-            # Try to call hmm.info() if it exists
-            if 'hmm' in self.lua.globals() and 'info' in self.lua.globals()['hmm']:
-                print("\nCalling hmm.info()...")
-                self.lua.globals()['hmm']['info']()
+            self._log(f"\n{'='*50}")
+            self._log(f"Loading mod from: {lua_path.name}")
+            self._log(f"{'='*50}\n")
             
-            # Try to call hmm.extfeatures() if it exists
-            if 'hmm' in self.lua.globals() and 'extfeatures' in self.lua.globals()['hmm']:
-                print("\nCalling hmm.extfeatures()...")
-                self.lua.globals()['hmm']['extfeatures']()
+            try:
+                with open(lua_path, 'r', encoding='utf-8') as f:
+                    lua_code = f.read()
+            except Exception as e:
+                self._fail("io", str(e))
+                return False
             
-            print(f"\n{'='*50}")
-            print("Mod loaded successfully!")
-            print(f"{'='*50}\n")
+            return self.load_source(lua_code, lua_path.name)
+    
+    def load_source(self, lua_code, name="mod"):
+        """
+        Run a mod's Lua source and collect what hmm.info() / hmm.extfeatures() report
+        
+        The script is stopped once it uses more than instruction_budget VM
+        instructions or memory_limit bytes; error / error_kind say why.
+        """
+        lua, sandbox = self.pool.acquire()
+        healthy = True
+        start = time.perf_counter()
+        stats = lua.table(used=0)
+        self.instructions = 0
+        try:
+            lua.set_max_memory(self.memory_limit, total=False)
+            # Execute the Lua file in its own environment, then hmm.info() and hmm.extfeatures()
+            with span("lua.execute", chunk=name) as trace:
+                ok, result, message, _ = sandbox(
+                    self._api(lua), lua_code, "=" + name, self._print, self.instruction_budget, INSTRUCTION_STEP,
+                    stats)
+                self.instructions = int(stats['used'])
+                trace.set(instructions=self.instructions, error=None if ok else result)
+            if not ok:
+                # Start the next script on a runtime nothing was aborted in
+                healthy = result not in ("budget", "memory")
+                if result == "memory":
+                    message = f"memory limit of {self.memory_limit} bytes exceeded"
+                self._fail(result, message)
+                return False
+            
+            self._log(f"\n{'='*50}")
+            self._log("Mod loaded successfully!")
+            self._log(f"{'='*50}\n")
             
             return True
             
-        except Exception as e:
-            print(f"Error loading mod: {e}")
-            import traceback
-            traceback.print_exc()
+        except LuaMemoryError:
+            healthy = False
+            self.instructions = int(stats['used'])
+            self._fail("memory", f"memory limit of {self.memory_limit} bytes exceeded")
+            return False
+        except LuaError as e:
+            self._fail("runtime", str(e))
             return False
+        finally:
+            self.elapsed = time.perf_counter() - start
+            if healthy:
+                self.pool.release((lua, sandbox))
+    
+    def _fail(self, kind, message):
+        self.error, self.error_kind = message, kind
+        self._log(f"Error loading mod ({kind}): {message}")
+    
+    def _print(self, *args):
+        """print() inside a mod"""
+        self._log(" ".join(str(arg) for arg in args))
     
     def get_mod_info(self):
         """Return the collected mod information"""
@@ -124,6 +414,162 @@ class LuaModLoader:
         }
 
 
+def _plain(value):
+    """Lua values as plain Python ones, so results can be pickled and cached as JSON"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, 'items'):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return str(value)
+
+
+def evaluate_manifest(lua_code, instruction_budget=DEFAULT_INSTRUCTION_BUDGET, memory_limit=DEFAULT_MEMORY_LIMIT):
+    """
+    Run one manifest in a fresh, quiet loader
+
+    Returns:
+        dict: 'success', 'info', 'features', 'error' (None on success,
+            otherwise {'kind': ..., 'message': ...}, see LuaModLoader),
+            'elapsed_ms' and 'instructions'
+    """
+    loader = LuaModLoader(verbose=False, instruction_budget=instruction_budget, memory_limit=memory_limit)
+    success = loader.load_source(lua_code)
+    return {
+        'success': success,
+        'info': _plain(loader.mod_info),
+        'features': _plain(loader.features),
+        'error': None if success else {'kind': loader.error_kind, 'message': loader.error},
+        'elapsed_ms': round(loader.elapsed * 1000, 3),
+        'instructions': loader.instructions,
+    }
+
+
+class ManifestCache:
+    """
+    Results of manifests already evaluated, keyed by the SHA-256 of their source
+
+    An unchanged manifest is never executed twice, even across launches or
+    when the same file sits in several mod folders.
+    """
+
+    MAX_ENTRIES = 5000
+
+    def __init__(self, path=MANIFEST_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_CACHE_VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def get(self, digest):
+        with self._lock:
+            return self.entries.get(digest)
+
+    def put(self, digest, result):
+        with self._lock:
+            self.entries.pop(digest, None)
+            self.entries[digest] = result
+            # Oldest first, dicts keep insertion order
+            while len(self.entries) > self.MAX_ENTRIES:
+                del self.entries[next(iter(self.entries))]
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'version': MANIFEST_CACHE_VERSION, 'entries': self.entries}
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+# Starting worker processes costs more than running a handful of manifests in-process
+POOL_THRESHOLD = 8
+
+
+def load_manifests(directory, workers=None, cache=None, recursive=False, metadata_only=False,
+                   instruction_budget=DEFAULT_INSTRUCTION_BUDGET, memory_limit=DEFAULT_MEMORY_LIMIT):
+    """
+    Evaluate every .lua manifest in a directory, in parallel, without printing
+
+    Args:
+        directory: Folder to look in
+        workers: Process pool size, defaults to the number of CPUs
+        cache: ManifestCache to use, defaults to the one in the user cache dir
+        recursive: Also look in subfolders
+        metadata_only: Only name/author/description/version are needed.
+            Manifests laid out like example.lua are then read with
+            parse_manifest() instead of being run ('static' is True,
+            'features' None and 'info' also has the declared
+            'api_version' for those), the rest are executed as usual
+        instruction_budget / memory_limit: Per-script limits, see LuaModLoader
+
+    Returns:
+        list[dict]: Per manifest, sorted by path: 'path', 'sha256', 'cached',
+            'static' and everything evaluate_manifest() returns
+    """
+    cache = cache if cache is not None else ManifestCache()
+    pattern = "**/*.lua" if recursive else "*.lua"
+
+    results = []
+    pending = {}  # digest -> (source, [result entries waiting for it])
+    for path in sorted(Path(directory).glob(pattern)):
+        try:
+            source = path.read_bytes()
+        except OSError as e:
+            results.append({'path': str(path), 'sha256': None, 'cached': False, 'static': False,
+                            'success': False, 'info': {}, 'features': [],
+                            'error': {'kind': 'io', 'message': str(e)}, 'elapsed_ms': 0, 'instructions': 0})
+            continue
+        digest = hashlib.sha256(source).hexdigest()
+        entry = {'path': str(path), 'sha256': digest, 'static': False}
+        results.append(entry)
+        if metadata_only:
+            start = time.perf_counter()
+            info = parse_manifest(source.decode('utf-8', errors='replace'))
+            if info is not None:
+                entry.update(cached=False, static=True, success=True, info=info, features=None, error=None,
+                             elapsed_ms=round((time.perf_counter() - start) * 1000, 3), instructions=0)
+                continue
+        hit = cache.get(digest)
+        if hit is not None:
+            entry.update(hit, cached=True)
+        else:
+            pending.setdefault(digest, (source.decode('utf-8', errors='replace'), []))[1].append(entry)
+
+    digests = list(pending)
+    sources = [pending[digest][0] for digest in digests]
+    evaluate = partial(evaluate_manifest, instruction_budget=instruction_budget, memory_limit=memory_limit)
+    workers = min(workers or os.cpu_count() or 1, len(sources))
+    if len(sources) >= POOL_THRESHOLD and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            evaluated = list(pool.map(evaluate, sources, chunksize=max(1, len(sources) // (workers * 4))))
+    else:
+        evaluated = [evaluate(source) for source in sources]
+
+    for digest, result in zip(digests, evaluated):
+        # Hitting a limit says nothing about the manifest under other limits, try it again next time
+        if not result['error'] or result['error']['kind'] not in ("budget", "memory"):
+            cache.put(digest, result)
+        for entry in pending[digest][1]:
+            entry.update(result, cached=False)
+    cache.save()
+    return results
+
+
 def main():
     # Get the root directory
     curfilepath = Path(__file__)
@@ -0,0 +1,175 @@
+import re
+
+
+# Constants manifests declare at the top (see example.lua) and the mod_info key each ends up in
+FIELDS = {
+    "NAME": "name",
+    "ATH": "author",
+    "DESC": "description",
+    "VER": "version",
+    "APIVER": "api_version",
+}
+
+# The hmm.info() setter each constant is passed to. APIVER has none, it is only declared
+SETTERS = {
+    "setname": "NAME",
+    "setathour": "ATH",
+    "setdescription": "DESC",
+    "setversion": "VER",
+}
+
+# Strings and comments, the only parts of Lua that need real lexing here.
+# Every branch starts with a literal so the regex engine can skip ahead to
+# the next - " ' or [ instead of trying each position. Strings and comments
+# that are never closed end up in a bad_* group.
+_STRINGS_AND_COMMENTS = re.compile(r"""
+    --(?:\[(?P<comment_eq>=*)\[.*?\](?P=comment_eq)\]|(?P<line_comment>[^\n]*))
+  | "(?P<dq>(?:[^"\\\n]|\\z\s*|\\.)*)(?:"|(?P<bad_dq>))
+  | '(?P<sq>(?:[^'\\\n]|\\z\s*|\\.)*)(?:'|(?P<bad_sq>))
+  | \[(?:(?P<long_eq>=*)\[(?:\r\n|\n)?(?P<long>.*?)\](?P=long_eq)\]|(?P<bad_long>=*\[))
+""", re.S | re.X)
+
+_UNFINISHED_LONG = re.compile(r"\[=*\[")
+
+_NAMES = "|".join(FIELDS)
+
+# `local NAME = <literal>` with strings already replaced by \x01<index>\x02.
+# Patterns here start with a literal (no \b or lookbehind) so the regex
+# engine can jump between candidates, what precedes them is checked after
+_DECLARATION = re.compile(r"""
+    local\s+(?P<field>""" + _NAMES + r""")\s*(?:<\s*const\s*>\s*)?=\s*(?:
+        \x01(?P<string>\d+)\x02
+      | (?P<number>-?\d+(?:\.\d+)?)(?![\w.])
+      | (?P<word>true|false|nil)(?!\w)
+    )
+""", re.X)
+
+# hmm.setname(NAME) and the like, the argument being a bare name
+_SETTER_CALL = re.compile(r"hmm\s*\.\s*(?P<setter>" + "|".join(SETTERS) + r")\s*\(\s*(?P<arg>\w*)\s*\)")
+
+# Every mention of a constant or a setter
+_MENTION = re.compile(r"(?:" + _NAMES + "|" + "|".join(SETTERS) + r")(?!\w)")
+
+_HIDDEN_SETTER = re.compile(r"hmm\s*\[")
+
+# After a literal, these mean the expression goes on (`"a" .. B`, `1 + x`, `"s":upper()`)
+_CONTINUES = re.compile(r"\s*(?:[-+*/%^&|~<>=(\[.:{,]|(?:and|or)(?!\w))")
+
+_ESCAPE = re.compile(r"""\\(?:([abfnrtv\\"'\n])|x([0-9a-fA-F]{2})|(\d{1,3})|u\{([0-9a-fA-F]+)\}|z\s*)""")
+_ESCAPES = {"a": "\a", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v",
+            "\\": "\\", '"': '"', "'": "'", "\n": "\n"}
+
+
+def _unescape(body):
+    def replace(match):
+        simple, hex_code, dec_code, unicode_code = match.groups()
+        if simple is not None:
+            return _ESCAPES[simple]
+        if hex_code is not None:
+            return chr(int(hex_code, 16))
+        if dec_code is not None:
+            return chr(int(dec_code))
+        if unicode_code is not None:
+            return chr(int(unicode_code, 16))
+        return ""  # \z skips the following whitespace
+    return _ESCAPE.sub(replace, body) if "\\" in body else body
+
+
+def _mask(source):
+    """
+    The source with comments blanked out and strings replaced by \\x01<index>\\x02
+
+    Returns:
+        (str, list) or None: The masked code and the string values, None if
+            a string or comment is never closed
+    """
+    strings = []
+    unfinished = []
+
+    def replace(match):
+        group = match.lastgroup
+        if group == "dq" or group == "sq":
+            strings.append(_unescape(match.group(group)))
+        elif group == "long" or group == "long_eq":
+            strings.append(match.group("long"))
+        elif group == "comment_eq":
+            return " "
+        elif group == "line_comment":
+            if _UNFINISHED_LONG.match(match.group(group)):
+                unfinished.append(match)  # `--[[` that is never closed
+            return " "
+        else:
+            unfinished.append(match)
+            return ""
+        return f"\x01{len(strings) - 1}\x02"
+
+    code = _STRINGS_AND_COMMENTS.sub(replace, source)
+    if unfinished:
+        return None
+    return code, strings
+
+
+def parse_manifest(source):
+    """
+    Read a manifest's metadata without running any Lua
+
+    Only handles the example.lua layout: each constant declared once as
+    `local NAME = <literal>` and handed to its setter as `hmm.setname(NAME)`.
+    Any other mention of a constant or setter (a reassignment, a computed
+    value, a setter given something else) makes this give up so the caller
+    can execute the manifest instead. The setters are assumed to run when
+    hmm.info() does, so the values are what executing the manifest sets.
+
+    Args:
+        source: The manifest's Lua source
+
+    Returns:
+        dict or None: mod_info like LuaModLoader's, plus 'api_version' (the
+            declared APIVER, None if there is none), or None if the
+            manifest has to be executed
+    """
+    masked = _mask(source)
+    if masked is None:
+        return None
+    code, strings = masked
+    if _HIDDEN_SETTER.search(code):
+        return None  # hmm["setname"](...) hides the setter behind a string
+
+    values = {}
+    for match in _DECLARATION.finditer(code):
+        field = match.group("field")
+        if field in values or _CONTINUES.match(code, match.end()):
+            return None
+        if match.group("string") is not None:
+            value = strings[int(match.group("string"))]
+        elif match.group("number") is not None:
+            number = match.group("number")
+            value = float(number) if "." in number else int(number)
+        else:
+            value = {"true": True, "false": False, "nil": None}[match.group("word")]
+        values[field] = value
+
+    calls = {}
+    for match in _SETTER_CALL.finditer(code):
+        setter, arg = match.group("setter"), match.group("arg")
+        if setter in calls or arg != SETTERS[setter]:
+            return None
+        calls[setter] = arg
+
+    # Each declaration mentions its constant once and each call its setter and
+    # constant. PATH, resetname or t.NAME are other names
+    mentions = 0
+    for match in _MENTION.finditer(code):
+        previous = code[match.start() - 1] if match.start() else ""
+        if not (previous.isalnum() or previous == "_" or (previous in ".:" and match.group(0) in FIELDS)):
+            mentions += 1
+    if mentions != len(values) + 2 * len(calls):
+        return None
+    if values.get("NAME") is None or "setname" not in calls:
+        return None
+
+    info = {FIELDS[field]: values.get(field) for field in calls.values()}
+    if "version" in info:
+        info["version"] = info["version"] or "Unknown"  # like hmm.setversion(nil)
+    info["api_version"] = values.get("APIVER")
+    return info
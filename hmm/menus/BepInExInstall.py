@@ -1,13 +1,18 @@
-import requests  # type: ignore
 import customtkinter
-import zipfile
-import platform
+import sys
 import os
-import tempfile
 import threading
-import shutil
-import json
-import time
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from oneclick.artifacts import ArtifactStore
+from oneclick.httpcache import create_session
+from menus.progressbus import ProgressBus
+from oneclick.installer import detect_platform, install_modding_stack, uninstall
+from settingsstore import get_store
 
 
 class BepInExMenu(customtkinter.CTkToplevel):
@@ -20,10 +25,17 @@ class BepInExMenu(customtkinter.CTkToplevel):
         self.install_button = customtkinter.CTkButton(
             self,
             text="Install BepInEx",
-            command=lambda: threading.Thread(target=self.download_bepinex).start()
+            command=lambda: self._start_job(self.download_bepinex)
         )
         self.install_button.pack(pady=10)
 
+        self.uninstall_button = customtkinter.CTkButton(
+            self,
+            text="Uninstall BepInEx",
+            command=lambda: self._start_job(self.uninstall_bepinex)
+        )
+        self.uninstall_button.pack(pady=10)
+
         # Log box
         self.log = customtkinter.CTkTextbox(self, width=360, height=250)
         self.log.pack(pady=10, padx=20)
@@ -36,170 +48,108 @@ class BepInExMenu(customtkinter.CTkToplevel):
         self.progress.pack(pady=10)
         self.progress.set(0)
 
+        # The install runs on a worker thread, widgets are only touched through this
+        self.bus = ProgressBus(self).start()
+
         # Detect OS + architecture
-        curos = platform.system().lower()
-        arch = platform.architecture()[0]
-
-        if "windows" in curos:
-            self.osbep = "win"
-        elif "darwin" in curos:
-            self.osbep = "macos"
-        elif "linux" in curos:
-            self.osbep = "linux"
-        else:
-            self.osbep = "unknown"
+        self.osbep, self.beparch = detect_platform()
+        # Whether the install button comes back once a job is done, only touched on the UI thread
+        self.can_install = True
 
         if self.osbep == "unknown":
             self.log_message("❌ Unsupported OS detected.")
+            self.can_install = False
             self.install_button.configure(state="disabled")
 
-        self.beparch = "x64" if "64" in arch else "x86"
+        # Downloaded archives are kept here so reinstalls skip the network
+        self.store = ArtifactStore()
+        self.session = create_session()
 
         if self.beparch == "x86":
             self.log_message("❌ Unsupported architecture detected.")
+            self.can_install = False
             self.install_button.configure(state="disabled")
 
+    def _start_job(self, job):
+        """Run an install or uninstall on a worker thread, one at a time"""
+        self.install_button.configure(state="disabled")
+        self.uninstall_button.configure(state="disabled")
+
+        def run():
+            try:
+                job()
+            finally:
+                self.bus.call(self._job_finished)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _job_finished(self):
+        self.uninstall_button.configure(state="normal")
+        if self.can_install:
+            self.install_button.configure(state="normal")
+
     def log_message(self, text):
+        """Append a line to the log box, safe to call from any thread"""
+        self.bus.call(self._append_log, text)
+
+    def _append_log(self, text):
         self.log.configure(state="normal")
         self.log.insert("end", text + "\n")
         self.log.configure(state="disabled")
         self.log.see("end")
 
+    def _set_progress(self, value):
+        if self.progress.winfo_exists():
+            self.progress.set(value)
+
     def download_bepinex(self):
-        urlbep = rf"https://github.com/BepInEx/BepInEx/releases/download/v5.4.23.4/BepInEx_{self.osbep}_{self.beparch}_5.4.23.4.zip"
-        urlmono = rf"https://github.com/MonoMod/MonoMod/releases/download/v22.07.31.01/MonoMod-22.07.31.01-net50.zip"
-        urlhkapi = rf"https://github.com/hk-modding/api/releases/download/1.5.78.11833-74/ModdingApi{self.osbep}.zip"
-
-        temp = os.path.join(tempfile.gettempdir(), "hornetmm_temp")
-        os.makedirs(temp, exist_ok=True)
-        self.log_message(f"Temporary folder: {temp}")
-
-        files = [
-            ("BepInEx", urlbep),
-            ("MonoMod", urlmono),
-            ("HKAPI", urlhkapi)
-        ]
-
-        for name, url in files:
-            self.log_message(f"Downloading {name}...")
-            self.progress.set(0)
-            self.update_idletasks()
-
-            response = requests.get(url, stream=True)
-            total = int(response.headers.get("content-length", 0))
-            downloaded = 0
-            start_time = time.time()
-
-            zip_path = os.path.join(temp, f"{name}.zip")
-            with open(zip_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=65536):  # 64 KB chunks
-                    if not chunk:
-                        continue
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if total > 0:
-                        percent = downloaded / total
-                        self.progress.set(percent)
-                        self.update_idletasks()
-
-                    # Optional: show speed in log every ~1s
-                    elapsed = time.time() - start_time
-                    if elapsed > 1 and total > 0:
-                        speed = downloaded / 1024 / elapsed  # KB/s
-                        self.log_message(f"{name} download speed: {speed:.1f} KB/s")
-                        start_time = time.time()
-
-            self.log_message(f"✅ {name} downloaded!")
-
-        self.log_message("All downloads complete!")
-        self.progress.set(1)
-        self.log_message("Extracting files...")
-        self.progress.destroy()
-
-        # Load Hollow Knight install path from settings.json
-        root = os.path.join(os.getcwd(), "hmm")
-        with open(os.path.join(root, "settings.json")) as f:
-            settings = json.load(f)
-            path = settings.get("hollowknightpath")
-
-        bepinex_extract = os.path.join(temp, "BepInEx_extracted")
-        monomod_extract = os.path.join(temp, "MonoMod_extracted")
-        hkapi_extract = os.path.join(temp, "HKAPI_extracted")
-
-        os.makedirs(bepinex_extract, exist_ok=True)
-        os.makedirs(monomod_extract, exist_ok=True)
-        os.makedirs(hkapi_extract, exist_ok=True)
-
-        def extract_zip(zip_name, extract_to):
-            try:
-                with zipfile.ZipFile(os.path.join(temp, f"{zip_name}.zip"), 'r') as zip_ref:
-                    zip_ref.extractall(extract_to)
-                self.log_message(f"✅ {zip_name} extracted!")
-            except FileNotFoundError:
-                self.log_message(f"❌ {zip_name}.zip not found in {temp}.")
-                raise
-            except zipfile.BadZipFile:
-                self.log_message(f"❌ {zip_name}.zip is corrupted.")
-                raise
-
-        for name, folder in [("BepInEx", bepinex_extract), ("MonoMod", monomod_extract), ("HKAPI", hkapi_extract)]:
-            extract_zip(name, folder)
-
-        self.log_message("✅ All extractions complete!")
-        self.log_message(f"Moving files to Hollow Knight directory: {path}...")
+        path = get_store().get("hollowknightpath")
 
-        try:
-            # Move BepInEx
-            for item in os.listdir(bepinex_extract):
-                s = os.path.join(bepinex_extract, item)
-                d = os.path.join(path, item)
-                if os.path.isdir(s):
-                    if os.path.exists(d):
-                        shutil.rmtree(d)
-                    shutil.copytree(s, d)
-                else:
-                    os.makedirs(os.path.dirname(d), exist_ok=True)
-                    shutil.copy2(s, d)
-
-            # Move MonoMod inside BepInEx
-            monomod_dest = os.path.join(path, "BepInEx", "MonoMod")
-            os.makedirs(monomod_dest, exist_ok=True)
-            for item in os.listdir(monomod_extract):
-                s = os.path.join(monomod_extract, item)
-                d = os.path.join(monomod_dest, item)
-                if os.path.isdir(s):
-                    if os.path.exists(d):
-                        shutil.rmtree(d)
-                    shutil.copytree(s, d)
-                else:
-                    shutil.copy2(s, d)
-
-            # Move HKAPI
-            for item in os.listdir(hkapi_extract):
-                s = os.path.join(hkapi_extract, item)
-                d = os.path.join(path, item)
-                if os.path.isdir(s):
-                    if os.path.exists(d):
-                        shutil.rmtree(d)
-                    shutil.copytree(s, d)
-                else:
-                    os.makedirs(os.path.dirname(d), exist_ok=True)
-                    shutil.copy2(s, d)
-
-            self.log_message("✅ BepInEx, MonoMod, and HKAPI installed successfully!")
+        if not path or not os.path.isdir(path):
+            self.log_message(f"❌ Hollow Knight directory not found: {path}")
+            return
+
+        def on_progress(current, total, message):
+            # Called from the install's worker threads
+            self.bus.post("progress", self._set_progress, current / total)
+            if message:
+                self.log_message(message)
 
+        # Archives go through the artifact store, only files that differ from
+        # the last install are written and nothing touches the game folder
+        # until every archive is staged
+        self.bus.post("progress", self._set_progress, 0)
+        try:
+            install_modding_stack(path, progress_callback=on_progress, store=self.store, session=self.session)
         except Exception as e:
-            self.log_message(f"❌ Error while moving files: {e}")
+            self.log_message(f"❌ Install aborted: {e}")
             return
+        self.bus.call(self.progress.destroy)
+
+        # Final message, the install button stays disabled until an uninstall
+        self.log_message("✅ BepInEx, MonoMod, and HKAPI installed successfully!")
+        self.bus.call(self._set_installed, True)
+
 
-        # Clean up
-        self.log_message("Cleaning up temporary files...")
-        shutil.rmtree(temp, ignore_errors=True)
+    def uninstall_bepinex(self):
+        """Remove exactly the files the last install recorded in its manifest"""
+        path = get_store().get("hollowknightpath")
+
+        if not path or not os.path.isdir(path):
+            self.log_message(f"❌ Hollow Knight directory not found: {path}")
+            return
+
+        try:
+            removed = uninstall(path)
+        except Exception as e:
+            self.log_message(f"❌ Error while uninstalling: {e}")
+            return
+        self.log_message(f"✅ Removed {len(removed)} files")
+        self.bus.call(self._set_installed, False)
 
-        # Final message + disable button
-        self.log_message("✅ Everything is installed!")
-        self.install_button.configure(state="disabled", text="Installed ✔️")
-        self.log_message("✅ Installation complete!")
+    def _set_installed(self, installed):
+        self.can_install = not installed and self.osbep != "unknown" and self.beparch != "x86"
+        self.install_button.configure(text="Installed ✔️" if installed else "Install BepInEx")
 
 
 # --- Proper root window setup ---
@@ -1,12 +1,33 @@
 import sys
 import os
+import time
+import queue
+import threading
 
 # Add project root to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
+from oneclick.instance import claim_instance, send_url
+
+# A later hmm:// click hands its URL to the running instance and exits before
+# paying for the GUI imports below
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1].startswith("hmm://"):
+    if send_url(sys.argv[1]):
+        sys.exit(0)
+
 import customtkinter
 from oneclick.oneclick import GameBananaHandler
+from oneclick.downloader import TransferControl
+from menus.progressbus import ProgressBus
+from menus.virtuallist import VirtualList, ModIndexSource
+from modindex import ModIndex, mod_roots, LOCAL_MODS_DIR
+from settingsstore import get_store
+
+# How often the resident instance checks for handed-off URLs
+URL_POLL_MS = 100
+# Stay warm this long after the last dialog closes, for the next click
+IDLE_EXIT_SECONDS = 300
 
 class ModManager(customtkinter.CTkToplevel):
     def __init__(self, parent):
@@ -19,13 +40,46 @@ class ModManager(customtkinter.CTkToplevel):
         self.tabs.add("Mods")
         self.tabs.add("Codes")
 
+        mods_tab = self.tabs.tab("Mods")
+        self.mods_status = customtkinter.CTkLabel(mods_tab, text="", anchor="w")
+        self.mods_status.pack(fill="x", padx=5)
+
+        # Show what the index already knows right away, then catch up with
+        # whatever changed on disk in the background
+        self.index = ModIndex()
+        self.mods_list = VirtualList(
+            mods_tab,
+            ModIndexSource(self.index),
+            columns=[("Name", "name", 3), ("Version", None, 1), ("Size", "size", 1)],
+            render=lambda mod: (mod.name, mod.version or "", f"{mod.size / 1024:.0f} KB"),
+        )
+        self.mods_list.pack(fill="both", expand=True)
+        self.bus = ProgressBus(self).start()
+        self.refresh_mods()
+        threading.Thread(target=self._rescan, daemon=True).start()
+
+    def refresh_mods(self):
+        """Redraw the Mods tab from the index"""
+        self.mods_list.refresh()
+        self.mods_status.configure(text=f"{self.mods_list.source.count()} mods installed")
+
+    def _rescan(self):
+        try:
+            counts = self.index.rescan(mod_roots(get_store().get("hollowknightpath")))
+        except Exception as e:
+            print(f"Error scanning installed mods: {e}")
+            return
+        if counts['added'] or counts['updated'] or counts['removed']:
+            self.bus.call(self.refresh_mods)
+
 class InstallDialog(customtkinter.CTkToplevel):
-    def __init__(self, parent, mod_info, url):
+    def __init__(self, parent, mod_info, url, handler=None):
         super().__init__(parent)
         self.geometry("400x600")
         self.title("Install Mod")
         self.mod_info = mod_info
         self.url = url
+        self.handler = handler
         
         # Display mod info
         self.name_label = customtkinter.CTkLabel(self, text=mod_info['name'], font=("Arial", 20, "bold"))
@@ -56,50 +110,200 @@ class InstallDialog(customtkinter.CTkToplevel):
         
         # Install button
         self.install_button = customtkinter.CTkButton(self, text="Install", command=self.install_mod)
-        self.install_button.pack(pady=20)
+        self.install_button.pack(pady=(20, 5))
+        
+        # Pause / cancel, only usable while an install is running
+        self.controls = customtkinter.CTkFrame(self, fg_color="transparent")
+        self.controls.pack(pady=5)
+        self.pause_button = customtkinter.CTkButton(self.controls, text="Pause", width=100, state="disabled", command=self.toggle_pause)
+        self.pause_button.pack(side="left", padx=5)
+        self.cancel_button = customtkinter.CTkButton(self.controls, text="Cancel", width=100, state="disabled", command=self.cancel_install)
+        self.cancel_button.pack(side="left", padx=5)
+        
+        # Installs run on a worker thread and report back through this
+        self.bus = ProgressBus(self).start()
+        self.control = None
+        self.protocol("WM_DELETE_WINDOW", self.close)
     
     def install_mod(self):
         self.install_button.configure(state="disabled")
+        self.pause_button.configure(state="normal", text="Pause")
+        self.cancel_button.configure(state="normal")
+        control = self.control = TransferControl()
         
         def progress_callback(current, total, message):
-            self.progress.set(current / 100)
-            self.status_label.configure(text=message)
-            self.update()  # Force UI update
+            # Called from the worker thread, only the latest value is drawn
+            if not control.paused:
+                self.bus.post("progress", self._show_progress, current, message)
         
-        handler = GameBananaHandler(install_path='./mods')
-        success, result = handler.handle_url(self.url, progress_callback=progress_callback)
+        def worker():
+            handler = self.handler or GameBananaHandler(install_path=LOCAL_MODS_DIR)
+            success, result = handler.handle_url(self.url, progress_callback=progress_callback, control=control)
+            self.bus.call(self._install_finished, control, success, result)
         
-        if success:
+        # Daemon thread: several dialogs can install at once without blocking the main window
+        threading.Thread(target=worker, name=f"install-{self.mod_info['mod_id']}", daemon=True).start()
+    
+    def toggle_pause(self):
+        """Pause keeps the partial download, resume continues it with a Range request"""
+        if self.control is None:
+            return
+        if self.control.paused:
+            self.control.resume()
+            self.pause_button.configure(text="Pause")
+            self.status_label.configure(text="Resuming...")
+        else:
+            self.control.pause()
+            self.pause_button.configure(text="Resume")
+            self.status_label.configure(text="Paused")
+    
+    def cancel_install(self):
+        """Stop the install, partial downloads and extractions are deleted"""
+        if self.control is not None:
+            self.control.cancel()
+            self.status_label.configure(text="Cancelling...")
+            self.pause_button.configure(state="disabled")
+            self.cancel_button.configure(state="disabled")
+    
+    def close(self):
+        self.cancel_install()
+        self.bus.stop()
+        self.destroy()
+    
+    def _show_progress(self, current, message):
+        self.progress.set(current / 100)
+        self.status_label.configure(text=message)
+    
+    def _install_finished(self, control, success, result):
+        if control is not self.control or not self.winfo_exists():
+            return
+        self.control = None
+        self.pause_button.configure(state="disabled", text="Pause")
+        self.cancel_button.configure(state="disabled")
+        if control.cancelled:
+            self.progress.set(0)
+            self.status_label.configure(text="Install cancelled")
+            self.install_button.configure(state="normal")
+        elif success:
             self.status_label.configure(text=f"✓ Installed to: {result['install_path']}") #type: ignore
             self.install_button.configure(text="Done", state="normal")
         else:
             self.status_label.configure(text=f"✗ Error: {result}")
             self.install_button.configure(state="normal")
 
+class OneClickHost:
+    """
+    Resident hmm:// instance
+
+    Owns the hidden root window, one GameBananaHandler (so its session, API
+    cache and artifact store stay warm) and at most one InstallDialog per mod
+    ID. Later clicks arrive over the instance socket and are queued here;
+    clicking a mod that already has a dialog just brings it to the front.
+    Mod info is fetched on a worker thread and the dialog opens once it
+    arrives, so a slow API never freezes the dialogs already open.
+    """
+
+    def __init__(self, root, handler):
+        self.root = root
+        self.handler = handler
+        self.dialogs = {}
+        # Mod IDs whose info is being fetched, their dialog is on its way
+        self.loading = set()
+        self.bus = ProgressBus(root).start()
+        self.urls = queue.Queue()
+        self.idle_since = None
+        self.server = None
+
+    def claim(self, url):
+        """Become the resident instance, False if url went to another one"""
+        self.server = claim_instance(url, self.urls.put)
+        if self.server is None:
+            return False
+        self.urls.put(url)
+        self.root.after(URL_POLL_MS, self._drain)
+        return True
+
+    def _drain(self):
+        while True:
+            try:
+                url = self.urls.get_nowait()
+            except queue.Empty:
+                break
+            self.open_url(url)
+
+        if self.dialogs or self.loading:
+            self.idle_since = None
+        elif self.idle_since is None:
+            self.idle_since = time.monotonic()
+        elif time.monotonic() - self.idle_since > IDLE_EXIT_SECONDS:
+            self.shutdown()
+            return
+        self.root.after(URL_POLL_MS, self._drain)
+
+    def open_url(self, url):
+        info = self.handler.parse_gamebanana_url(url)
+        mod_id = info['mod_id']
+        if info['action'] != 'install' or not mod_id:
+            print(f"Ignoring unsupported URL: {url}")
+            return
+
+        dialog = self.dialogs.get(mod_id)
+        if dialog is not None and dialog.winfo_exists():
+            dialog.deiconify()
+            dialog.lift()
+            dialog.focus_force()
+            return
+        if mod_id in self.loading:
+            return
+
+        self.loading.add(mod_id)
+        threading.Thread(target=self._fetch_info, args=(mod_id, url), name=f"info-{mod_id}", daemon=True).start()
+
+    def _fetch_info(self, mod_id, url):
+        """Worker thread: look the mod up, then open its dialog on the Tk thread"""
+        try:
+            success, mod_info = self.handler.get_mod_info(mod_id)
+        except Exception as e:
+            success, mod_info = False, str(e)
+        self.bus.call(self._open_dialog, mod_id, url, success, mod_info)
+
+    def _open_dialog(self, mod_id, url, success, mod_info):
+        self.loading.discard(mod_id)
+        if not success:
+            print(f"Error fetching mod info: {mod_info}")
+            return
+
+        dialog = InstallDialog(self.root, mod_info, url, handler=self.handler)
+        dialog.protocol("WM_DELETE_WINDOW", lambda: self.close_dialog(mod_id))
+        self.dialogs[mod_id] = dialog
+
+    def close_dialog(self, mod_id):
+        dialog = self.dialogs.pop(mod_id, None)
+        if dialog is not None:
+            dialog.close()
+
+    def shutdown(self):
+        if self.server is not None:
+            self.server.close()
+        self.root.quit()
+
+
 if __name__ == "__main__":
     try:
         # Register protocol handler (one-time setup)
-        handler = GameBananaHandler(install_path='./mods')
+        handler = GameBananaHandler(install_path=LOCAL_MODS_DIR)
         handler.register_protocol_handler()
         
         root = customtkinter.CTk()
         
         # Check if launched via 1-click install
         if len(sys.argv) > 1 and sys.argv[1].startswith("hmm://"):
-            url = sys.argv[1]
-            
-            # Parse and get mod info
-            info = handler.parse_gamebanana_url(url)
-            success, mod_info = handler.get_mod_info(info['mod_id'])  # type: ignore
-            
-            if success:
-                # Show install dialog instead of main window
-                root.withdraw()  # Hide main window
-                dialog = InstallDialog(root, mod_info, url)  # type: ignore
-                dialog.mainloop()
+            root.withdraw()  # Hide main window
+            host = OneClickHost(root, handler)
+            if host.claim(sys.argv[1]):
+                root.mainloop()
+                host.shutdown()
             else:
-                print(f"Error fetching mod info: {mod_info}")
-                input("Press Enter to exit...")
                 root.destroy()
         else:
             # Normal launch - show mod manager
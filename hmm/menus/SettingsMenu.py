@@ -1,11 +1,14 @@
 import customtkinter
 from pathlib import Path
 from tkinter import filedialog
-import json
-import os
+import sys
 
 current_dir = Path(__file__).resolve().parent
 root_dir = current_dir.parent
+if str(root_dir) not in sys.path:
+    sys.path.insert(0, str(root_dir))
+
+from settingsstore import get_store
 
 class Settings(customtkinter.CTkToplevel):
     def __init__(self, parent):
@@ -35,12 +38,7 @@ class Settings(customtkinter.CTkToplevel):
     def change_hollow_path(self):
         new_path = filedialog.askdirectory(title="Change Current Path")
         if new_path:
-            settings_file = os.path.join(root_dir, "settings.json")
-            with open(settings_file, 'r') as f:
-                settings = json.load(f)
-            settings['hollowknightpath'] = new_path
-            with open(settings_file, 'w') as f:
-                json.dump(settings, f, indent=4)
+            get_store().set('hollowknightpath', new_path)
             print(f"Hollow Knight path changed to: {new_path}")
 
     def show_again(self):
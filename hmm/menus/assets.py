@@ -0,0 +1,51 @@
+import os
+import hashlib
+import tempfile
+from functools import lru_cache
+from PIL import Image
+from platformdirs import user_cache_dir
+
+
+THUMBNAIL_DIR = os.path.join(user_cache_dir("HornetMM"), "thumbnails")
+
+
+def _source_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def load_thumbnail(path, size):
+    """
+    Return a pre-scaled copy of an image, decoded at most once per process
+
+    The scaled image is cached on disk under the source file's hash and the
+    target size, so later launches decode a small thumbnail instead of the
+    full-size artwork. Use the same object for the light and dark variants
+    of a CTkImage.
+
+    Args:
+        path: Source image
+        size: (width, height) in pixels, include the window scaling factor
+
+    Returns:
+        PIL.Image.Image
+    """
+    width, height = size
+    cached = os.path.join(THUMBNAIL_DIR, f"{_source_hash(path)}_{width}x{height}.png")
+
+    if os.path.exists(cached):
+        image = Image.open(cached)
+        image.load()
+        return image
+
+    with Image.open(path) as source:
+        image = source.convert("RGBA").resize((width, height), Image.Resampling.LANCZOS)
+
+    # Write to a temp file first so a crash never leaves a truncated thumbnail
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=THUMBNAIL_DIR, suffix=".png")
+    with os.fdopen(fd, 'wb') as f:
+        image.save(f, format="PNG")
+    os.replace(tmp_path, cached)
+    return image
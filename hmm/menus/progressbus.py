@@ -0,0 +1,68 @@
+import threading
+from collections import deque
+
+
+# Redraws per second, well above what a progress bar needs to look smooth
+DEFAULT_FPS = 30
+
+
+class ProgressBus:
+    """
+    Hand progress and UI events from worker threads to the Tk main loop
+
+    Workers never touch widgets. They post() values, of which only the
+    latest per key survives until the next frame, or call() one-off events
+    (log lines, "done") that are all delivered in order. The Tk side drains
+    everything with after() at a fixed frame rate, so a download reporting
+    every chunk costs one dict write per chunk instead of a redraw.
+    """
+
+    def __init__(self, widget, fps=DEFAULT_FPS):
+        self.widget = widget
+        self.interval = max(1, int(1000 / fps))
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._events = deque()
+        self._after_id = None
+
+    def post(self, key, callback, *args):
+        """Coalesced update: only the newest callback/args for key runs next frame"""
+        with self._lock:
+            self._latest[key] = (callback, args)
+
+    def call(self, callback, *args):
+        """Ordered event: every call runs on the Tk thread, in the order posted"""
+        with self._lock:
+            self._events.append((callback, args))
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval, self._drain)
+        return self
+
+    def stop(self):
+        """Stop draining and deliver whatever is still pending"""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            events, self._events = self._events, deque()
+            latest, self._latest = self._latest, {}
+        # Progress first, so a final "done" event is never overwritten by a stale value
+        for callback, args in latest.values():
+            callback(*args)
+        for callback, args in events:
+            callback(*args)
+
+    def _drain(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error delivering UI update: {e}")
+        if self.widget.winfo_exists():
+            self._after_id = self.widget.after(self.interval, self._drain)
+        else:
+            self._after_id = None
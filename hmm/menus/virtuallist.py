@@ -0,0 +1,248 @@
+import math
+import customtkinter
+
+
+# Rows fetched from a ModIndexSource per query
+PAGE_SIZE = 100
+
+
+class SequenceSource:
+    """
+    List data kept in memory, e.g. GameBanana search results
+
+    Args:
+        items: The records
+        keys: {sort name: function(record) -> value}, e.g.
+            {"name": lambda r: r["_sName"].lower(), "downloads": lambda r: r["_nDownloadCount"]}
+        text: function(record) -> str that filter() searches, defaults to str()
+    """
+
+    def __init__(self, items, keys=None, text=str):
+        self.items = list(items)
+        self.keys = keys or {}
+        self.text = text
+        self._search = ""
+        self._view = self.items
+
+    @property
+    def sort_keys(self):
+        return tuple(self.keys)
+
+    def sort(self, key, descending=False):
+        self.items.sort(key=self.keys[key], reverse=descending)
+        self.filter(self._search)
+
+    def filter(self, search):
+        self._search = (search or "").lower()
+        if self._search:
+            self._view = [item for item in self.items if self._search in self.text(item).lower()]
+        else:
+            self._view = self.items
+
+    def count(self):
+        return len(self._view)
+
+    def fetch(self, offset, limit):
+        return self._view[offset:offset + limit]
+
+    def invalidate(self):
+        pass
+
+
+class ModIndexSource:
+    """
+    Installed mods straight from a ModIndex, PAGE_SIZE rows per query
+
+    Scrolling only hits SQLite when it crosses into a page that is not
+    cached yet, call invalidate() after the index was rescanned.
+    """
+
+    def __init__(self, index, source=None):
+        from modindex import SORT_COLUMNS
+        self.index = index
+        self.source = source
+        self.sort_keys = tuple(SORT_COLUMNS)
+        self._sort = ("name", False)
+        self._search = None
+        self.invalidate()
+
+    def sort(self, key, descending=False):
+        self._sort = (key, descending)
+        self.invalidate()
+
+    def filter(self, search):
+        self._search = search or None
+        self.invalidate()
+
+    def invalidate(self):
+        self._pages = {}
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.index.count(source=self.source, search=self._search)
+        return self._count
+
+    def _page(self, number):
+        if number not in self._pages:
+            key, descending = self._sort
+            self._pages[number] = self.index.mods(
+                source=self.source, search=self._search, limit=PAGE_SIZE,
+                offset=number * PAGE_SIZE, sort=key, descending=descending)
+        return self._pages[number]
+
+    def fetch(self, offset, limit):
+        rows = []
+        for number in range(offset // PAGE_SIZE, (offset + limit - 1) // PAGE_SIZE + 1):
+            page = self._page(number)
+            start = max(offset - number * PAGE_SIZE, 0)
+            rows.extend(page[start:start + limit - len(rows)])
+        return rows
+
+
+class VirtualList(customtkinter.CTkFrame):
+    """
+    Scrollable list that only creates widgets for the rows on screen
+
+    A fixed pool of row widgets (visible rows plus a small buffer) is
+    created once and re-labelled as the list scrolls, so showing a
+    thousand mods costs the same as showing twenty. Clicking a column
+    header sorts by it (again to reverse) if the source has that sort key.
+
+    Args:
+        master: Parent widget
+        source: SequenceSource, ModIndexSource or anything with count(),
+            fetch(offset, limit), sort(key, descending) and sort_keys
+        columns: [(title, sort key or None, weight)]
+        render: function(record) -> tuple of column texts
+        row_height: Height of every row in pixels (before window scaling)
+        buffer: Extra rows kept in the pool beyond what fits on screen
+        on_select: Optional function(record) called when a row is clicked
+    """
+
+    def __init__(self, master, source, columns, render, row_height=28, buffer=2, on_select=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.source = source
+        self.columns = columns
+        self.render = render
+        self.row_height = row_height
+        self.buffer = buffer
+        self.on_select = on_select
+        self.top = 0
+        self._rows = []
+        self._records = []
+        self._sorted_by = None
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        header = customtkinter.CTkFrame(self, fg_color="transparent")
+        header.grid(row=0, column=0, sticky="ew")
+        for i, (title, key, weight) in enumerate(columns):
+            header.grid_columnconfigure(i, weight=weight, uniform="column")
+            button = customtkinter.CTkButton(
+                header, text=title, height=row_height, anchor="w",
+                fg_color="transparent", text_color=("gray10", "gray90"), hover_color=("gray80", "gray30"),
+                state="normal" if key in source.sort_keys else "disabled",
+                command=lambda key=key: self.sort_by(key))
+            button.grid(row=0, column=i, sticky="ew")
+
+        self.body = customtkinter.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=1, column=0, sticky="nsew")
+        self.scrollbar = customtkinter.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+    # --- Row pool ---
+
+    def _visible_rows(self):
+        height = self.body.winfo_height() / customtkinter.ScalingTracker.get_widget_scaling(self)
+        return max(1, math.ceil(height / self.row_height))
+
+    def _make_row(self):
+        row = customtkinter.CTkFrame(self.body, height=self.row_height, fg_color="transparent", corner_radius=0)
+        row.labels = []
+        row.texts = ()
+        for i, (_, _, weight) in enumerate(self.columns):
+            row.grid_columnconfigure(i, weight=weight, uniform="column")
+            label = customtkinter.CTkLabel(row, text="", anchor="w", height=self.row_height)
+            label.grid(row=0, column=i, sticky="ew", padx=(4, 0))
+            row.labels.append(label)
+        index = len(self._rows)
+        for widget in [row] + row.labels:
+            widget.bind("<Button-1>", lambda e, index=index: self._on_click(index))
+            self._bind_wheel(widget)
+        return row
+
+    def _on_resize(self, event=None):
+        wanted = self._visible_rows() + self.buffer
+        while len(self._rows) < wanted:
+            self._rows.append(self._make_row())
+        while len(self._rows) > wanted:
+            self._rows.pop().destroy()
+        self._render()
+
+    # --- Scrolling ---
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll(-int(e.delta / 120) * 3 or (-1 if e.delta > 0 else 1)))
+        widget.bind("<Button-4>", lambda e: self.scroll(-3))
+        widget.bind("<Button-5>", lambda e: self.scroll(3))
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(round(float(value) * self.source.count()))
+        elif unit == "pages":
+            self.scroll(int(value) * self._visible_rows())
+        else:
+            self.scroll(int(value))
+
+    def scroll(self, rows):
+        self.scroll_to(self.top + rows)
+
+    def scroll_to(self, index):
+        top = max(0, min(index, self.source.count() - self._visible_rows()))
+        if top != self.top:
+            self.top = top
+            self._render()
+
+    # --- Data ---
+
+    def sort_by(self, key):
+        descending = self._sorted_by == (key, False)
+        self._sorted_by = (key, descending)
+        self.source.sort(key, descending)
+        self.top = 0
+        self._render()
+
+    def refresh(self):
+        """Re-read the source, e.g. after it changed"""
+        self.source.invalidate()
+        self.top = max(0, min(self.top, self.source.count() - self._visible_rows()))
+        self._render()
+
+    def _render(self):
+        self._records = self.source.fetch(self.top, len(self._rows))
+        for i, row in enumerate(self._rows):
+            if i < len(self._records):
+                texts = tuple(self.render(self._records[i]))
+                # Only touch labels whose text changed, configure() redraws
+                for label, old, new in zip(row.labels, row.texts or (None,) * len(texts), texts):
+                    if old != new:
+                        label.configure(text=new)
+                row.texts = texts
+                row.place(x=0, y=i * self.row_height, relwidth=1)
+            else:
+                row.place_forget()
+
+        total = self.source.count()
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self._visible_rows()) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_click(self, index):
+        if self.on_select and index < len(self._records):
+            self.on_select(self._records[index])
@@ -0,0 +1,256 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+from platformdirs import user_cache_dir
+
+
+INDEX_PATH = os.path.join(user_cache_dir("HornetMM"), "mods.db")
+# Where the 1-click installer downloads and extracts GameBanana mods, whatever
+# directory HornetMM (or the hmm:// protocol handler) was started from
+LOCAL_MODS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mods")
+
+# Loose files in a mod folder that count as a mod on their own
+MOD_FILE_EXTENSIONS = (".dll",)
+# mod_<id> (downloaded zip) and mod_mod_<id> (its extraction) from GameBananaHandler
+GAMEBANANA_DIR = re.compile(r"^(?:mod_)+(\d+)$")
+
+# Orders mods() can return, mapped to their SQL
+SORT_COLUMNS = {
+    "name": "name COLLATE NOCASE",
+    "date": "installed_at",
+    "size": "size",
+    "source": "source",
+}
+
+InstalledMod = namedtuple("InstalledMod", ["mod_id", "name", "version", "source", "path", "files", "size", "installed_at"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mods (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    source TEXT NOT NULL,
+    mod_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version TEXT,
+    files TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    installed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mods_root ON mods (root);
+CREATE INDEX IF NOT EXISTS mods_name ON mods (name COLLATE NOCASE);
+-- mtime of every scanned directory (and loose mod file), to tell what changed
+CREATE TABLE IF NOT EXISTS stamps (
+    path TEXT PRIMARY KEY,
+    mod_path TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stamps_mod ON stamps (mod_path);
+"""
+
+
+def mod_roots(game_path, local_mods=LOCAL_MODS_DIR):
+    """The folders mods are installed to, as (source, path)"""
+    roots = []
+    if game_path:
+        roots.append(("bepinex", os.path.join(game_path, "BepInEx", "plugins")))
+        roots.append(("modding-api", os.path.join(game_path, "Mods")))
+    roots.append(("local", local_mods))
+    return roots
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_manifest(path):
+    """name / version from a Thunderstore-style manifest.json, if the mod ships one"""
+    try:
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8-sig") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    if not isinstance(data, dict):
+        return None, None
+    return data.get("name"), data.get("version_number") or data.get("version")
+
+
+class ModIndex:
+    """
+    SQLite index of the mods installed in the game and local mod folders
+
+    rescan() only re-reads what changed since the last scan: a mod folder
+    is walked again only if the mtime of one of its directories changed,
+    and a mod root is listed again only if its own mtime changed. Everything
+    else is answered from the database, so listing hundreds of mods is one
+    query instead of a filesystem walk.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    # --- Queries ---
+
+    def mods(self, source=None, search=None, limit=-1, offset=0, sort="name", descending=False):
+        """Installed mods in SORT_COLUMNS order, optionally filtered by source and a name substring"""
+        sql = "SELECT mod_id, name, version, source, path, files, size, installed_at FROM mods WHERE 1=1"
+        args = []
+        if source:
+            sql += " AND source = ?"
+            args.append(source)
+        if search:
+            sql += " AND name LIKE ? ESCAPE '\\'"
+            args.append("%" + re.sub(r"([%_\\])", r"\\\1", search) + "%")
+        direction = "DESC" if descending else "ASC"
+        sql += f" ORDER BY {SORT_COLUMNS[sort]} {direction}, path LIMIT ? OFFSET ?"
+        args += [limit, offset]
+        with self._lock:
+            rows = self.db.execute(sql, args).fetchall()
+        return [InstalledMod(*row[:5], json.loads(row[5]), *row[6:]) for row in rows]
+
+    def count(self, source=None, search=None):
+        sql = "SELECT COUNT(*) FROM mods WHERE 1=1"
+        args = []
+        if source:
+            sql += " AND source = ?"
+            args.append(source)
+        if search:
+            sql += " AND name LIKE ? ESCAPE '\\'"
+            args.append("%" + re.sub(r"([%_\\])", r"\\\1", search) + "%")
+        with self._lock:
+            return self.db.execute(sql, args).fetchone()[0]
+
+    def get(self, mod_id):
+        """The installs of one mod (a mod can sit in more than one folder)"""
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT mod_id, name, version, source, path, files, size, installed_at FROM mods WHERE mod_id = ?",
+                (mod_id,)).fetchall()
+        return [InstalledMod(*row[:5], json.loads(row[5]), *row[6:]) for row in rows]
+
+    # --- Scanning ---
+
+    def rescan(self, roots):
+        """
+        Bring the index up to date with the mod folders
+
+        Args:
+            roots: (source, path) pairs, see mod_roots()
+
+        Returns:
+            dict: Number of mods 'added', 'updated', 'removed' and 'unchanged'
+        """
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        with self._lock, self.db:
+            for source, root in roots:
+                self._scan_root(source, os.path.abspath(root), counts)
+        return counts
+
+    def _scan_root(self, source, root, counts):
+        known = {path for (path,) in self.db.execute("SELECT path FROM mods WHERE root = ?", (root,))}
+        stamp = _stamp(root)
+        if stamp is None:
+            entries = set()
+        elif self._stored_stamp(root) == stamp:
+            # Nothing was added to or removed from the root itself
+            entries = known
+        else:
+            entries = set()
+            for entry in os.scandir(root):
+                if entry.is_dir() or entry.name.lower().endswith(MOD_FILE_EXTENSIONS):
+                    entries.add(entry.path)
+
+        for path in known - entries:
+            self._forget(path)
+            counts['removed'] += 1
+        for path in sorted(entries):
+            if path in known and not self._changed(path):
+                counts['unchanged'] += 1
+                continue
+            if self._index_mod(source, root, path):
+                counts['updated' if path in known else 'added'] += 1
+            elif path in known:
+                counts['removed'] += 1
+
+        if stamp is None:
+            self.db.execute("DELETE FROM stamps WHERE path = ?", (root,))
+        else:
+            self.db.execute("INSERT OR REPLACE INTO stamps VALUES (?, NULL, ?, ?)", (root, *stamp))
+
+    def _stored_stamp(self, path):
+        row = self.db.execute("SELECT mtime_ns, size FROM stamps WHERE path = ?", (path,)).fetchone()
+        return tuple(row) if row else None
+
+    def _changed(self, mod_path):
+        """Whether any directory (or the file) making up a mod changed since it was indexed"""
+        rows = self.db.execute("SELECT path, mtime_ns, size FROM stamps WHERE mod_path = ?", (mod_path,)).fetchall()
+        if not rows:
+            return True
+        for path, mtime_ns, size in rows:
+            stamp = _stamp(path)
+            if stamp is None or stamp[0] != mtime_ns or (not os.path.isdir(path) and stamp[1] != size):
+                return True
+        return False
+
+    def _forget(self, mod_path):
+        self.db.execute("DELETE FROM mods WHERE path = ?", (mod_path,))
+        self.db.execute("DELETE FROM stamps WHERE mod_path = ?", (mod_path,))
+
+    def _index_mod(self, source, root, path):
+        """(Re)read one mod folder or file, returns False if it is gone"""
+        stamps = []
+        files = []
+        size = 0
+        try:
+            if os.path.isdir(path):
+                for dirpath, dirnames, filenames in os.walk(path):
+                    stamps.append((dirpath, *_stamp(dirpath)))
+                    for filename in filenames:
+                        full = os.path.join(dirpath, filename)
+                        st = os.stat(full)
+                        files.append(os.path.relpath(full, path).replace(os.sep, "/"))
+                        size += st.st_size
+                name, version = _read_manifest(path)
+            else:
+                st = os.stat(path)
+                stamps.append((path, st.st_mtime_ns, st.st_size))
+                files.append(os.path.basename(path))
+                size = st.st_size
+                name, version = None, None
+        except (OSError, TypeError):
+            # Removed while we were looking at it
+            self._forget(path)
+            return False
+
+        entry = os.path.basename(path)
+        match = GAMEBANANA_DIR.match(entry)
+        mod_id = f"gamebanana:mod/{match.group(1)}" if match else f"{source}:{entry}"
+        name = name or (os.path.splitext(entry)[0] if not os.path.isdir(path) else entry)
+
+        row = self.db.execute("SELECT installed_at FROM mods WHERE path = ?", (path,)).fetchone()
+        installed_at = row[0] if row else time.time()
+
+        self._forget(path)
+        self.db.execute(
+            "INSERT INTO mods VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, root, source, mod_id, name, version, json.dumps(sorted(files)), size, installed_at))
+        self.db.executemany("INSERT OR REPLACE INTO stamps VALUES (?, ?, ?, ?)",
+                            [(p, path, mtime_ns, st_size) for p, mtime_ns, st_size in stamps])
+        return True
+
+    def close(self):
+        with self._lock:
+            self.db.close()
@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from filelock import FileLock
+from platformdirs import user_cache_dir
+
+
+# 2 GiB is plenty for the modding stack plus a good number of mods
+DEFAULT_QUOTA = 2 * 1024 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path):
+    """Return the hex SHA-256 digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """
+    Content-addressed on-disk store for downloaded archives
+
+    Files live under objects/<first two hex chars>/<sha256> and a small
+    index.json maps source URLs (or any other key) to a digest, and each
+    digest to its size and last-used time. When the store grows past its
+    quota the least recently used objects are evicted.
+    """
+
+    def __init__(self, root=None, quota=DEFAULT_QUOTA):
+        self.root = root or os.path.join(user_cache_dir("HornetMM"), "artifacts")
+        self.quota = quota
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.index_path = os.path.join(self.root, "index.json")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        # The thread lock covers workers in this process, the file lock covers
+        # other HornetMM processes (every hmm:// click is its own process)
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(self.index_path + ".lock")
+
+    # --- Index helpers ---
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            index = {}
+        index.setdefault("urls", {})
+        index.setdefault("objects", {})
+        return index
+
+    def _save_index(self, index):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".index-", suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp_path, self.index_path)
+
+    def object_path(self, digest):
+        """Return where the object with this digest lives on disk"""
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    # --- Public API ---
+
+    def lookup(self, key, verify=True):
+        """
+        Find a stored artifact
+
+        Args:
+            key: URL (or alias) the artifact was stored under
+            verify: Re-hash the object and drop it if it does not match
+
+        Returns:
+            str or None: Path of the stored object
+        """
+        with self._lock, self._file_lock:
+            index = self._load_index()
+            digest = index["urls"].get(key)
+            if not digest:
+                return None
+
+            entry = index["objects"].get(digest)
+            path = self.object_path(digest)
+            valid = (
+                entry is not None
+                and os.path.isfile(path)
+                and os.path.getsize(path) == entry["size"]
+                and (not verify or sha256_file(path) == digest)
+            )
+            if not valid:
+                self._forget(index, digest)
+                self._save_index(index)
+                return None
+
+            entry["last_used"] = time.time()
+            self._save_index(index)
+            return path
+
+    def add(self, key, src_path, aliases=(), expected_digest=None):
+        """
+        Move a freshly downloaded file into the store
+
+        Args:
+            key: URL the file was downloaded from
+            src_path: Path of the downloaded file, it is moved (not copied)
+            aliases: Extra keys that should resolve to the same object
+            expected_digest: Optional SHA-256 the file must match
+
+        Returns:
+            str: Path of the stored object
+        """
+        digest = sha256_file(src_path)
+        if expected_digest and digest != expected_digest.lower():
+            os.remove(src_path)
+            raise ValueError(f"SHA-256 mismatch for {key}: expected {expected_digest}, got {digest}")
+
+        path = self.object_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with self._lock, self._file_lock:
+            if os.path.isfile(path):
+                # Same content already stored under another URL
+                os.remove(src_path)
+            else:
+                shutil.move(src_path, path)
+
+            index = self._load_index()
+            index["objects"][digest] = {
+                "size": os.path.getsize(path),
+                "last_used": time.time(),
+            }
+            for k in (key, *aliases):
+                index["urls"][k] = digest
+            self._evict(index, keep=digest)
+            self._save_index(index)
+        return path
+
+    def find(self, digest, keys=(), verify=True):
+        """
+        Find a stored artifact by content, whatever URL it came from
+
+        Args:
+            digest: SHA-256 of the artifact
+            keys: Keys to point at the object if it is there
+            verify: Re-hash the object and drop it if it does not match
+
+        Returns:
+            str or None: Path of the stored object
+        """
+        digest = digest.lower()
+        with self._lock, self._file_lock:
+            index = self._load_index()
+            entry = index["objects"].get(digest)
+            if entry is None:
+                return None
+            path = self.object_path(digest)
+            valid = (
+                os.path.isfile(path)
+                and os.path.getsize(path) == entry["size"]
+                and (not verify or sha256_file(path) == digest)
+            )
+            if not valid:
+                self._forget(index, digest)
+                self._save_index(index)
+                return None
+
+            entry["last_used"] = time.time()
+            for k in keys:
+                index["urls"][k] = digest
+            self._save_index(index)
+            return path
+
+    def alias(self, key, alias):
+        """Point an extra key at the object already stored under key"""
+        with self._lock, self._file_lock:
+            index = self._load_index()
+            digest = index["urls"].get(key)
+            if digest:
+                index["urls"][alias] = digest
+                self._save_index(index)
+            return digest
+
+    def digest_for(self, key):
+        """Return the digest stored for a key, without touching the object"""
+        with self._lock, self._file_lock:
+            return self._load_index()["urls"].get(key)
+
+    def materialize(self, path, dest):
+        """Hardlink a stored object to dest, falling back to a copy"""
+        os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+        if os.path.exists(dest):
+            os.remove(dest)
+        try:
+            os.link(path, dest)
+        except OSError:
+            shutil.copy2(path, dest)
+        return dest
+
+    def total_size(self):
+        with self._lock, self._file_lock:
+            return sum(entry["size"] for entry in self._load_index()["objects"].values())
+
+    # --- Eviction ---
+
+    def _forget(self, index, digest):
+        index["objects"].pop(digest, None)
+        for k in [k for k, d in index["urls"].items() if d == digest]:
+            del index["urls"][k]
+        try:
+            os.remove(self.object_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, index, keep=None):
+        """Drop least recently used objects until the store fits its quota"""
+        total = sum(entry["size"] for entry in index["objects"].values())
+        by_age = sorted(index["objects"].items(), key=lambda item: item[1]["last_used"])
+        for digest, entry in by_age:
+            if total <= self.quota:
+                break
+            if digest == keep:
+                continue
+            self._forget(index, digest)
+            total -= entry["size"]
+            print(f"Evicted cached artifact {digest[:12]} ({entry['size']} bytes)", file=sys.stderr)
@@ -0,0 +1,289 @@
+import os
+import sys
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+# tracing lives in hmm/, same setup as oneclick.py
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+try:
+    from .downloader import TransferControl
+    from .installer import GameFolderBusy, StackInstall, StackInstallError, modding_stack
+except ImportError:
+    from downloader import TransferControl
+    from installer import GameFolderBusy, StackInstall, StackInstallError, modding_stack
+from tracing import span
+
+
+# Status code of every item, the CLI exits with the highest one
+OK = 0
+INVALID = 2
+DOWNLOAD_FAILED = 3
+INSTALL_FAILED = 4
+CANCELLED = 5
+
+STATUS_NAMES = {
+    OK: "installed",
+    INVALID: "invalid",
+    DOWNLOAD_FAILED: "download failed",
+    INSTALL_FAILED: "install failed",
+    CANCELLED: "cancelled",
+}
+
+DEFAULT_NETWORK_JOBS = 4
+DEFAULT_DISK_JOBS = 2
+
+# Result item of the BepInEx / MonoMod / HKAPI install
+STACK_ITEM = "modding-stack"
+
+GAMEBANANA_PAGE = re.compile(r"gamebanana\.com/mods/(\d+)")
+
+
+def parse_item(handler, text):
+    """
+    The GameBanana mod ID an argument refers to
+
+    Accepts 12345, hmm://install/12345 and https://gamebanana.com/mods/12345.
+
+    Returns:
+        str or None: The mod ID, None if the argument is not an install request
+    """
+    text = text.strip()
+    if text.isdigit():
+        return text
+    if text.startswith("hmm://"):
+        info = handler.parse_gamebanana_url(text)
+        if info['action'] == 'install' and info['mod_id'] and info['mod_id'].isdigit():
+            return info['mod_id']
+        return None
+    match = GAMEBANANA_PAGE.search(text)
+    return match.group(1) if match else None
+
+
+def _result(item, code, error=None, **extra):
+    return {'item': item, 'status': STATUS_NAMES[code], 'code': code, 'error': error, **extra}
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    return fn(*args, **kwargs), round(time.perf_counter() - start, 3)
+
+
+class BatchInstaller:
+    """
+    Installs many mods, and optionally the modding stack, at once
+
+    Downloads run on a pool of network_jobs threads and extraction on a
+    separate pool of disk_jobs threads. An archive is handed to the disk
+    pool the moment it lands, so unpacking overlaps the downloads still
+    running, while a burst of finished downloads never puts more than
+    disk_jobs extractions on the disk at once. The modding stack goes
+    through the same pools: each component is fetched on the network pool
+    and staged on the disk pool, and the commit into the game folder is
+    one more disk job once all of them are staged.
+
+    Args:
+        handler: GameBananaHandler the mods are downloaded and installed with
+        network_jobs: Concurrent downloads (and API requests)
+        disk_jobs: Concurrent extractions
+        extract: Whether to extract mods or only download them
+        log: function(text) for progress lines, only called from the thread running run()
+        control: Optional TransferControl, cancel() stops everything still running
+    """
+
+    def __init__(self, handler, network_jobs=DEFAULT_NETWORK_JOBS, disk_jobs=DEFAULT_DISK_JOBS,
+                 extract=True, log=print, control=None):
+        self.handler = handler
+        self.network_jobs = max(1, network_jobs)
+        self.disk_jobs = max(1, disk_jobs)
+        self.extract = extract
+        self.log = log
+        self.control = control or TransferControl()
+
+    def run(self, items, game_path=None, osbep=None, beparch=None, pins=None, stack=None):
+        """
+        Install everything, Ctrl+C cancels what has not finished yet
+
+        Args:
+            items: Mod IDs / hmm:// URLs / GameBanana mod pages
+            game_path: Game folder, the modding stack is installed into it when given
+            osbep, beparch: modding_stack() flavour, see installer.detect_platform()
+            pins: Optional mod ID -> download_mod() pin, from lockfile.pins()
+            stack: Optional (name, url, subdir, version, sha256) tuples installed
+                instead of modding_stack(), from lockfile.stack_components()
+
+        Returns:
+            list[dict]: The modding stack first if installed, then one per item
+                in the order given: 'item', 'status', 'code', 'error' and
+                details ('mod_id', 'install_path', timings, ...)
+        """
+        self._results = {}
+        self._mods = {}
+        for item in items:
+            mod_id = parse_item(self.handler, item)
+            if mod_id is None:
+                self._results[item] = _result(item, INVALID, "Not a mod ID, hmm://install URL or GameBanana mod page")
+                self.log(f"✗ {item}: not a mod ID or install URL")
+            else:
+                # The same mod given twice is installed once
+                self._mods.setdefault(mod_id, []).append(item)
+
+        self._pins = pins or {}
+        self._pending = {}
+        self._download_times = {}
+        self._stack = None
+        with span("batch_install", mods=len(self._mods), stack=bool(game_path)) as trace, \
+                ThreadPoolExecutor(self.network_jobs, thread_name_prefix="net") as self._network, \
+                ThreadPoolExecutor(self.disk_jobs, thread_name_prefix="disk") as self._disk:
+            self._parent = trace
+            for mod_id in self._mods:
+                self._submit(self._network, "download", mod_id, self._download, mod_id)
+            if game_path:
+                if stack is None:
+                    stack = [(*component, None) for component in modding_stack(osbep, beparch)]
+                self._start_stack(game_path, stack)
+            try:
+                while self._pending:
+                    done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._finished(future)
+            except KeyboardInterrupt:
+                self.control.cancel()
+                for future in self._pending:
+                    future.cancel()
+                self.log("✗ Cancelled, waiting for running jobs to stop...")
+        # Jobs that were already running when cancelled still report how they ended
+        for future in list(self._pending):
+            if not future.cancelled():
+                self._finished(future)
+        if self._stack:
+            self._stack.close()
+
+        for mod_id, mod_items in self._mods.items():
+            for item in mod_items:
+                if item not in self._results:
+                    self._results[item] = _result(item, CANCELLED, "Cancelled", mod_id=mod_id)
+        if game_path and STACK_ITEM not in self._results:
+            self._results[STACK_ITEM] = _result(STACK_ITEM, CANCELLED, "Cancelled")
+
+        ordered = [self._results[STACK_ITEM]] if STACK_ITEM in self._results else []
+        return ordered + [self._results[item] for item in dict.fromkeys(items)]
+
+    # --- Scheduling ---
+
+    def _submit(self, pool, kind, key, fn, *args):
+        if self.control.cancelled:
+            return  # reported as cancelled once run() wraps up
+        future = pool.submit(_timed, fn, *args)
+        self._pending[future] = (kind, key, args)
+
+    def _finished(self, future):
+        kind, key, args = self._pending.pop(future)
+        try:
+            value, seconds = future.result()
+            error = None
+        except Exception as e:
+            value, seconds, error = None, None, e
+        getattr(self, f"_on_{kind.replace('-', '_')}")(key, args, value, seconds, error)
+
+    def _record(self, mod_id, result):
+        for item in self._mods[mod_id]:
+            self._results[item] = dict(result, item=item)
+
+    def _failure(self, default):
+        return CANCELLED if self.control.cancelled else default
+
+    # --- Mods ---
+
+    def _download(self, mod_id):
+        with span("batch.download", parent=self._parent, mod_id=mod_id):
+            return self.handler.download_mod(mod_id, control=self.control, pin=self._pins.get(mod_id))
+
+    def _install(self, mod_id, mod_file):
+        with span("batch.install", parent=self._parent, mod_id=mod_id):
+            return self.handler.install_mod(mod_file, self.extract, control=self.control)
+
+    def _on_download(self, mod_id, args, value, seconds, error):
+        success, result = value if value else (False, str(error))
+        if not success:
+            self.log(f"✗ {mod_id}: {result}")
+            self._record(mod_id, _result(None, self._failure(DOWNLOAD_FAILED), result,
+                                         mod_id=mod_id, download_seconds=seconds))
+            return
+        self.log(f"↓ {mod_id}: downloaded {result} in {seconds:.1f}s")
+        self._download_times[mod_id] = seconds
+        self._submit(self._disk, "install", mod_id, self._install, mod_id, result)
+
+    def _on_install(self, mod_id, args, value, seconds, error):
+        success, result = value if value else (False, str(error))
+        timing = {'download_seconds': self._download_times.get(mod_id), 'install_seconds': seconds}
+        if not success:
+            self.log(f"✗ {mod_id}: {result}")
+            self._record(mod_id, _result(None, self._failure(INSTALL_FAILED), result,
+                                         mod_id=mod_id, mod_file=args[1], **timing))
+            return
+        self.log(f"✓ {mod_id}: installed to {result}")
+        self._record(mod_id, _result(None, OK, mod_id=mod_id, mod_file=args[1], install_path=result, **timing))
+
+    # --- Modding stack ---
+
+    def _start_stack(self, game_path, components):
+        try:
+            self._stack = StackInstall(game_path, components, store=self.handler.store,
+                                       session=self.handler.session, control=self.control)
+        except GameFolderBusy as e:
+            self.log(f"✗ {STACK_ITEM}: {e}")
+            self._results[STACK_ITEM] = _result(STACK_ITEM, INSTALL_FAILED, str(e))
+            return
+        self._stack_start = time.perf_counter()
+        self._stack_staged = 0
+        for priority in range(len(components)):
+            self._submit(self._network, "stack-download", priority, self._stack_download, priority)
+
+    def _stack_download(self, priority):
+        with span("batch.stack.download", parent=self._parent, component=self._stack.components[priority][0]):
+            return self._stack.fetch(priority)[0]
+
+    def _stack_extract(self, priority, path):
+        with span("batch.stack.extract", parent=self._parent, component=self._stack.components[priority][0]):
+            self._stack.extract(priority, path)
+
+    def _stack_commit(self):
+        with span("batch.stack.commit", parent=self._parent):
+            return self._stack.commit()
+
+    def _stack_failed(self, error):
+        if STACK_ITEM in self._results:
+            return  # the other components only report being cancelled by the first failure
+        self._stack.control.cancel()
+        downloading = isinstance(error, StackInstallError) and error.downloading
+        self.log(f"✗ {STACK_ITEM}: {error}")
+        self._results[STACK_ITEM] = _result(
+            STACK_ITEM, self._failure(DOWNLOAD_FAILED if downloading else INSTALL_FAILED), str(error))
+
+    def _on_stack_download(self, priority, args, path, seconds, error):
+        if error is not None:
+            self._stack_failed(error)
+        elif STACK_ITEM not in self._results:
+            self._submit(self._disk, "stack-extract", priority, self._stack_extract, priority, path)
+
+    def _on_stack_extract(self, priority, args, value, seconds, error):
+        if error is not None:
+            self._stack_failed(error)
+            return
+        self._stack_staged += 1
+        if self._stack_staged == len(self._stack.components) and STACK_ITEM not in self._results:
+            self._submit(self._disk, "stack-commit", STACK_ITEM, self._stack_commit)
+
+    def _on_stack_commit(self, key, args, result, seconds, error):
+        if error is not None:
+            self._stack_failed(error)
+            return
+        seconds = time.perf_counter() - self._stack_start
+        self.log(f"✓ {STACK_ITEM}: {len(result['written'])} files written, "
+                 f"{len(result['unchanged'])} unchanged, {len(result['removed'])} removed in {seconds:.1f}s")
+        self._results[STACK_ITEM] = _result(
+            STACK_ITEM, OK, game_path=os.path.abspath(self._stack.game_path), written=len(result['written']),
+            unchanged=len(result['unchanged']), removed=len(result['removed']))
@@ -0,0 +1,453 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import threading
+import requests
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
+# tracing lives in hmm/, same setup as oneclick.py
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+from tracing import span, current
+
+
+CHUNK_SIZE = 65536
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+# Segmented downloads only pay off for big files
+SEGMENT_CONNECTIONS = 4
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+
+# A connection dropping mid-body, as raised by requests or by reading the raw urllib3 response
+CONNECTION_LOST = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+    urllib3.exceptions.ProtocolError,
+    urllib3.exceptions.ReadTimeoutError,
+)
+
+
+class DownloadError(Exception):
+    """A download failed in a way retrying will not fix (404, 403, bad range...)"""
+
+
+class RetryableError(DownloadError):
+    """A download failed in a way that may work on the next attempt"""
+
+
+class DownloadCancelled(DownloadError):
+    """The user cancelled the transfer"""
+
+
+class TransferControl:
+    """
+    Cancel / pause switch shared between a UI and a running transfer
+
+    Workers call checkpoint() between chunks: it blocks while paused and
+    raises DownloadCancelled once cancel() was called. Pausing keeps the
+    partial file, so a connection the server drops meanwhile is simply
+    resumed with a Range request afterwards.
+
+    A control made with a parent also pauses and cancels with it, while
+    cancelling the child leaves the parent running.
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()  # wake a paused worker so it can notice
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set() or bool(self.parent and self.parent.cancelled)
+
+    @property
+    def paused(self):
+        return not self._running.is_set() or bool(self.parent and self.parent.paused)
+
+    def checkpoint(self):
+        if self.parent:
+            self.parent.checkpoint()
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise DownloadCancelled("Cancelled")
+
+
+def backoff_delay(attempt, base=DEFAULT_BACKOFF, cap=MAX_BACKOFF):
+    """Exponential backoff with jitter, so parallel clients do not retry in lockstep"""
+    delay = min(cap, base * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+def _retrying(attempt_fn, position_fn, retries, label, control=None):
+    """
+    Run attempt_fn until it succeeds, backing off on RetryableError
+
+    position_fn tells how many bytes we have so far; an attempt that moved it
+    forward resets the failure count, so slow-but-progressing links never give up.
+    """
+    failures = 0
+    while True:
+        if control:
+            control.checkpoint()
+        before = position_fn()
+        try:
+            return attempt_fn()
+        except RetryableError as e:
+            failures = 0 if position_fn() > before else failures + 1
+            if failures > retries:
+                raise DownloadError(f"Giving up on {label}: {e}") from e
+            delay = backoff_delay(failures)
+            print(f"Retrying {label} in {delay:.1f}s ({e})", file=sys.stderr)
+            time.sleep(delay)
+
+
+def verify_checksum(path, checksum):
+    """
+    Check a file against an (algorithm, hexdigest) pair, deleting it on mismatch
+
+    Raises:
+        DownloadError: If the digest does not match
+    """
+    if not checksum or not checksum[1]:
+        return
+    algorithm, expected = checksum
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    if digest.hexdigest() != expected.lower():
+        os.remove(path)
+        raise DownloadError(f"{algorithm} mismatch for {os.path.basename(path)}: expected {expected}, got {digest.hexdigest()}")
+
+
+def _iter_body(response, chunk_size):
+    """
+    Body chunks as they arrive
+
+    iter_content() fills a whole chunk before handing it over, so when the
+    connection drops the bytes of the last, partial chunk are lost. read1()
+    returns whatever one read got, so everything received gets written
+    before the retry resumes from there.
+    """
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:
+        yield from response.iter_content(chunk_size=chunk_size)
+        return
+    while True:
+        chunk = read1(chunk_size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _load_part_meta(meta_path, url):
+    """Validators saved alongside a .part file, None if it belongs to another URL"""
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return meta if meta.get("url") == url else None
+
+
+def _save_part_meta(meta_path, url, response):
+    with open(meta_path, 'w') as f:
+        json.dump({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }, f)
+
+
+def _fetch(url, part_path, meta_path, session, timeout, chunk_size, progress_callback, control=None):
+    """
+    One attempt: resume the .part file from where it stopped
+
+    Returns:
+        int: Total size of the file once complete
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    meta = _load_part_meta(meta_path, url)
+    headers = {}
+    if offset and meta:
+        headers["Range"] = f"bytes={offset}-"
+        # Only resume if the file on the server is still the one we started
+        validator = meta.get("etag") or meta.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+    else:
+        offset = 0
+
+    # connect covers DNS, TCP/TLS and waiting for the headers, requests does not split them
+    try:
+        with span("http.connect", offset=offset) as s:
+            response = session.get(url, stream=True, timeout=timeout, headers=headers)
+            s.set(status=response.status_code)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        raise RetryableError(f"Network error: {e}") from e
+
+    with response:
+        if response.status_code == 416 and offset:
+            # Range not satisfiable: either we already have everything or the file shrank
+            content_range = response.headers.get("Content-Range", "")
+            total = content_range.rsplit("/", 1)[-1]
+            if total.isdigit() and int(total) == offset:
+                return offset
+            os.remove(part_path)
+            raise RetryableError("Partial download no longer matches the server, restarting")
+        if response.status_code in RETRYABLE_STATUS:
+            raise RetryableError(f"Server returned {response.status_code}")
+        if not response.ok:
+            raise DownloadError(f"Download failed: {response.status_code}")
+
+        if response.status_code == 206:
+            mode = 'ab'
+        else:
+            # Server ignored the range (or the file changed), start over
+            mode = 'wb'
+            offset = 0
+        _save_part_meta(meta_path, url, response)
+
+        length = int(response.headers.get("content-length", 0))
+        total = offset + length if length else 0
+        downloaded = offset
+
+        try:
+            with span("http.transfer") as s, open(part_path, mode) as f:
+                for chunk in _iter_body(response, chunk_size):
+                    if control:
+                        control.checkpoint()
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    s.add("bytes", len(chunk))
+                    if progress_callback:
+                        progress_callback(downloaded, total)
+        except CONNECTION_LOST as e:
+            raise RetryableError(f"Connection lost at {downloaded} bytes: {e}") from e
+
+        if total and downloaded != total:
+            raise RetryableError(f"Connection closed early: got {downloaded} of {total} bytes")
+        return downloaded
+
+
+def download(url, dest, session=None, progress_callback=None, retries=DEFAULT_RETRIES,
+             timeout=30, chunk_size=CHUNK_SIZE, control=None):
+    """
+    Download a URL to dest, resuming and retrying on flaky connections
+
+    Data goes to dest + '.part' and is renamed to dest once complete, so an
+    interrupted download picks up where it stopped on the next call (HTTP
+    Range, guarded by If-Range). Retryable failures back off exponentially
+    with jitter; the attempt counter resets whenever an attempt made progress.
+
+    Args:
+        url: URL to fetch
+        dest: Final path of the file
+        session: Optional requests.Session to reuse connections
+        progress_callback: Optional callback function(downloaded, total), total is 0 if unknown
+        retries: How many failed attempts in a row to tolerate
+        timeout: Connect/read timeout per attempt in seconds
+        chunk_size: Bytes per read
+        control: Optional TransferControl to pause or cancel with
+
+    Returns:
+        str: dest
+
+    Raises:
+        DownloadError: On fatal errors or when retries are exhausted
+        DownloadCancelled: If cancelled, the partial file is deleted
+    """
+    session = session or requests
+    part_path = dest + ".part"
+    meta_path = part_path + ".json"
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+
+    def position():
+        return os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+    try:
+        with span("download", url=url):
+            _retrying(
+                lambda: _fetch(url, part_path, meta_path, session, timeout, chunk_size, progress_callback, control),
+                position, retries, url, control,
+            )
+    except DownloadCancelled:
+        for path in (part_path, meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    os.replace(part_path, dest)
+    try:
+        os.remove(meta_path)
+    except FileNotFoundError:
+        pass
+    return dest
+
+
+def probe_ranges(url, session=None, timeout=30):
+    """
+    Ask the server for one byte to learn whether it serves ranges
+
+    Returns:
+        int or None: Total size of the file if ranges are supported
+    """
+    session = session or requests
+    try:
+        with span("http.probe", url=url):
+            response = session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        return None
+    with response:
+        if response.status_code != 206:
+            return None
+        total = response.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+        return int(total) if total.isdigit() else None
+
+
+def _fetch_segment(url, path, segment, session, timeout, chunk_size, on_bytes, control=None, parent=None):
+    """One attempt at the rest of a byte range; segment is a [position, end] list updated in place"""
+    start, end = segment
+    try:
+        with span("http.connect", parent=parent, start=start, end=end) as s:
+            response = session.get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=timeout)
+            s.set(status=response.status_code)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        raise RetryableError(f"Network error: {e}") from e
+
+    with response:
+        if response.status_code in RETRYABLE_STATUS:
+            raise RetryableError(f"Server returned {response.status_code}")
+        if response.status_code != 206:
+            raise DownloadError(f"Range request failed: {response.status_code}")
+
+        try:
+            with span("http.transfer", parent=parent) as s, open(path, 'r+b') as f:
+                f.seek(segment[0])
+                for chunk in _iter_body(response, chunk_size):
+                    if control:
+                        control.checkpoint()
+                    if not chunk:
+                        continue
+                    chunk = chunk[:end - segment[0] + 1]
+                    f.write(chunk)
+                    segment[0] += len(chunk)
+                    s.add("bytes", len(chunk))
+                    on_bytes(len(chunk))
+                    if segment[0] > end:
+                        break
+        except CONNECTION_LOST as e:
+            raise RetryableError(f"Connection lost at byte {segment[0]}: {e}") from e
+
+    if segment[0] <= end:
+        raise RetryableError(f"Connection closed early at byte {segment[0]} of {end}")
+
+
+def download_segmented(url, dest, session=None, progress_callback=None, connections=SEGMENT_CONNECTIONS,
+                       min_segment_size=MIN_SEGMENT_SIZE, checksum=None, retries=DEFAULT_RETRIES,
+                       timeout=30, chunk_size=CHUNK_SIZE, control=None):
+    """
+    Download a large file over several connections at once
+
+    The file is split into byte ranges that are fetched in parallel into a
+    preallocated file, each range retrying on its own. Servers without range
+    support, or files too small to split, fall back to download().
+
+    Args:
+        url: URL to fetch
+        dest: Final path of the file
+        session: Optional requests.Session to reuse connections
+        progress_callback: Optional callback function(downloaded, total)
+        connections: Maximum number of parallel range requests
+        min_segment_size: Smallest range worth its own connection
+        checksum: Optional (algorithm, hexdigest) the final file must match
+        retries: Failed attempts in a row tolerated per range
+        timeout: Connect/read timeout per request in seconds
+        chunk_size: Bytes per read
+        control: Optional TransferControl to pause or cancel with
+
+    Returns:
+        str: dest
+
+    Raises:
+        DownloadError: On fatal errors, exhausted retries or a checksum mismatch
+        DownloadCancelled: If cancelled, the partial file is deleted
+    """
+    session = session or requests
+    total = probe_ranges(url, session, timeout) if connections > 1 else None
+    count = min(connections, total // min_segment_size) if total else 0
+
+    if count < 2:
+        download(url, dest, session, progress_callback, retries, timeout, chunk_size, control)
+        with span("checksum", algorithm=checksum[0] if checksum else None):
+            verify_checksum(dest, checksum)
+        return dest
+
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    seg_path = dest + ".seg"
+    with open(seg_path, 'wb') as f:
+        f.truncate(total)
+
+    size = -(-total // count)
+    segments = [[start, min(start + size, total) - 1] for start in range(0, total, size)]
+
+    lock = threading.Lock()
+    downloaded = 0
+    # Stops the other segments as soon as one fails for good, without
+    # cancelling the caller's control (which may be shared with other downloads)
+    segments_control = TransferControl(parent=control)
+
+    def on_bytes(n):
+        nonlocal downloaded
+        with lock:
+            downloaded += n
+            current = downloaded
+        if progress_callback:
+            progress_callback(current, total)
+
+    def fetch(segment, parent):
+        try:
+            _retrying(
+                lambda: _fetch_segment(url, seg_path, segment, session, timeout, chunk_size, on_bytes,
+                                       segments_control, parent),
+                lambda: segment[0], retries, f"{url} [{segment[0]}-{segment[1]}]", segments_control,
+            )
+        except BaseException:
+            segments_control.cancel()
+            raise
+
+    with span("download", url=url, bytes=total, segments=len(segments)), \
+            ThreadPoolExecutor(max_workers=len(segments)) as pool:
+        futures = [pool.submit(fetch, segment, current()) for segment in segments]
+    errors = [future.exception() for future in futures if future.exception()]
+    if errors:
+        os.remove(seg_path)
+        # The segments stopped because of the first real failure report that one, not their cancellation
+        raise next((e for e in errors if not isinstance(e, DownloadCancelled)), errors[0])
+
+    os.replace(seg_path, dest)
+    with span("checksum", algorithm=checksum[0] if checksum else None):
+        verify_checksum(dest, checksum)
+    return dest
@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+from platformdirs import user_cache_dir
+
+
+# GameBanana spreads over a few hosts (api., gamebanana.com, files.)
+POOL_CONNECTIONS = 4
+# Enough for a segmented download plus a batch of metadata lookups per host
+POOL_MAXSIZE = 16
+DEFAULT_TTL = 10 * 60
+USER_AGENT = "HornetMM/0.1.0"
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+    """A keep-alive requests session so repeated calls reuse TCP+TLS connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+class CachedResponse:
+    """The small part of requests.Response the API callers use"""
+
+    def __init__(self, status_code, text, from_cache=False):
+        self.status_code = status_code
+        self.text = text
+        self.from_cache = from_cache
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class HttpCache:
+    """
+    Disk-backed cache for GET responses of the GameBanana API
+
+    Within the TTL a cached body is served without touching the network.
+    After that it is revalidated with If-None-Match / If-Modified-Since, so
+    an unchanged resource costs a 304 instead of a full response.
+    """
+
+    def __init__(self, root=None, ttl=DEFAULT_TTL):
+        self.root = root or os.path.join(user_cache_dir("HornetMM"), "http")
+        self.ttl = ttl
+        os.makedirs(self.root, exist_ok=True)
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(url, params=None):
+        if params:
+            url = f"{url}?{urllib.parse.urlencode(sorted(params.items()))}"
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def _load(self, key):
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        with self._lock:
+            self._memory[key] = entry
+        return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+
+    def get(self, session, url, params=None, timeout=10):
+        """
+        GET through the cache
+
+        Args:
+            session: requests.Session (or the requests module) to use on a miss
+            url: URL to fetch
+            params: Optional query parameters
+            timeout: Request timeout in seconds
+
+        Returns:
+            CachedResponse
+        """
+        key = self.cache_key(url, params)
+        entry = self._load(key)
+
+        if entry and time.time() - entry["stored_at"] < self.ttl:
+            return CachedResponse(200, entry["body"], from_cache=True)
+
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = session.get(url, params=params, headers=headers, timeout=timeout)
+
+        if response.status_code == 304 and entry:
+            entry["stored_at"] = time.time()
+            self._store(key, entry)
+            return CachedResponse(200, entry["body"], from_cache=True)
+
+        if response.status_code == 200:
+            self._store(key, {
+                "url": response.url,
+                "body": response.text,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "stored_at": time.time(),
+            })
+        return CachedResponse(response.status_code, response.text)
+
+    def invalidate(self, url, params=None):
+        key = self.cache_key(url, params)
+        with self._lock:
+            self._memory.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,680 @@
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import hashlib
+import zipfile
+import platform
+import tempfile
+import threading
+from filelock import FileLock, Timeout
+from platformdirs import user_cache_dir
+from concurrent.futures import ThreadPoolExecutor, as_completed
+# tracing lives in hmm/, same setup as oneclick.py
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+from tracing import span, record as record_span
+
+try:
+    from .artifacts import ArtifactStore
+    from .downloader import download, DownloadCancelled, TransferControl
+except ImportError:
+    from artifacts import ArtifactStore
+    from downloader import download, DownloadCancelled, TransferControl
+
+
+STAGE_DIR_NAME = ".hornetmm_stage"
+BACKUP_DIR_NAME = ".hornetmm_backup"
+MANIFEST_PATH = os.path.join(".hornetmm", "manifest.json")
+# Game files an install replaced, put back by uninstall()
+ORIGINALS_DIR = os.path.join(".hornetmm", "originals")
+# One lock per game folder, held while an install or uninstall changes it:
+# the stage and backup folders have fixed names so two at once (GUI and CLI)
+# would clash. Kept out of the game folder so a failed install leaves no trace
+LOCK_DIR = os.path.join(user_cache_dir("HornetMM"), "install_locks")
+COPY_BUFFER_SIZE = 1024 * 1024
+
+BEPINEX_VERSION = "5.4.23.4"
+MONOMOD_VERSION = "22.07.31.01"
+HKAPI_VERSION = "1.5.78.11833-74"
+
+# BepInEx, MonoMod and HKAPI are fetched side by side
+MAX_STACK_WORKERS = 3
+
+
+def modding_stack(osbep, beparch, versions=None):
+    """
+    The pinned BepInEx / MonoMod / HKAPI set
+
+    Args:
+        osbep, beparch: Platform, see detect_platform()
+        versions: Optional component name -> version, for the URLs of
+            releases other than the pinned ones
+
+    Returns:
+        list: (name, url, subdir, version) tuples, subdir being where the
+        archive goes relative to the game folder. Later entries win when
+        two archives ship the same file.
+    """
+    versions = versions or {}
+    bepinex = versions.get("BepInEx", BEPINEX_VERSION)
+    monomod = versions.get("MonoMod", MONOMOD_VERSION)
+    hkapi = versions.get("HKAPI", HKAPI_VERSION)
+    return [
+        ("BepInEx", f"https://github.com/BepInEx/BepInEx/releases/download/v{bepinex}/BepInEx_{osbep}_{beparch}_{bepinex}.zip", "", bepinex),
+        ("MonoMod", f"https://github.com/MonoMod/MonoMod/releases/download/v{monomod}/MonoMod-{monomod}-net50.zip", "BepInEx/MonoMod", monomod),
+        ("HKAPI", f"https://github.com/hk-modding/api/releases/download/{hkapi}/ModdingApi{osbep}.zip", "", hkapi),
+    ]
+
+
+def detect_platform():
+    """
+    The modding_stack() flavour for this machine
+
+    Returns:
+        tuple: (osbep, beparch), osbep is "unknown" on unsupported systems
+        and only "x64" builds exist for beparch
+    """
+    system = platform.system().lower()
+    if "windows" in system:
+        osbep = "win"
+    elif "darwin" in system:
+        osbep = "macos"
+    elif "linux" in system:
+        osbep = "linux"
+    else:
+        osbep = "unknown"
+    beparch = "x64" if "64" in platform.architecture()[0] else "x86"
+    return osbep, beparch
+
+
+def fetch_archive(store, url, zip_path, session=None, progress_callback=None, expected_digest=None, control=None):
+    """
+    An archive from the artifact store, downloading it to zip_path first if it is not there
+
+    With expected_digest (e.g. from a lockfile) any stored copy with that
+    SHA-256 is used whatever URL it came from, and a download that hashes
+    differently raises ValueError.
+
+    Returns:
+        tuple: (path of the stored archive, whether it was already stored)
+    """
+    cached = store.find(expected_digest, keys=[url]) if expected_digest else store.lookup(url)
+    if cached:
+        return cached, True
+    download(url, zip_path, session=session, progress_callback=progress_callback, control=control)
+    return store.add(url, zip_path, expected_digest=expected_digest), False
+
+
+def load_manifest(game_path):
+    """Read the install manifest of a game folder, empty if there is none"""
+    try:
+        with open(os.path.join(game_path, MANIFEST_PATH), 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+    manifest.setdefault("components", {})
+    return manifest
+
+
+def save_manifest(game_path, manifest):
+    path = os.path.join(game_path, MANIFEST_PATH)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".manifest-", suffix=".tmp")
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def _prune_empty_dirs(game_path, rel_paths):
+    """Remove now-empty parent folders of deleted files, never the game folder itself"""
+    parents = {os.path.dirname(rel) for rel in rel_paths if os.path.dirname(rel)}
+    for parent in sorted(parents, key=len, reverse=True):
+        path = os.path.join(game_path, parent)
+        while os.path.abspath(path) != game_path:
+            try:
+                os.rmdir(path)
+            except OSError:
+                break
+            path = os.path.dirname(path)
+
+
+class GameFolderBusy(Exception):
+    """Another install or uninstall is changing the same game folder"""
+
+
+def lock_game_folder(game_path):
+    """
+    Take the game folder's install lock, see LOCK_DIR
+
+    Args:
+        game_path: Game folder
+
+    Returns:
+        FileLock: The acquired lock, release() it when done
+
+    Raises:
+        GameFolderBusy: Someone else holds it
+    """
+    key = hashlib.sha256(os.path.normcase(os.path.abspath(game_path)).encode()).hexdigest()[:16]
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    # Not thread-local, BatchInstaller commits on another thread than the one that locked
+    lock = FileLock(os.path.join(LOCK_DIR, key + ".lock"), thread_local=False)
+    try:
+        lock.acquire(timeout=0)
+    except Timeout:
+        raise GameFolderBusy(f"Another install is running in {game_path}") from None
+    return lock
+
+
+def uninstall(game_path, components=None):
+    """
+    Remove exactly the files an earlier install recorded in its manifest
+
+    Game files the install had replaced (e.g. the vanilla
+    Assembly-CSharp.dll the HKAPI patches) are put back instead.
+
+    Args:
+        game_path: Game folder
+        components: Names to remove, all recorded components when None
+
+    Returns:
+        list: Relative paths that were deleted or restored to the original
+
+    Raises:
+        GameFolderBusy: An install or uninstall is running in game_path
+    """
+    game_path = os.path.abspath(game_path)
+    lock = lock_game_folder(game_path)
+    try:
+        return _uninstall(game_path, components)
+    finally:
+        lock.release()
+
+
+def _uninstall(game_path, components):
+    manifest = load_manifest(game_path)
+    names = list(manifest["components"]) if components is None else components
+    removed = []
+    restored = []
+    for name in names:
+        component = manifest["components"].pop(name, None)
+        if not component:
+            continue
+        for rel, record in component["files"].items():
+            dest = os.path.join(game_path, rel)
+            if record.get("original"):
+                try:
+                    os.replace(os.path.join(game_path, ORIGINALS_DIR, rel), dest)
+                    restored.append(rel)
+                    removed.append(rel)
+                    continue
+                except FileNotFoundError:
+                    pass  # the saved copy is gone, all we can do is remove ours
+            try:
+                os.remove(dest)
+                removed.append(rel)
+            except FileNotFoundError:
+                pass
+    _prune_empty_dirs(game_path, removed)
+    _prune_empty_dirs(game_path, [os.path.join(ORIGINALS_DIR, rel) for rel in restored])
+    save_manifest(game_path, manifest)
+    return removed
+
+
+class StagedInstall:
+    """
+    Incremental install of archives into a game folder
+
+    Every file an install puts down is recorded in a per-component manifest
+    (path, size, CRC32, SHA-256). On the next install only members whose
+    content differs from what is on disk are streamed into a staging folder
+    next to the game files, commit() renames them into place, and files the
+    new archives no longer ship are deleted. A repair or upgrade therefore
+    costs time proportional to the diff. If anything fails before commit()
+    the game folder is never touched, and if commit() itself fails (e.g. a
+    DLL locked by the running game) every file it replaced or deleted is
+    put back from a backup folder.
+
+    Files that were already in the game folder with the right content are
+    left alone and only recorded if an earlier install wrote them, so
+    uninstall() never deletes something HornetMM did not put there. A game
+    file an archive replaces is copied to ORIGINALS_DIR first and recorded
+    as 'original', uninstall() (or an install that stops shipping it) puts
+    it back.
+
+    The game folder's install lock is held from construction until
+    commit() or abort(), so one of them must always be called.
+
+    Raises:
+        GameFolderBusy: An install or uninstall is running in game_path
+    """
+
+    def __init__(self, game_path):
+        self.game_path = os.path.abspath(game_path)
+        self.stage_path = os.path.join(self.game_path, STAGE_DIR_NAME)
+        self.backup_path = os.path.join(self.game_path, BACKUP_DIR_NAME)
+        self._game_lock = lock_game_folder(self.game_path)
+        try:
+            self.manifest = load_manifest(self.game_path)
+
+            # Leftovers from an interrupted run are never valid, except a backup
+            # left by a commit that was killed halfway: put those files back
+            shutil.rmtree(self.stage_path, ignore_errors=True)
+            if os.path.isdir(self.backup_path):
+                self._restore_backup()
+            os.makedirs(self.stage_path)
+        except BaseException:
+            self._game_lock.release()
+            raise
+
+        self._lock = threading.Lock()
+        # rel path -> (priority, component, record, staged)
+        self._owners = {}
+        self._versions = {}
+        # Previous manifest records, by path, whichever component had them
+        self._previous = {
+            rel: record
+            for component in self.manifest["components"].values()
+            for rel, record in component["files"].items()
+        }
+
+    def _rel_path(self, subdir, member_name):
+        """Normalise a member path and refuse anything escaping the game folder (zip slip)"""
+        rel = os.path.normpath(os.path.join(subdir, member_name))
+        if os.path.isabs(rel) or rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            raise ValueError(f"Unsafe path in archive: {member_name}")
+        return rel.replace(os.sep, "/")
+
+    def _unchanged(self, rel, member):
+        """
+        Check whether the file on disk already matches a zip member
+
+        Returns:
+            dict or None: Manifest record for the file if it matches
+        """
+        path = os.path.join(self.game_path, rel)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if st.st_size != member.file_size:
+            return None
+
+        # Fast path: we wrote this file last time and nobody touched it since
+        previous = self._previous.get(rel)
+        if previous and previous["crc"] == member.CRC and previous["mtime"] == st.st_mtime:
+            return previous
+
+        # Unknown file of the right size, compare its CRC32 with the member's
+        crc = 0
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+                crc = zlib.crc32(chunk, crc)
+                digest.update(chunk)
+        if crc != member.CRC:
+            return None
+        return {"size": st.st_size, "crc": crc, "sha256": digest.hexdigest(), "mtime": st.st_mtime}
+
+    def extract(self, zip_path, subdir="", priority=0, component=None, version=None):
+        """
+        Stage the members of an archive that differ from the game folder
+
+        Safe to call from several threads at once. When two archives contain
+        the same file, the one with the higher priority is kept.
+
+        Returns:
+            int: Number of bytes written to the stage
+        """
+        component = component or os.path.basename(zip_path)
+        with self._lock:
+            self._versions[component] = version
+        written = 0
+
+        with span("extract", component=component) as trace, zipfile.ZipFile(zip_path, 'r') as zf:
+            for member in zf.infolist():
+                if member.is_dir():
+                    continue
+                rel = self._rel_path(subdir, member.filename)
+
+                with self._lock:
+                    owner = self._owners.get(rel)
+                    if owner and owner[0] > priority:
+                        continue
+                    self._owners[rel] = (priority, component, None, False)
+
+                record = self._unchanged(rel, member)
+                if record:
+                    with self._lock:
+                        if self._owners[rel][0] == priority:
+                            self._owners[rel] = (priority, component, record, False)
+                    trace.add("unchanged")
+                    continue
+
+                target = os.path.join(self.stage_path, rel)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_path = f"{target}.{priority}.tmp"
+                digest = hashlib.sha256()
+                with zf.open(member) as src, open(tmp_path, 'wb') as dst:
+                    for chunk in iter(lambda: src.read(COPY_BUFFER_SIZE), b''):
+                        digest.update(chunk)
+                        dst.write(chunk)
+                written += member.file_size
+                trace.add("bytes", member.file_size)
+                record = {"size": member.file_size, "crc": member.CRC, "sha256": digest.hexdigest()}
+
+                # Only move into place if no higher priority archive claimed it meanwhile
+                with self._lock:
+                    if self._owners[rel][0] == priority:
+                        os.replace(tmp_path, target)
+                        self._owners[rel] = (priority, component, record, True)
+                    else:
+                        os.remove(tmp_path)
+        return written
+
+    def _backup(self, rel):
+        """Move a game file out of the way so a failed commit can put it back"""
+        backup = os.path.join(self.backup_path, rel)
+        os.makedirs(os.path.dirname(backup), exist_ok=True)
+        os.replace(os.path.join(self.game_path, rel), backup)
+
+    def _keep_original(self, rel):
+        """Copy a game file HornetMM did not install aside before replacing it"""
+        original = os.path.join(self.game_path, ORIGINALS_DIR, rel)
+        os.makedirs(os.path.dirname(original), exist_ok=True)
+        shutil.copy2(os.path.join(self.game_path, rel), original)
+
+    def _put_back_original(self, rel):
+        """Copy a kept game file back into place, False if the copy is gone"""
+        original = os.path.join(self.game_path, ORIGINALS_DIR, rel)
+        if not os.path.isfile(original):
+            return False
+        shutil.copy2(original, os.path.join(self.game_path, rel))
+        return True
+
+    def _restore_backup(self, created=()):
+        """Undo a partial commit: drop the files it created and put back what it moved away"""
+        for rel in created:
+            try:
+                os.remove(os.path.join(self.game_path, rel))
+            except FileNotFoundError:
+                pass
+        restored = []
+        for root, _, files in os.walk(self.backup_path):
+            for name in files:
+                backup = os.path.join(root, name)
+                rel = os.path.relpath(backup, self.backup_path)
+                dest = os.path.join(self.game_path, rel)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(backup, dest)
+                restored.append(rel)
+        _prune_empty_dirs(self.game_path, created)
+        shutil.rmtree(self.backup_path, ignore_errors=True)
+        return restored
+
+    def commit(self):
+        """
+        Move staged files into the game folder and drop files that are gone
+
+        All or nothing: files are replaced one by one, so the previous
+        version of every replaced or deleted file is kept in a backup folder
+        until the manifest is saved, and restored if anything fails.
+
+        Returns:
+            dict: 'written', 'unchanged' and 'removed' relative paths
+        """
+        start = time.perf_counter()
+        result = {"written": [], "unchanged": [], "removed": []}
+        components = {name: {"version": version, "files": {}} for name, version in self._versions.items()}
+        created = []
+        # Originals copied aside by this commit, and originals put back in place of files we drop
+        kept = []
+        put_back = []
+
+        shutil.rmtree(self.backup_path, ignore_errors=True)
+        try:
+            for rel, (_, component, record, staged) in sorted(self._owners.items()):
+                dest = os.path.join(self.game_path, rel)
+                if staged:
+                    if os.path.lexists(dest):
+                        if rel not in self._previous:
+                            # A game file we are about to replace, uninstall() puts it back
+                            self._keep_original(rel)
+                            kept.append(rel)
+                        self._backup(rel)
+                    else:
+                        created.append(rel)
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    os.replace(os.path.join(self.stage_path, rel), dest)
+                    record = dict(record, mtime=os.stat(dest).st_mtime)
+                    result["written"].append(rel)
+                else:
+                    result["unchanged"].append(rel)
+                    if rel not in self._previous:
+                        # Already there before HornetMM, not ours to uninstall
+                        continue
+                if rel in kept or self._previous.get(rel, {}).get("original"):
+                    record = dict(record, original=True)
+                components[component]["files"][rel] = record
+
+            # Files a previous install of these components put down but the new archives lack
+            for name in components:
+                old = self.manifest["components"].get(name, {}).get("files", {})
+                for rel, record in old.items():
+                    if rel in self._owners or not os.path.lexists(os.path.join(self.game_path, rel)):
+                        continue
+                    self._backup(rel)
+                    if record.get("original") and self._put_back_original(rel):
+                        put_back.append(rel)
+                    result["removed"].append(rel)
+            _prune_empty_dirs(self.game_path, result["removed"])
+
+            self.manifest["components"].update(components)
+            self.manifest["updated"] = time.time()
+            save_manifest(self.game_path, self.manifest)
+        except BaseException:
+            # Originals put back are restored over by the backup, copies made now are not referenced
+            for rel in kept:
+                try:
+                    os.remove(os.path.join(self.game_path, ORIGINALS_DIR, rel))
+                except FileNotFoundError:
+                    pass
+            restored = self._restore_backup(created)
+            print(f"✗ Install failed, restored {len(restored)} files and removed {len(created)} new ones",
+                  file=sys.stderr)
+            raise
+        else:
+            shutil.rmtree(self.backup_path, ignore_errors=True)
+            for rel in put_back:
+                os.remove(os.path.join(self.game_path, ORIGINALS_DIR, rel))
+            _prune_empty_dirs(self.game_path, [os.path.join(ORIGINALS_DIR, rel) for rel in put_back])
+        finally:
+            shutil.rmtree(self.stage_path, ignore_errors=True)
+            self._game_lock.release()
+            record_span("commit", start, written=len(result["written"]), unchanged=len(result["unchanged"]),
+                        removed=len(result["removed"]))
+
+        return result
+
+    def abort(self):
+        """Throw the stage away without touching the game folder"""
+        if self._game_lock.is_locked:  # not after commit(), the stage may be someone else's by now
+            shutil.rmtree(self.stage_path, ignore_errors=True)
+            self._game_lock.release()
+
+
+class StackInstallError(Exception):
+    """
+    The modding stack could not be installed, the game folder is as it was
+
+    Attributes:
+        component: Name of the archive that failed, None if the commit did
+        downloading: True if fetching the archive failed, False if installing it did
+    """
+
+    def __init__(self, message, component=None, downloading=False):
+        super().__init__(message)
+        self.component = component
+        self.downloading = downloading
+
+
+class StackInstall:
+    """
+    One install of BepInEx, MonoMod and the HKAPI, in steps a caller can schedule
+
+    fetch() each component (network), extract() it as soon as it is there
+    (disk), then commit() once all are staged. Nothing touches the game
+    folder before commit(). close() always, it drops the temp folder and,
+    unless commit() succeeded, the stage. install_modding_stack() runs the
+    steps on a pool of its own, BatchInstaller on its network and disk pools.
+
+    Args:
+        game_path: Game folder
+        components: (name, url, subdir, version, sha256) tuples, sha256 None
+            when not pinned. modding_stack() for this machine when None
+        store: ArtifactStore the archives go through, the default one when None
+        session: Optional requests.Session to reuse connections
+        control: Optional TransferControl to pause or cancel with
+        progress_callback: Optional function(current, total, message) like
+            GameBananaHandler.handle_url's, current out of 100. message is
+            None for plain download progress
+
+    Raises:
+        GameFolderBusy: An install or uninstall is running in game_path
+    """
+
+    def __init__(self, game_path, components=None, store=None, session=None, control=None, progress_callback=None):
+        if components is None:
+            components = [(*component, None) for component in modding_stack(*detect_platform())]
+        self.game_path = game_path
+        self.components = list(components)
+        self.store = store or ArtifactStore()
+        self.session = session
+        # Cancelled by whoever sees the first failure so the other downloads stop early
+        self.control = TransferControl(parent=control)
+        self.progress_callback = progress_callback
+        self.stage = StagedInstall(game_path)
+        self.temp = tempfile.mkdtemp(prefix="hornetmm_stack_")
+        self._committed = False
+
+        self._lock = threading.Lock()
+        self._downloaded = {name: 0 for name, *_ in self.components}
+        self._totals = dict(self._downloaded)
+        self._shown = 0
+
+    def _report(self, message=None, name=None, done=None, total=None):
+        if not self.progress_callback:
+            return
+        with self._lock:
+            if name is not None:
+                self._downloaded[name], self._totals[name] = done, total
+            # Only meaningful once every server has told us its content-length
+            if all(self._totals.values()):
+                self._shown = max(self._shown, sum(self._downloaded.values()) * 90 // sum(self._totals.values()))
+            percent = self._shown
+        self.progress_callback(percent, 100, message)
+
+    def fetch(self, priority):
+        """
+        Get one component's archive from the store or the network
+
+        Returns:
+            tuple: (archive path, whether it was already in the store)
+        """
+        name, url, _, _, digest = self.components[priority]
+        try:
+            path, cached = fetch_archive(
+                self.store, url, os.path.join(self.temp, f"{name}.zip"), session=self.session,
+                progress_callback=lambda done, total: self._report(None, name, done, total),
+                expected_digest=digest, control=self.control)
+        except DownloadCancelled:
+            raise
+        except Exception as e:
+            raise StackInstallError(f"{name}: {e}", name, downloading=True) from e
+        size = os.path.getsize(path)
+        self._report(f"✓ {name} {'found in local cache' if cached else 'downloaded'}", name, size, size)
+        return path, cached
+
+    def extract(self, priority, path):
+        """Stage one fetched component"""
+        name, _, subdir, version, _ = self.components[priority]
+        self.control.checkpoint()
+        try:
+            self.stage.extract(path, subdir, priority, component=name, version=version)
+        except Exception as e:
+            raise StackInstallError(f"{name}: {e}", name) from e
+        self._report(f"✓ {name} extracted")
+
+    def commit(self):
+        """Move everything staged into the game folder, see StagedInstall.commit()"""
+        self.control.checkpoint()
+        self._report(f"Moving files to {self.game_path}...")
+        try:
+            result = self.stage.commit()
+        except Exception as e:
+            raise StackInstallError(f"Could not move files into {self.game_path}: {e}") from e
+        self._committed = True
+        if self.progress_callback:
+            self.progress_callback(100, 100, f"✓ {len(result['written'])} files written, "
+                                             f"{len(result['unchanged'])} unchanged, {len(result['removed'])} removed")
+        return result
+
+    def close(self):
+        self.control.cancel()
+        if not self._committed:
+            self.stage.abort()
+        shutil.rmtree(self.temp, ignore_errors=True)
+
+
+def install_modding_stack(game_path, control=None, progress_callback=None, components=None,
+                          store=None, session=None):
+    """
+    Download BepInEx, MonoMod and the HKAPI and install them into a game folder
+
+    Every archive is fetched through the artifact store at once and staged
+    as soon as it lands, on a pool of MAX_STACK_WORKERS threads. Nothing
+    touches the game folder until the final commit, so a failure or cancel
+    anywhere before it leaves the game as it was.
+
+    Args:
+        game_path, components, store, session, control, progress_callback:
+            See StackInstall
+
+    Returns:
+        dict: What StagedInstall.commit() returns
+
+    Raises:
+        StackInstallError: An archive could not be fetched or extracted, or the commit failed
+        GameFolderBusy: An install or uninstall is running in game_path
+        DownloadCancelled: control was cancelled
+    """
+    stack = StackInstall(game_path, components, store, session, control, progress_callback)
+    try:
+        with span("install_modding_stack", components=len(stack.components)) as trace, \
+                ThreadPoolExecutor(max_workers=MAX_STACK_WORKERS, thread_name_prefix="stack") as pool:
+
+            def fetch(priority):
+                with span("stack.download", parent=trace, component=stack.components[priority][0]):
+                    return stack.fetch(priority)[0]
+
+            def extract(priority, path):
+                with span("stack.extract", parent=trace, component=stack.components[priority][0]):
+                    stack.extract(priority, path)
+
+            downloads = {pool.submit(fetch, priority): priority for priority in range(len(stack.components))}
+            extractions = []
+            try:
+                for future in as_completed(downloads):
+                    extractions.append(pool.submit(extract, downloads[future], future.result()))
+                for future in extractions:
+                    future.result()
+            except BaseException:
+                stack.control.cancel()
+                raise
+        return stack.commit()
+    finally:
+        stack.close()
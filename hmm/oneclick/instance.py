@@ -0,0 +1,122 @@
+import os
+import json
+import hmac
+import socket
+import secrets
+import threading
+from platformdirs import user_cache_dir
+
+
+HANDOFF_TIMEOUT = 2
+INSTANCE_FILE = os.path.join(user_cache_dir("HornetMM"), "instance.json")
+
+
+def _read_instance_file(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def send_url(url, path=INSTANCE_FILE):
+    """
+    Hand a hmm:// URL to the instance that is already running
+
+    Returns:
+        bool: True if a running instance accepted it
+    """
+    info = _read_instance_file(path)
+    if not info:
+        return False
+    try:
+        with socket.create_connection(("127.0.0.1", info["port"]), timeout=HANDOFF_TIMEOUT) as sock:
+            sock.sendall(json.dumps({"token": info["token"], "url": url}).encode() + b"\n")
+            reply = sock.makefile('rb').readline()
+    except (OSError, KeyError, ValueError):
+        return False
+    return reply.strip() == b"ok"
+
+
+class InstanceServer:
+    """
+    Local socket the resident instance listens on for hmm:// URLs
+
+    Only processes that can read the instance file (same user) know the
+    token, so other local users cannot push URLs into our queue.
+    """
+
+    def __init__(self, on_url, path=INSTANCE_FILE):
+        self.on_url = on_url
+        self.path = path
+        self.token = secrets.token_hex(16)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, name="hmm-instance", daemon=True)
+
+    def publish(self):
+        """Write our port and token where later invocations look for them"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"port": self.port, "token": self.token, "pid": os.getpid()}, f)
+
+    def start(self):
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return  # socket closed
+            with conn:
+                conn.settimeout(HANDOFF_TIMEOUT)
+                try:
+                    message = json.loads(conn.makefile('rb').readline())
+                    if not hmac.compare_digest(str(message.get("token", "")), self.token):
+                        conn.sendall(b"denied\n")
+                        continue
+                    url = message["url"]
+                except (OSError, ValueError, KeyError):
+                    continue
+                conn.sendall(b"ok\n")
+            self.on_url(url)
+
+    def close(self):
+        """Stop listening and remove the instance file if it is still ours"""
+        self.sock.close()
+        from filelock import FileLock
+        with FileLock(self.path + ".lock"):
+            info = _read_instance_file(self.path)
+            if info and info.get("token") == self.token:
+                os.remove(self.path)
+
+
+def claim_instance(url, on_url, path=INSTANCE_FILE):
+    """
+    Become the resident instance, or hand url to the one already running
+
+    Checking for a running instance and publishing ourselves happen under one
+    file lock, so two clicks at the same moment cannot both become primary.
+
+    Args:
+        url: The hmm:// URL this process was started with
+        on_url: Called (from a background thread) with every URL handed to us later
+
+    Returns:
+        InstanceServer or None: The started server, or None if url was handed off
+    """
+    # filelock pulls in asyncio (~50 ms), keep it off the send_url() fast path
+    from filelock import FileLock
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with FileLock(path + ".lock"):
+        if url and send_url(url, path):
+            return None
+        server = InstanceServer(on_url, path)
+        server.publish()
+    server.start()
+    return server
@@ -0,0 +1,273 @@
+"""
+Modpack lockfiles: a setup pinned down to the exact bytes, restorable anywhere
+
+A lockfile is zstandard-compressed JSON listing every GameBanana mod with the
+_aFiles entry that was installed and its SHA-256, plus the BepInEx / MonoMod /
+HKAPI versions, URLs and SHA-256s. Restoring fetches exactly those files
+(anything already in the artifact store is reused by content) and fails any
+file that hashes differently.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import zstandard
+
+# tracing and modindex live in hmm/, same setup as oneclick.py
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+try:
+    from .artifacts import sha256_file
+    from .installer import fetch_archive, load_manifest, modding_stack, detect_platform
+except ImportError:
+    from artifacts import sha256_file
+    from installer import fetch_archive, load_manifest, modding_stack, detect_platform
+from modindex import GAMEBANANA_DIR
+from tracing import span
+
+
+LOCKFILE_FORMAT = "hornetmm-modpack"
+LOCKFILE_VERSION = 1
+LOCKFILE_EXTENSION = ".hmmlock"
+
+# The file is a few KB at most, so compressing hard costs nothing
+ZSTD_LEVEL = 19
+
+# The parts of an _aFiles entry worth keeping, the rest is descriptions and scan results
+FILE_FIELDS = ("_idRow", "_sFile", "_nFilesize", "_sDownloadUrl", "_sMd5Checksum")
+
+# What every locked modding stack component lists
+STACK_FIELDS = ("name", "url", "subdir", "version", "sha256")
+
+# Concurrent DownloadPage lookups / downloads while locking
+MAX_LOCK_WORKERS = 8
+
+
+class LockfileError(Exception):
+    """The lockfile is unreadable, or the setup could not be pinned"""
+
+
+# --- Reading and writing ---
+
+
+def write_lockfile(path, lock):
+    """Compress and atomically write a lock made by create_lock()"""
+    data = json.dumps(lock, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".lock-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return len(data)
+
+
+def read_lockfile(path):
+    """
+    Load and check a lockfile
+
+    Plain JSON is accepted too, for locks that were decompressed to be edited.
+
+    Raises:
+        LockfileError: Not a lockfile, a malformed one, or one made by a newer HornetMM
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.lstrip().startswith(b"{"):
+            data = zstandard.ZstdDecompressor().decompress(data)
+        lock = json.loads(data)
+    except (OSError, zstandard.ZstdError, ValueError) as e:
+        raise LockfileError(f"Could not read {path}: {e}") from e
+
+    if not isinstance(lock, dict) or lock.get("format") != LOCKFILE_FORMAT:
+        raise LockfileError(f"{path} is not a HornetMM lockfile")
+    version = lock.get("version", 0)
+    if not isinstance(version, int) or isinstance(version, bool):
+        raise LockfileError(f"{path} has an invalid lockfile version: {version!r}")
+    if version > LOCKFILE_VERSION:
+        raise LockfileError(f"{path} needs a newer HornetMM (lockfile version {version})")
+    if not isinstance(lock.get("mods", []), list):
+        raise LockfileError(f"{path} has a broken mod list")
+    for mod in lock.get("mods", []):
+        if not isinstance(mod, dict) or not isinstance(mod.get("file", {}), dict) \
+                or not str(mod.get("id", "")).isdigit() or not mod.get("sha256") \
+                or not mod.get("file", {}).get("_sDownloadUrl"):
+            raise LockfileError(f"{path} has a broken mod entry: {mod}")
+    stack = lock.get("stack")
+    if stack is not None:
+        if not isinstance(stack, dict) or not all(isinstance(stack.get(key), str) for key in ("os", "arch")) \
+                or not isinstance(stack.get("components"), list):
+            raise LockfileError(f"{path} has a broken modding stack: {stack}")
+        for component in stack["components"]:
+            if not isinstance(component, dict) or not all(isinstance(component.get(key), str) for key in STACK_FIELDS):
+                raise LockfileError(f"{path} has a broken modding stack entry: {component}")
+    lock.setdefault("mods", [])
+    lock.setdefault("stack", None)
+    return lock
+
+
+def pins(lock):
+    """Mod ID -> download_mod(pin=...) for every mod of a lock"""
+    return {str(mod["id"]): {"file": mod["file"], "sha256": mod["sha256"]} for mod in lock["mods"]}
+
+
+def stack_components(lock):
+    """
+    The locked modding stack as BatchInstaller takes it
+
+    Returns:
+        list or None: (name, url, subdir, version, sha256) tuples, None if
+        the lock has no modding stack
+    """
+    if not lock.get("stack"):
+        return None
+    return [tuple(c[key] for key in STACK_FIELDS) for c in lock["stack"]["components"]]
+
+
+# --- Locking ---
+
+
+def installed_mods(mods_dir):
+    """IDs of the GameBanana mods downloaded or extracted into mods_dir, in ID order"""
+    try:
+        entries = os.listdir(mods_dir)
+    except FileNotFoundError:
+        return []
+    found = set()
+    for entry in entries:
+        name, ext = os.path.splitext(entry)
+        match = GAMEBANANA_DIR.match(name if ext == ".zip" else entry)
+        if match:
+            found.add(match.group(1))
+    return sorted(found, key=int)
+
+
+def _file_digests(path):
+    """(md5, sha256) of a file in one read"""
+    md5, sha256 = hashlib.md5(), hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+            sha256.update(chunk)
+    return md5.hexdigest(), sha256.hexdigest()
+
+
+def _lock_mod(handler, mod_id, temp, log):
+    """
+    Pin one mod to the _aFiles entry that is installed
+
+    The installed download is recognised by the artifact store (which URL its
+    content was stored under) or by the MD5 GameBanana lists for
+    mod_<id>.zip. A mod whose installed file is gone from GameBanana, or that
+    was never downloaded here, is pinned to the newest file, downloading it
+    once to learn its SHA-256.
+    """
+    success, files = handler.get_download_files(mod_id)
+    if not success:
+        raise LockfileError(f"{mod_id}: {files}")
+    store = handler.store
+
+    entry = digest = None
+    installed = store.digest_for(handler._store_key(mod_id))
+    if installed:
+        entry = next((f for f in files if store.digest_for(f.get("_sDownloadUrl")) == installed), None)
+        digest = installed if entry else None
+
+    local = os.path.join(handler.install_path, f"mod_{mod_id}.zip")
+    if entry is None and os.path.isfile(local):
+        md5, local_digest = _file_digests(local)
+        entry = next((f for f in files if (f.get("_sMd5Checksum") or "").lower() == md5), None)
+        digest = local_digest if entry else None
+
+    if entry is None:
+        if installed or os.path.isfile(local):
+            log(f"⚠️ {mod_id}: the installed file is no longer on GameBanana, locking the newest one")
+        entry = files[0]
+        url = entry.get("_sDownloadUrl")
+        if not url:
+            raise LockfileError(f"{mod_id}: no download URL found")
+        path, _ = fetch_archive(store, url, os.path.join(temp, f"mod_{mod_id}.zip"), session=handler.session)
+        digest = store.digest_for(url) or sha256_file(path)
+
+    return {
+        "id": mod_id,
+        "file": {key: entry[key] for key in FILE_FIELDS if key in entry},
+        "sha256": digest,
+    }
+
+
+def _lock_stack(handler, game_path, temp, log):
+    """
+    The modding stack pinned by URL and SHA-256, None if it is not installed in game_path
+
+    Each component is locked at the version the game folder's manifest
+    records, which may be an older release than this HornetMM installs.
+    """
+    installed = load_manifest(game_path)["components"]
+    if not installed:
+        return None
+    osbep, beparch = detect_platform()
+    versions = {name: component["version"] for name, component in installed.items() if component.get("version")}
+    components = []
+    for name, url, subdir, version in modding_stack(osbep, beparch, versions):
+        if name not in versions:
+            log(f"⚠️ {name} is not installed, locking {version} which this HornetMM installs")
+        digest = handler.store.digest_for(url)
+        if not digest:
+            path, _ = fetch_archive(handler.store, url, os.path.join(temp, f"{name}.zip"), session=handler.session)
+            digest = handler.store.digest_for(url) or sha256_file(path)
+        components.append({"name": name, "version": version, "url": url, "subdir": subdir, "sha256": digest})
+    return {"os": osbep, "arch": beparch, "components": components}
+
+
+def create_lock(handler, mod_ids=None, game_path=None, log=print):
+    """
+    Pin the current setup
+
+    Args:
+        handler: GameBananaHandler whose install_path holds the mods
+        mod_ids: Mods to lock, every GameBanana mod in install_path when None
+        game_path: Game folder to lock the modding stack of, None for mods only
+        log: function(text) for warnings
+
+    Returns:
+        dict: The lock, for write_lockfile()
+
+    Raises:
+        LockfileError: A mod or stack archive could not be pinned
+    """
+    mod_ids = installed_mods(handler.install_path) if mod_ids is None else [str(m) for m in mod_ids]
+    temp = tempfile.mkdtemp(prefix="hornetmm_lock_")
+    try:
+        with span("lockfile.create", mods=len(mod_ids)), \
+                ThreadPoolExecutor(max_workers=MAX_LOCK_WORKERS) as pool:
+            stack = pool.submit(_lock_stack, handler, game_path, temp, log) if game_path else None
+            mods = list(pool.map(lambda mod_id: _lock_mod(handler, mod_id, temp, log), mod_ids))
+            stack = stack.result() if stack else None
+    except LockfileError:
+        raise
+    except Exception as e:
+        raise LockfileError(str(e)) from e
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+    return {
+        "format": LOCKFILE_FORMAT,
+        "version": LOCKFILE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "mods": mods,
+        "stack": stack,
+    }
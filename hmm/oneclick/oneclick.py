@@ -1,20 +1,56 @@
 import sys
 import os
+
+# hmm:// clicks handed to an already running instance never need requests or
+# the GUI stack, so try that before the heavy imports below
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1].startswith("hmm://"):
+    from instance import send_url
+    if send_url(sys.argv[1]):
+        print("✓ Sent to the running HornetMM instance")
+        sys.exit(0)
+
 import urllib.parse
 import requests
 import zipfile
+import shutil
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 sys.path.append(parent_dir)
+from tracing import span, enable_from_env
+from modindex import LOCAL_MODS_DIR
+
+try:
+    from .artifacts import ArtifactStore
+    from .downloader import download_segmented, DownloadError, DownloadCancelled
+    from .httpcache import HttpCache, create_session
+except ImportError:
+    # Running this file directly as a script
+    from artifacts import ArtifactStore
+    from downloader import download_segmented, DownloadError, DownloadCancelled
+    from httpcache import HttpCache, create_session
+
 
+# Upper bound on concurrent metadata lookups per handler
+MAX_INFO_WORKERS = 8
 
 
 class GameBananaHandler:
     """Handler for GameBanana 1-click install functionality"""
     
-    def __init__(self, install_path=fr'{os.path.abspath}\mods'):
+    def __init__(self, install_path=LOCAL_MODS_DIR, store=None, session=None, cache=None):
         self.install_path = install_path
         os.makedirs(self.install_path, exist_ok=True)
+        # Shared with the BepInEx installer, so downloads are reused across both
+        self.store = store or ArtifactStore()
+        # One keep-alive session for every call, API responses revalidated via ETag
+        self.session = session or create_session()
+        self.cache = cache or HttpCache()
+        # Batch metadata lookups share one bounded pool and collapse duplicate IDs
+        self._info_pool = None
+        self._info_inflight = {}
+        self._info_lock = threading.Lock()
     
     def register_protocol_handler(self, script_path=None):
         """Register hmm:// protocol handler"""
@@ -42,7 +78,7 @@ class GameBananaHandler:
                 winreg.CloseKey(command_key)
                 winreg.CloseKey(key)
                 
-                print(f"Registered: {command}")
+                print(f"Registered: {command}", file=sys.stderr)
                 return True, "Protocol handler registered successfully!"
             except Exception as e:
                 return False, f"Error registering protocol: {e}"
@@ -96,7 +132,7 @@ class GameBananaHandler:
                 'fields': 'name,Owner().name,screenshots,likes,views,downloads,description,Game().name,Rootcategory().name,date,Files().aFiles()'
             }
             
-            response = requests.get(api_url, params=params, timeout=10)
+            response = self.cache.get(self.session, api_url, params=params, timeout=10)
             
             if not response.ok:
                 return False, f"API request failed: {response.status_code}"
@@ -126,79 +162,172 @@ class GameBananaHandler:
         except Exception as e:
             return False, f"Error fetching mod info: {e}"
     
-    def download_mod(self, mod_id, progress_callback=None):
+    def _submit_mod_info(self, mod_id):
+        """Start a lookup, or join the one already running for this ID"""
+        with self._info_lock:
+            future = self._info_inflight.get(mod_id)
+            if future is not None:
+                return future
+            if self._info_pool is None:
+                self._info_pool = ThreadPoolExecutor(max_workers=MAX_INFO_WORKERS, thread_name_prefix="mod-info")
+            future = self._info_pool.submit(self.get_mod_info, mod_id)
+            self._info_inflight[mod_id] = future
+
+        def forget(done):
+            with self._info_lock:
+                if self._info_inflight.get(mod_id) is done:
+                    del self._info_inflight[mod_id]
+
+        future.add_done_callback(forget)
+        return future
+    
+    def get_mods_info(self, mod_ids):
+        """
+        Get information about many mods concurrently
+        
+        At most MAX_INFO_WORKERS requests run at once, repeated IDs (in this
+        call or one running on another thread) share a single request, and
+        results are yielded as soon as each one arrives.
+        
+        Args:
+            mod_ids: Iterable of GameBanana mod IDs
+        
+        Yields:
+            tuple: (mod_id, success, mod_info_dict_or_error_message)
+        """
+        futures = {}
+        for mod_id in dict.fromkeys(str(mod_id) for mod_id in mod_ids):
+            futures[self._submit_mod_info(mod_id)] = mod_id
+        
+        for future in as_completed(futures):
+            mod_id = futures[future]
+            try:
+                success, result = future.result()
+            except Exception as e:
+                success, result = False, f"Error fetching mod info: {e}"
+            yield mod_id, success, result
+    
+    def get_download_files(self, mod_id):
+        """
+        The downloadable files of a mod, newest first as GameBanana lists them
+        
+        Args:
+            mod_id: The GameBanana mod ID
+        
+        Returns:
+            tuple: (success, list of _aFiles entries or error message)
+        """
+        api_url = f"https://gamebanana.com/apiv11/Mod/{mod_id}/DownloadPage"
+        
+        with span("gamebanana.download_page", mod_id=mod_id) as trace:
+            response = self.cache.get(self.session, api_url, timeout=10)
+            trace.set(status=response.status_code)
+        
+        if not response.ok:
+            return False, f"API request failed: {response.status_code}"
+        
+        data = response.json()
+        files = data.get('_aFiles', [])
+        
+        if not files or not isinstance(files, list) or len(files) == 0:
+            return False, "No files found in API response"
+        
+        if not all(isinstance(entry, dict) for entry in files):
+            return False, "Invalid file data format"
+        
+        return True, files
+    
+    def download_mod(self, mod_id, progress_callback=None, control=None, pin=None):
         """
         Download mod from GameBanana
         
         Args:
             mod_id: The GameBanana mod ID
             progress_callback: Optional callback function(current, total, message)
+            control: Optional TransferControl to pause or cancel the download
+            pin: Optional {'file': _aFiles entry, 'sha256': digest} from a lockfile,
+                downloads exactly that file and fails unless it hashes to the digest
         
         Returns:
             tuple: (success, filename_or_error_message)
         """
         try:
-            api_url = f"https://gamebanana.com/apiv11/Mod/{mod_id}/DownloadPage"
+            filename = f"mod_{mod_id}.zip"
+            filepath = os.path.join(self.install_path, filename)
+            
+            # Already downloaded this mod before? Skip the network entirely.
+            # A pinned file is found by content, wherever it was downloaded from
+            if pin:
+                cached = self.store.find(pin['sha256'], keys=[self._store_key(mod_id)])
+            else:
+                cached = self.store.lookup(self._store_key(mod_id))
+            if cached:
+                self.store.materialize(cached, filepath)
+                if progress_callback:
+                    progress_callback(90, 100, "Using cached download")
+                return True, filename
             
             if progress_callback:
                 progress_callback(0, 100, f"Fetching mod info...")
             
-            response = requests.get(api_url, timeout=10)
-            
-            if not response.ok:
-                return False, f"API request failed: {response.status_code}"
-            
-            data = response.json()
-            files = data.get('_aFiles', [])
-            
-            if not files or not isinstance(files, list) or len(files) == 0:
-                return False, "No files found in API response"
-            
-            first_file = files[0]
-            if not isinstance(first_file, dict):
-                return False, "Invalid file data format"
+            if pin:
+                first_file = pin['file']
+            else:
+                success, files = self.get_download_files(mod_id)
+                if not success:
+                    return False, files
+                first_file = files[0]
             
             download_url = first_file.get('_sDownloadUrl')
             if not download_url:
                 return False, "No download URL found"
             
+            cached = None if pin else self.store.lookup(download_url)
+            if cached:
+                self.store.alias(download_url, self._store_key(mod_id))
+                self.store.materialize(cached, filepath)
+                if progress_callback:
+                    progress_callback(90, 100, "Using cached download")
+                return True, filename
+            
             if progress_callback:
                 progress_callback(10, 100, "Starting download...")
             
-            # Download with progress tracking
-            file_response = requests.get(download_url, stream=True, timeout=30)
+            def on_progress(downloaded, total_size):
+                if progress_callback and total_size > 0:
+                    progress = 10 + int((downloaded / total_size) * 80)
+                    progress_callback(progress, 100, f"Downloading... {downloaded}/{total_size} bytes")
             
-            if not file_response.ok:
-                return False, f"Download failed: {file_response.status_code}"
+            # Big mod packs are fetched over several connections when the server
+            # allows ranges, otherwise it resumes from mod_<id>.zip.part and
+            # retries if the connection drops
+            checksum = ('md5', first_file.get('_sMd5Checksum'))
+            download_segmented(download_url, filepath, session=self.session,
+                               progress_callback=on_progress, checksum=checksum, control=control)
             
-            filename = f"mod_{mod_id}.zip"
-            filepath = os.path.join(self.install_path, filename)
-            
-            # Get file size for progress
-            total_size = int(file_response.headers.get('content-length', 0))
-            downloaded = 0
-            
-            with open(filepath, 'wb') as f:
-                for chunk in file_response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        if progress_callback and total_size > 0:
-                            progress = 10 + int((downloaded / total_size) * 80)
-                            progress_callback(progress, 100, f"Downloading... {downloaded}/{total_size} bytes")
+            with span("store.add"):
+                stored = self.store.add(download_url, filepath, aliases=[self._store_key(mod_id)],
+                                        expected_digest=pin['sha256'] if pin else None)
+                self.store.materialize(stored, filepath)
             
             if progress_callback:
                 progress_callback(90, 100, "Download complete!")
             
             return True, filename
             
+        except DownloadError as e:
+            return False, str(e)
         except requests.exceptions.RequestException as e:
             return False, f"Network error: {e}"
         except Exception as e:
             return False, f"Error downloading mod: {e}"
     
-    def install_mod(self, mod_file, extract=True, progress_callback=None):
+    @staticmethod
+    def _store_key(mod_id):
+        """Artifact store key that remembers which download belongs to a mod"""
+        return f"gamebanana:mod/{mod_id}"
+    
+    def install_mod(self, mod_file, extract=True, progress_callback=None, control=None):
         """
         Install/extract the downloaded mod
         
@@ -206,6 +335,7 @@ class GameBananaHandler:
             mod_file: Filename of the downloaded mod
             extract: Whether to extract the zip file
             progress_callback: Optional callback function(current, total, message)
+            control: Optional TransferControl, cancelling removes a partial extraction
         
         Returns:
             tuple: (success, extract_path_or_error_message)
@@ -226,10 +356,20 @@ class GameBananaHandler:
                 progress_callback(90, 100, "Extracting...")
             
             extract_path = os.path.join(self.install_path, f"mod_{mod_file.replace('.zip', '')}")
+            existed = os.path.exists(extract_path)
             os.makedirs(extract_path, exist_ok=True)
             
-            with zipfile.ZipFile(filepath, 'r') as zip_ref:
-                zip_ref.extractall(extract_path)
+            try:
+                with span("extract", archive=mod_file) as trace, zipfile.ZipFile(filepath, 'r') as zip_ref:
+                    for member in zip_ref.infolist():
+                        if control:
+                            control.checkpoint()
+                        zip_ref.extract(member, extract_path)
+                        trace.add("bytes", member.file_size)
+            except DownloadCancelled:
+                if not existed:
+                    shutil.rmtree(extract_path, ignore_errors=True)
+                return False, "Cancelled"
             
             if progress_callback:
                 progress_callback(100, 100, "Installation complete!")
@@ -239,7 +379,7 @@ class GameBananaHandler:
         except Exception as e:
             return False, f"Error installing mod: {e}"
     
-    def handle_url(self, url, progress_callback=None, extract=True):
+    def handle_url(self, url, progress_callback=None, extract=True, control=None):
         """
         Complete handler for HMM URL
         
@@ -247,6 +387,7 @@ class GameBananaHandler:
             url: HMM URL (hmm://install/12345)
             progress_callback: Optional callback function(current, total, message)
             extract: Whether to extract the downloaded mod
+            control: Optional TransferControl to pause or cancel the install
         
         Returns:
             tuple: (success, result_dict_or_error_message)
@@ -259,17 +400,20 @@ class GameBananaHandler:
         if info['action'] != 'install' or not info['mod_id']:
             return False, f"Unsupported action or missing mod ID"
         
-        # Download
-        success, result = self.download_mod(info['mod_id'], progress_callback)
-        if not success:
-            return False, result
-        
-        mod_file = result
-        
-        # Install
-        success, result = self.install_mod(mod_file, extract, progress_callback)
-        if not success:
-            return False, result
+        with span("handle_url", mod_id=info['mod_id']) as trace:
+            # Download
+            success, result = self.download_mod(info['mod_id'], progress_callback, control)
+            if not success:
+                trace.set(error=result)
+                return False, result
+            
+            mod_file = result
+            
+            # Install
+            success, result = self.install_mod(mod_file, extract, progress_callback, control)
+            if not success:
+                trace.set(error=result)
+                return False, result
         
         return True, {
             'mod_id': info['mod_id'],
@@ -282,18 +426,19 @@ class GameBananaHandler:
 def main():
     import sys  # Move this to the top of the function
     
+    enable_from_env()
+    
     print("GameBanana 1-Click Handler")
     print("-" * 40)
     
-    import os
-    handler = GameBananaHandler(install_path=fr'{os.path.abspath}\mods')
-    
     if len(sys.argv) == 1:
         print("\nUsage:")
         print("  Register protocol handler: python script.py --register")
         print("  Handle URL: python script.py hmm://install/12345")
         return
     
+    handler = GameBananaHandler()
+    
     if sys.argv[1] == '--register':
         success, message = handler.register_protocol_handler()
         print(message)
@@ -317,31 +462,34 @@ def main():
                 sys.path.insert(0, parent_dir)
             
     
+            # Already running? Hand the URL over instead of starting another GUI
+            from oneclick.instance import send_url
+            if send_url(hmm_url):
+                print("✓ Sent to the running HornetMM instance")
+                return
+            
             import customtkinter
             
-            # Parse URL and get mod info
+            # Parse URL
             info = handler.parse_gamebanana_url(hmm_url)
             
             if info['action'] != 'install' or not info['mod_id']:
                 print(f"✗ Failed: Unsupported action or missing mod ID")
                 return
             
-            print(f"Fetching mod info for ID: {info['mod_id']}...")
-            success, mod_info = handler.get_mod_info(info['mod_id'])
+            print(f"Opening install dialog for ID: {info['mod_id']}...")
             
-            if success:
-                print(f"✓ Found mod: {mod_info['name']}")
-                print(f"Opening install dialog...")
-                
-                # Create GUI with InstallDialog
-                from menus.ModManagement import InstallDialog
-                root = customtkinter.CTk()
-                root.withdraw()
-                dialog = InstallDialog(root, mod_info, hmm_url)
-                dialog.mainloop()
+            # Become the resident instance, later clicks are queued into this process
+            from menus.ModManagement import OneClickHost
+            root = customtkinter.CTk()
+            root.withdraw()
+            host = OneClickHost(root, handler)
+            if host.claim(hmm_url):
+                root.mainloop()
+                host.shutdown()
             else:
-                print(f"✗ Failed to fetch mod info: {mod_info}")
-                input("\nPress Enter to exit...")
+                print("✓ Sent to the running HornetMM instance")
+                root.destroy()
                 
         except ImportError as e:
             print(f"✗ Error importing ModManagement: {e}")
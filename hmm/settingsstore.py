@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import time
+import select
+import struct
+import atexit
+import tempfile
+import threading
+from filelock import FileLock
+
+
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.json")
+
+# Settings defaults
+DEFAULTS = {
+    "theme": "system",
+    "hollowknightpath": "",
+    "silksongpath": "",
+}
+
+# Writes arriving within this window are merged into one
+WRITE_DELAY = 0.2
+# Used when inotify is not available (Windows, macOS)
+POLL_INTERVAL = 1.0
+
+
+class _InotifyWatcher:
+    """Wake up when a file in a directory is rewritten or renamed into place (Linux only)"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, path):
+        import ctypes
+        import ctypes.util
+
+        self.name = os.path.basename(path).encode()
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if self._libc.inotify_add_watch(self.fd, os.path.dirname(path).encode(), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    def wait(self, timeout):
+        """Block until our file changed (True) or the timeout passed (False)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        changed = False
+        data = os.read(self.fd, 65536)
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            changed = changed or name == self.name
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingWatcher:
+    """Fallback watcher comparing the file's mtime and size"""
+
+    def __init__(self, path):
+        self.path = path
+        self._last = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return None
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, POLL_INTERVAL))
+        current = self._stat()
+        changed, self._last = current != self._last, current
+        return changed
+
+    def close(self):
+        pass
+
+
+class SettingsStore:
+    """
+    In-memory settings shared by every window, backed by settings.json
+
+    Reads never touch the disk. Writes update memory right away and are
+    flushed to disk shortly after (bursts are merged into one write) via a
+    temp file + rename under a file lock, so other processes never see a
+    half-written file. Subscribers are told about each key that changed,
+    whether it changed here or because another process rewrote the file,
+    which is noticed with inotify where available and by polling otherwise.
+    """
+
+    def __init__(self, path=SETTINGS_PATH, defaults=DEFAULTS):
+        self.path = path
+        self.defaults = dict(defaults)
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(path + ".lock")
+        self._subscribers = []
+        self._dirty = set()
+        self._write_timer = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+        self._data = self._reconcile(self._read())
+        atexit.register(self.close)
+
+    # --- Loading ---
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            print("Settings file created with defaults.", file=sys.stderr)
+            return None
+        except json.JSONDecodeError:
+            print("Settings file corrupted. Restoring defaults.", file=sys.stderr)
+            return None
+        except Exception as ex:
+            print(f"Error reading settings: {ex}", file=sys.stderr)
+            return None
+
+    def _reconcile(self, data):
+        """Add missing keys from the defaults and drop unknown ones, saving if anything changed"""
+        changed = data is None
+        data = dict(data or {})
+        for key, value in self.defaults.items():
+            if key not in data:
+                data[key] = value
+                changed = True
+                print(f"Added missing setting: {key} = {value}", file=sys.stderr)
+        for key in [key for key in data if key not in self.defaults]:
+            del data[key]
+            changed = True
+            print(f"Removed unknown setting: {key}", file=sys.stderr)
+        if changed:
+            self._write(data)
+        return data
+
+    # --- Reading / writing ---
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._data.get(key, default)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._data)
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        """Change several settings at once, notify subscribers and schedule a write"""
+        with self._lock:
+            changes = {k: (self._data.get(k), v) for k, v in values.items() if self._data.get(k) != v}
+            self._data.update(values)
+            self._dirty.update(changes)
+            if changes and self._write_timer is None:
+                self._write_timer = threading.Timer(WRITE_DELAY, self.flush)
+                self._write_timer.daemon = True
+                self._write_timer.start()
+        self._notify(changes)
+
+    def flush(self):
+        """Write pending changes now"""
+        with self._lock:
+            if self._write_timer is not None:
+                self._write_timer.cancel()
+                self._write_timer = None
+            if not self._dirty:
+                return
+            data = dict(self._data)
+            self._dirty.clear()
+        self._write(data)
+
+    def _write(self, data):
+        directory = os.path.dirname(self.path) or "."
+        with self._file_lock:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".settings-", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, self.path)
+
+    # --- Change notification ---
+
+    def subscribe(self, key, callback, dispatch=None):
+        """
+        Call callback(key, old, new) whenever a setting changes
+
+        Args:
+            key: Setting to watch, None for every key
+            callback: Function to call
+            dispatch: Optional function(callback, *args) that runs the callback
+                elsewhere, e.g. ProgressBus.call to get onto the Tk thread
+
+        Returns:
+            function: Call it to unsubscribe
+        """
+        entry = (key, callback, dispatch)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def _notify(self, changes):
+        if not changes:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for key, (old, new) in changes.items():
+            for wanted, callback, dispatch in subscribers:
+                if wanted is not None and wanted != key:
+                    continue
+                try:
+                    if dispatch:
+                        dispatch(callback, key, old, new)
+                    else:
+                        callback(key, old, new)
+                except Exception as e:
+                    print(f"Error in settings subscriber for {key}: {e}", file=sys.stderr)
+
+    def _reload(self):
+        """Pick up a change another process made to the file"""
+        data = self._read()
+        if data is None:
+            return
+        with self._lock:
+            # Our own unsaved edits win over what is on disk
+            incoming = {k: v for k, v in data.items() if k in self.defaults and k not in self._dirty}
+            changes = {k: (self._data.get(k), v) for k, v in incoming.items() if self._data.get(k) != v}
+            self._data.update(incoming)
+        self._notify(changes)
+
+    def watch(self):
+        """Start watching settings.json for outside changes (idempotent)"""
+        if self._watcher is not None:
+            return
+        try:
+            if not sys.platform.startswith("linux"):
+                raise OSError("inotify is Linux only")
+            self._watcher = _InotifyWatcher(self.path)
+        except (OSError, AttributeError):
+            self._watcher = _PollingWatcher(self.path)
+        threading.Thread(target=self._watch_loop, name="settings-watch", daemon=True).start()
+
+    def _watch_loop(self):
+        while not self._stop.is_set():
+            try:
+                if self._watcher.wait(POLL_INTERVAL):
+                    self._reload()
+            except Exception as e:
+                print(f"Error checking settings: {e}", file=sys.stderr)
+                self._stop.wait(POLL_INTERVAL)
+        self._watcher.close()
+
+    def close(self):
+        self.flush()
+        self._stop.set()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store for SETTINGS_PATH"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SettingsStore()
+        return _store
@@ -0,0 +1,168 @@
+import os
+import sys
+import threading
+from collections import namedtuple
+import vdf
+
+
+HOLLOW_KNIGHT_APPID = "367520"
+SILKSONG_APPID = "1030300"
+
+SteamInstall = namedtuple("SteamInstall", ["appid", "name", "path", "library"])
+
+
+def default_steam_roots():
+    """Places Steam is usually installed on this platform, most likely first"""
+    home = os.path.expanduser("~")
+    roots = []
+    if sys.platform == "win32":
+        try:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Valve\Steam") as key:
+                roots.append(os.path.normpath(winreg.QueryValueEx(key, "SteamPath")[0]))
+        except OSError:
+            pass
+        for env in ("ProgramFiles(x86)", "ProgramFiles"):
+            if os.environ.get(env):
+                roots.append(os.path.join(os.environ[env], "Steam"))
+    elif sys.platform == "darwin":
+        roots.append(os.path.join(home, "Library", "Application Support", "Steam"))
+    else:
+        roots += [
+            os.path.join(home, ".steam", "steam"),
+            os.path.join(home, ".local", "share", "Steam"),
+            # Flatpak
+            os.path.join(home, ".var", "app", "com.valvesoftware.Steam", ".local", "share", "Steam"),
+        ]
+    return roots
+
+
+def _get(mapping, key, default=None):
+    """VDF keys are case-insensitive ("AppState" vs "appstate" both occur in the wild)"""
+    for k, v in mapping.items():
+        if k.lower() == key.lower():
+            return v
+    return default
+
+
+def _parse_library_folders(data):
+    """Library paths from libraryfolders.vdf, both the current and the pre-2021 layout"""
+    folders = _get(data, "libraryfolders", {})
+    paths = []
+    for key, value in folders.items():
+        if not key.isdigit():
+            continue  # e.g. "TimeNextStatsReport", "contentstatsid"
+        if isinstance(value, dict):
+            value = _get(value, "path")
+        if value:
+            paths.append(value)
+    return paths
+
+
+def _parse_app_manifest(data):
+    state = _get(data, "AppState", {})
+    return _get(state, "appid"), _get(state, "name"), _get(state, "installdir")
+
+
+class SteamLibraryScanner:
+    """
+    Find games across every Steam library on this machine
+
+    Parsed VDF files are kept in memory together with their mtime and size,
+    so after the first scan a lookup only stats libraryfolders.vdf and the
+    relevant appmanifest_<appid>.acf files and re-parses just the ones that
+    changed. Pass roots to scan a different tree (e.g. a fake one on disk).
+    """
+
+    def __init__(self, roots=None):
+        self.roots = roots
+        self._lock = threading.Lock()
+        self._parsed = {}  # path -> (mtime_ns, size, result)
+
+    def _load(self, path, parser):
+        """Parse a VDF file, reusing the previous result if it is unchanged; None if missing or broken"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._parsed.pop(path, None)
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._parsed.get(path)
+        if cached and cached[:2] == stamp:
+            return cached[2]
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                result = parser(vdf.load(f))
+        except (OSError, SyntaxError, ValueError, AttributeError) as e:
+            print(f"Could not parse {path}: {e}", file=sys.stderr)
+            result = None
+        self._parsed[path] = stamp + (result,)
+        return result
+
+    def libraries(self):
+        """Every Steam library folder, each listed once"""
+        roots = self.roots if self.roots is not None else default_steam_roots()
+        found = []
+        seen = set()
+
+        def add(path):
+            key = os.path.normcase(os.path.realpath(path))
+            if key not in seen and os.path.isdir(os.path.join(path, "steamapps")):
+                seen.add(key)
+                found.append(path)
+
+        with self._lock:
+            for root in roots:
+                add(root)  # the Steam install itself is always a library
+                for name in (os.path.join("steamapps", "libraryfolders.vdf"),
+                             os.path.join("config", "libraryfolders.vdf")):
+                    for path in self._load(os.path.join(root, name), _parse_library_folders) or ():
+                        add(path)
+        return found
+
+    def find(self, appid):
+        """
+        Every install of appid
+
+        Returns:
+            list[SteamInstall]: Installs whose game directory exists
+        """
+        appid = str(appid)
+        installs = []
+        for library in self.libraries():
+            steamapps = os.path.join(library, "steamapps")
+            with self._lock:
+                manifest = self._load(os.path.join(steamapps, f"appmanifest_{appid}.acf"), _parse_app_manifest)
+            if not manifest:
+                continue
+            manifest_appid, name, installdir = manifest
+            if manifest_appid != appid or not installdir:
+                continue
+            path = os.path.join(steamapps, "common", installdir)
+            if os.path.isdir(path):
+                installs.append(SteamInstall(appid, name, path, library))
+        return installs
+
+    def find_games(self):
+        """Hollow Knight and Silksong installs, keyed by the settings name of their path"""
+        return {
+            "hollowknightpath": self.find(HOLLOW_KNIGHT_APPID),
+            "silksongpath": self.find(SILKSONG_APPID),
+        }
+
+
+_scanner = None
+
+
+def get_scanner():
+    """The process-wide scanner over the default Steam locations"""
+    global _scanner
+    if _scanner is None:
+        _scanner = SteamLibraryScanner()
+    return _scanner
+
+
+def find_install(appid):
+    """Path of the first install of appid, or None"""
+    installs = get_scanner().find(appid)
+    return installs[0].path if installs else None
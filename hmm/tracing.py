@@ -0,0 +1,270 @@
+import os
+import sys
+import json
+import time
+import atexit
+import tempfile
+import itertools
+import threading
+
+
+# HMM_TRACE=<path>.json turns tracing on at startup: the Chrome trace is written
+# to that path on exit and every span is logged as it ends to <path>.log
+TRACE_ENV = "HMM_TRACE"
+
+
+class Span:
+    """
+    One timed section, use through span()
+
+    Spans opened while another one is open on the same thread nest under it.
+    Work handed to another thread can name its parent explicitly.
+    """
+
+    __slots__ = ("tracer", "id", "name", "args", "parent", "start", "tid")
+
+    def __init__(self, tracer, name, parent, args):
+        self.tracer = tracer
+        self.id = next(tracer._ids)
+        self.name = name
+        self.args = args
+        # A NULL_SPAN handed over from before tracing was enabled is no parent
+        self.parent = parent if isinstance(parent, Span) else None
+        self.start = None
+        self.tid = None
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if self.parent is None and stack:
+            self.parent = stack[-1]
+        stack.append(self)
+        self.tid = threading.get_ident()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self, self.start, end)
+        return False
+
+    def add(self, counter, amount=1):
+        """Add to a counter shown with the span, e.g. add("bytes", len(chunk))"""
+        self.args[counter] = self.args.get(counter, 0) + amount
+        self.tracer._counters.add(counter)
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class _NullSpan:
+    """What span() hands out while tracing is off: does nothing, allocates nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, counter, amount=1):
+        pass
+
+    def set(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Collects finished spans for a Chrome trace and a structured log
+
+    The trace opens in chrome://tracing or https://ui.perfetto.dev, one
+    track per thread. The log gets one JSON line per span as it ends.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self._events = []
+        self._threads = {}
+        self._counters = {"bytes"}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._log = None
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._exit_registered = False
+
+    def enable(self, trace_path=None, log_path=None):
+        """
+        Start recording
+
+        Args:
+            trace_path: Optional file the Chrome trace is written to on exit
+            log_path: Optional file every span is appended to as a JSON line
+        """
+        with self._lock:
+            if log_path:
+                if self._log:
+                    self._log.close()
+                os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+                self._log = open(log_path, "a", encoding="utf-8", buffering=1)
+            self.trace_path = trace_path or self.trace_path
+            self.enabled = True
+            if not self._exit_registered:
+                atexit.register(self.disable)
+                self._exit_registered = True
+        return self
+
+    def disable(self):
+        """Stop recording, write the trace if a path was given and close the log"""
+        with self._lock:
+            was_enabled = self.enabled
+            self.enabled = False
+            if self._log:
+                self._log.close()
+                self._log = None
+        if was_enabled and self.trace_path:
+            try:
+                self.export_chrome(self.trace_path)
+                print(f"Trace written to {self.trace_path}", file=sys.stderr)
+            except OSError as e:
+                print(f"Could not write trace {self.trace_path}: {e}", file=sys.stderr)
+
+    def span(self, name, parent=None, **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, parent, args)
+
+    def current(self):
+        """The innermost open span on this thread, to pass as parent to worker threads"""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def record(self, name, start, end=None, parent=None, **args):
+        """Add a span measured elsewhere, start/end are time.perf_counter() values"""
+        if not self.enabled:
+            return
+        span = Span(self, name, parent or self.current(), args)
+        span.tid = threading.get_ident()
+        end = time.perf_counter() if end is None else end
+        self._finish(span, int(start * 1e9), int(end * 1e9))
+
+    def _stack(self):
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def _finish(self, span, start, end):
+        event = {
+            "name": span.name,
+            "ph": "X",
+            "ts": (start - self._origin) / 1000,
+            "dur": (end - start) / 1000,
+            "pid": self._pid,
+            "tid": span.tid,
+            "args": dict(span.args, id=span.id, parent=span.parent.id if span.parent else None),
+        }
+        with self._lock:
+            if not self.enabled:
+                return
+            self._events.append(event)
+            if span.tid not in self._threads:
+                self._threads[span.tid] = threading.current_thread().name
+            if self._log:
+                self._log.write(json.dumps({
+                    "time": time.time(),
+                    "span": span.name,
+                    "id": span.id,
+                    "parent": span.parent.id if span.parent else None,
+                    "parent_name": span.parent.name if span.parent else None,
+                    "thread": self._threads[span.tid],
+                    "duration_ms": round((end - start) / 1e6, 3),
+                    **span.args,
+                }, default=str) + "\n")
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def summary(self):
+        """Per span name: 'count', 'total_ms' and the summed counters (add() and 'bytes')"""
+        totals = {}
+        for event in self.events():
+            entry = totals.setdefault(event["name"], {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += event["dur"] / 1000
+            for key, value in event["args"].items():
+                if key in self._counters and isinstance(value, (int, float)):
+                    entry[key] = entry.get(key, 0) + value
+        return totals
+
+    def export_chrome(self, path):
+        """Write everything recorded so far as Chrome trace-event JSON"""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        metadata = [{"name": "process_name", "ph": "M", "pid": self._pid, "tid": 0, "args": {"name": "HornetMM"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                     for tid, name in threads.items()]
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f, default=str)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    """The process-wide tracer"""
+    return _tracer
+
+
+def span(name, parent=None, **args):
+    """
+    Time a section of code
+
+        with span("extract", component=name) as s:
+            ...
+            s.add("bytes", member.file_size)
+
+    Returns a shared no-op object while tracing is disabled.
+    """
+    if not _tracer.enabled:
+        return NULL_SPAN
+    return Span(_tracer, name, parent, args)
+
+
+def current():
+    return _tracer.current() if _tracer.enabled else None
+
+
+def record(name, start, end=None, parent=None, **args):
+    _tracer.record(name, start, end, parent, **args)
+
+
+def enable_from_env():
+    """Turn tracing on if HMM_TRACE names a trace file, returns whether it is on"""
+    path = os.environ.get(TRACE_ENV)
+    if path and not _tracer.enabled:
+        _tracer.enable(trace_path=path, log_path=os.path.splitext(path)[0] + ".log")
+    return _tracer.enabled
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Same layout the app runs with: hmm/ is the import root, benchmarks/ holds the mock server
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, os.path.join(ROOT, "hmm"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
@@ -0,0 +1,66 @@
+import os
+import threading
+
+import pytest
+
+from oneclick.artifacts import ArtifactStore
+from oneclick.batch import BatchInstaller, OK, STACK_ITEM
+from oneclick.httpcache import HttpCache
+from oneclick.installer import StagedInstall, load_manifest
+from oneclick.oneclick import GameBananaHandler
+from mock_server import MockServer
+
+
+@pytest.fixture
+def server():
+    with MockServer() as mock:
+        mock.add_mod(1001, 50000, 8)
+        mock.add_mod(1002, 50000, 8)
+        components = [(*component, None) for component in mock.add_modding_stack(20000, 5)]
+        yield mock, components
+
+
+def test_mods_and_stack_install_end_to_end(server, tmp_path):
+    mock, components = server
+    game = tmp_path / "game"
+    game.mkdir()
+    handler = GameBananaHandler(install_path=str(tmp_path / "mods"), store=ArtifactStore(str(tmp_path / "store")),
+                                session=mock.session(), cache=HttpCache(str(tmp_path / "http")))
+    batch = BatchInstaller(handler, log=lambda text: None)
+
+    results = batch.run(["1001", "hmm://install/1002"], game_path=str(game), stack=components)
+
+    assert [result['item'] for result in results] == [STACK_ITEM, "1001", "hmm://install/1002"]
+    assert all(result['code'] == OK for result in results), results
+    assert results[0]['written'] and not results[0]['unchanged']
+    assert set(load_manifest(str(game))["components"]) == {"BepInEx", "MonoMod", "HKAPI"}
+    for result in results[1:]:
+        assert os.listdir(result['install_path'])
+
+    # A repair finds every archive in the store and every game file in place
+    files_before = mock.request_count("file")
+    results = batch.run([], game_path=str(game), stack=components)
+    assert results[0]['code'] == OK and not results[0]['written'] and results[0]['unchanged']
+    assert mock.request_count("file") == files_before
+
+
+def test_stack_is_staged_and_committed_on_the_disk_pool(server, tmp_path, monkeypatch):
+    mock, components = server
+    game = tmp_path / "game"
+    game.mkdir()
+    threads = []
+    for method in ("extract", "commit"):
+        original = getattr(StagedInstall, method)
+
+        def recorded(self, *args, original=original, **kwargs):
+            threads.append(threading.current_thread().name)
+            return original(self, *args, **kwargs)
+        monkeypatch.setattr(StagedInstall, method, recorded)
+    handler = GameBananaHandler(install_path=str(tmp_path / "mods"), store=ArtifactStore(str(tmp_path / "store")),
+                                session=mock.session(), cache=HttpCache(str(tmp_path / "http")))
+
+    results = BatchInstaller(handler, disk_jobs=1, log=lambda text: None).run([], game_path=str(game), stack=components)
+
+    assert results[0]['code'] == OK, results
+    assert len(threads) == len(components) + 1
+    assert all(name.startswith("disk_") for name in threads), threads
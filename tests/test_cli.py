@@ -0,0 +1,32 @@
+import os
+import json
+
+import pytest
+
+import cli
+from oneclick import downloader
+from oneclick import oneclick
+from mock_server import MockServer
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(downloader, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(cli, "_refresh_index", lambda *args: None)
+    with MockServer() as mock:
+        monkeypatch.setattr(oneclick, "create_session", mock.session)
+        yield mock
+
+
+def test_install_json_parses_when_a_download_is_retried(server, tmp_path, capsys):
+    server.add_mod(4242, 200000, 4)
+    server.add_file("/dl/mod_4242.zip", server.files["/dl/mod_4242.zip"], drop_after=50000)
+
+    code = cli.main(["install", "4242", "--json", "--mods-dir", str(tmp_path / "mods")])
+
+    out, err = capsys.readouterr()
+    summary = json.loads(out)
+    assert code == 0 and summary["installed"] == 1
+    assert "Retrying" in err
+    assert os.path.isdir(summary["items"][0]["install_path"])
@@ -0,0 +1,78 @@
+import os
+import time
+import hashlib
+
+import pytest
+
+from oneclick import downloader
+from oneclick.downloader import DownloadError, download, download_segmented
+from mock_server import MockServer
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # Retries happen right away instead of after a real backoff
+    monkeypatch.setattr(downloader, "backoff_delay", lambda attempt: 0)
+    with MockServer() as mock:
+        yield mock
+
+
+def test_dropped_download_resumes_with_a_range_request(server, tmp_path):
+    data = os.urandom(300000)
+    server.add_file("/pack.zip", data, drop_after=200000)
+    dest = str(tmp_path / "pack.zip")
+
+    assert download(f"{server.base_url}/pack.zip", dest) == dest
+
+    assert open(dest, "rb").read() == data
+    assert not os.path.exists(dest + ".part")
+    first, resumed = server.ranges
+    assert first == ("/pack.zip", None)
+    assert resumed[1].startswith("bytes=") and int(resumed[1][6:-1]) > 0
+
+
+def test_download_gives_up_after_the_retries(server, tmp_path):
+    server.add_file("/pack.zip", os.urandom(100000), drop_after=0, drops=10)
+    with pytest.raises(DownloadError, match="Giving up"):
+        download(f"{server.base_url}/pack.zip", str(tmp_path / "pack.zip"), retries=2)
+
+
+def test_md5_mismatch_is_rejected(server, tmp_path):
+    data = os.urandom(100000)
+    server.add_file("/pack.zip", data)
+    dest = str(tmp_path / "pack.zip")
+
+    with pytest.raises(DownloadError, match="md5 mismatch"):
+        download_segmented(f"{server.base_url}/pack.zip", dest, checksum=("md5", "0" * 32))
+    assert not os.path.exists(dest)
+
+    checksum = ("md5", hashlib.md5(data).hexdigest())
+    download_segmented(f"{server.base_url}/pack.zip", dest, checksum=checksum)
+    assert open(dest, "rb").read() == data
+
+
+def test_dropped_segment_keeps_every_byte_it_received(server, tmp_path):
+    data = os.urandom(800000)
+    server.add_file("/pack.zip", data, drop_after=100000)
+    dest = str(tmp_path / "pack.zip")
+
+    download_segmented(f"{server.base_url}/pack.zip", dest, connections=4, min_segment_size=200000)
+
+    assert open(dest, "rb").read() == data
+    # The retry asks for exactly the bytes after the drop, nothing received was thrown away
+    # (the segments start on multiples of 200000, in whatever order they reached the server)
+    starts = [int(header[6:].split("-")[0]) for _, header in server.ranges if header]
+    resumed = [start for start in starts if start % 200000]
+    assert len(resumed) == 1 and resumed[0] % 200000 == 100000
+
+
+def test_failed_segment_stops_the_others(server, tmp_path):
+    server.rate = 200000  # each 200 KB segment alone takes a second
+    server.add_file("/pack.zip", os.urandom(800000), drop_after=0)
+    dest = str(tmp_path / "pack.zip")
+
+    start = time.perf_counter()
+    with pytest.raises(DownloadError, match="Giving up"):
+        download_segmented(f"{server.base_url}/pack.zip", dest, connections=4, min_segment_size=100000, retries=0)
+    assert time.perf_counter() - start < 0.6
+    assert not os.path.exists(dest + ".seg")
@@ -0,0 +1,53 @@
+import types
+
+from oneclick import httpcache
+from oneclick.httpcache import HttpCache
+from mock_server import MockServer
+
+ITEM_URL = "https://api.gamebanana.com/Core/Item/Data"
+PARAMS = {"itemtype": "Mod", "itemid": "1001", "fields": "name"}
+
+
+def test_stale_entries_are_revalidated_with_their_etag(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(httpcache, "time", types.SimpleNamespace(time=lambda: clock[0]))
+
+    with MockServer() as mock:
+        mock.add_mod(1001, 1000, 1, name="Original")
+        session = mock.session()
+        seen = []
+        session.hooks["response"].append(
+            lambda response, **kwargs: seen.append((response.status_code, response.request.headers.get("If-None-Match"),
+                                                    response.headers.get("ETag"))))
+        cache = HttpCache(str(tmp_path / "http"), ttl=60)
+
+        first = cache.get(session, ITEM_URL, params=PARAMS)
+        assert first.status_code == 200 and not first.from_cache
+        assert first.json()[0] == "Original"
+        assert seen[0][:2] == (200, None)
+        etag = seen[0][2]
+
+        # Within the TTL nothing goes out, also from a new cache reading the same folder
+        clock[0] += 59
+        fresh = cache.get(session, ITEM_URL, params=PARAMS)
+        assert fresh.from_cache and fresh.text == first.text
+        assert HttpCache(str(tmp_path / "http"), ttl=60).get(session, ITEM_URL, params=PARAMS).from_cache
+        assert len(seen) == 1
+
+        # Stale: revalidated, the 304 serves the cached body and restarts the TTL
+        clock[0] += 2
+        revalidated = cache.get(session, ITEM_URL, params=PARAMS)
+        assert seen[1][:2] == (304, etag)
+        assert revalidated.status_code == 200 and revalidated.from_cache and revalidated.text == first.text
+        clock[0] += 59
+        assert cache.get(session, ITEM_URL, params=PARAMS).from_cache
+        assert len(seen) == 2
+
+        # Changed on the server: the full new body replaces the entry
+        mock.items["1001"][0] = "Renamed"
+        clock[0] += 2
+        changed = cache.get(session, ITEM_URL, params=PARAMS)
+        assert seen[2][:2] == (200, etag)
+        assert not changed.from_cache and changed.json()[0] == "Renamed"
+        assert cache.get(session, ITEM_URL, params=PARAMS).json()[0] == "Renamed"
+        assert mock.request_count("item_data") == 3
@@ -0,0 +1,16 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+
+@pytest.mark.parametrize("module", ["downloader", "installer", "batch", "lockfile", "oneclick"])
+def test_oneclick_imports_as_a_package(module, tmp_path):
+    # A fresh interpreter, conftest's sys.path setup would hide the problem
+    code = f"import hmm.oneclick.{module}, tracing; assert hmm.oneclick.{module}.span is tracing.span"
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmp_path))
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,174 @@
+import os
+import zipfile
+import urllib.parse
+
+import pytest
+
+from oneclick import installer
+from oneclick.artifacts import ArtifactStore
+from oneclick.installer import GameFolderBusy, StackInstallError, StagedInstall, install_modding_stack, load_manifest, uninstall
+from mock_server import MockServer
+
+
+def make_archive(path, files):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return str(path)
+
+
+def install(game, archive, component="BepInEx"):
+    stage = StagedInstall(str(game))
+    stage.extract(archive, component=component, version="1")
+    return stage.commit()
+
+
+def read(game, rel):
+    with open(os.path.join(game, rel), "rb") as f:
+        return f.read()
+
+
+def test_failed_commit_restores_the_previous_install(tmp_path, monkeypatch):
+    game = tmp_path / "game"
+    game.mkdir()
+    install(game, make_archive(tmp_path / "v1.zip", {"a.dll": b"a1", "b.dll": b"b1", "old.dll": b"o1"}))
+    manifest = load_manifest(str(game))
+
+    stage = StagedInstall(str(game))
+    stage.extract(make_archive(tmp_path / "v2.zip", {"a.dll": b"a2", "b.dll": b"b2", "new.dll": b"n2"}),
+                  component="BepInEx", version="2")
+
+    # b.dll is locked by the running game: replacing it fails halfway through the commit
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if str(src).endswith(os.path.join(installer.STAGE_DIR_NAME, "b.dll")):
+            raise PermissionError("locked")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(installer.os, "replace", replace)
+    with pytest.raises(PermissionError):
+        stage.commit()
+    monkeypatch.undo()
+
+    assert read(game, "a.dll") == b"a1"
+    assert read(game, "b.dll") == b"b1"
+    assert read(game, "old.dll") == b"o1"
+    assert not (game / "new.dll").exists()
+    assert not (game / installer.BACKUP_DIR_NAME).exists()
+    assert load_manifest(str(game))["components"] == manifest["components"]
+
+
+def test_files_already_in_the_game_folder_are_not_claimed(tmp_path):
+    game = tmp_path / "game"
+    game.mkdir()
+    (game / "shared.dll").write_bytes(b"same")
+
+    result = install(game, make_archive(tmp_path / "a.zip", {"shared.dll": b"same", "mine.dll": b"mine"}))
+    assert result["unchanged"] == ["shared.dll"]
+    assert list(load_manifest(str(game))["components"]["BepInEx"]["files"]) == ["mine.dll"]
+
+    assert uninstall(str(game)) == ["mine.dll"]
+    assert read(game, "shared.dll") == b"same"
+
+
+def test_interrupted_commit_is_rolled_back_on_the_next_install(tmp_path):
+    game = tmp_path / "game"
+    (game / installer.BACKUP_DIR_NAME / "plugins").mkdir(parents=True)
+    (game / installer.BACKUP_DIR_NAME / "plugins" / "x.dll").write_bytes(b"before")
+
+    StagedInstall(str(game)).abort()
+    assert read(game, "plugins/x.dll") == b"before"
+    assert not (game / installer.BACKUP_DIR_NAME).exists()
+
+
+@pytest.fixture
+def stack_server():
+    with MockServer() as mock:
+        components = [(*component, None) for component in mock.add_modding_stack(20000, 5)]
+        yield mock, components
+
+
+def test_modding_stack_installs_with_progress(stack_server, tmp_path):
+    mock, components = stack_server
+    game = tmp_path / "game"
+    game.mkdir()
+    updates = []
+
+    result = install_modding_stack(str(game), progress_callback=lambda *update: updates.append(update),
+                                   components=components, store=ArtifactStore(str(tmp_path / "store")),
+                                   session=mock.session())
+
+    assert set(load_manifest(str(game))["components"]) == {"BepInEx", "MonoMod", "HKAPI"}
+    assert result["written"] and all(os.path.isfile(game / rel) for rel in result["written"])
+    assert [current for current, _, _ in updates] == sorted(current for current, _, _ in updates)
+    assert updates[-1][0] == 100
+
+
+@pytest.mark.parametrize("broken, downloading", [("missing", True), ("corrupt", False)])
+def test_modding_stack_failure_leaves_the_game_alone(stack_server, tmp_path, broken, downloading):
+    mock, components = stack_server
+    path = urllib.parse.urlsplit(components[-1][1]).path
+    if broken == "missing":
+        del mock.files[path]
+    else:
+        mock.files[path] = b"not a zip archive"
+    game = tmp_path / "game"
+    game.mkdir()
+
+    with pytest.raises(StackInstallError) as failure:
+        install_modding_stack(str(game), components=components, store=ArtifactStore(str(tmp_path / "store")),
+                              session=mock.session())
+
+    assert failure.value.component == components[-1][0]
+    assert failure.value.downloading == downloading
+    assert os.listdir(game) == []
+
+
+def test_uninstall_restores_a_game_file_the_install_replaced(tmp_path):
+    game = tmp_path / "game"
+    managed = game / "hollow_knight_Data" / "Managed"
+    managed.mkdir(parents=True)
+    (managed / "Assembly-CSharp.dll").write_bytes(b"vanilla")
+    dll = "hollow_knight_Data/Managed/Assembly-CSharp.dll"
+
+    install(game, make_archive(tmp_path / "api.zip", {dll: b"patched", "MMHOOK.dll": b"hooks"}), "HKAPI")
+    assert read(game, dll) == b"patched"
+    # A repair keeps knowing the file is not ours
+    install(game, make_archive(tmp_path / "api2.zip", {dll: b"patched 2"}), "HKAPI")
+    assert load_manifest(str(game))["components"]["HKAPI"]["files"][dll]["original"]
+    assert not (game / "MMHOOK.dll").exists()
+
+    uninstall(str(game))
+    assert read(game, dll) == b"vanilla"
+    assert not (game / installer.ORIGINALS_DIR).exists()
+
+
+def test_dropping_a_replaced_file_puts_the_original_back(tmp_path):
+    game = tmp_path / "game"
+    game.mkdir()
+    (game / "UnityPlayer.dll").write_bytes(b"vanilla")
+
+    install(game, make_archive(tmp_path / "v1.zip", {"UnityPlayer.dll": b"ours", "a.dll": b"a"}))
+    result = install(game, make_archive(tmp_path / "v2.zip", {"a.dll": b"a"}))
+
+    assert result["removed"] == ["UnityPlayer.dll"]
+    assert read(game, "UnityPlayer.dll") == b"vanilla"
+    assert uninstall(str(game)) == ["a.dll"]
+    assert read(game, "UnityPlayer.dll") == b"vanilla"
+
+
+def test_only_one_install_or_uninstall_runs_per_game_folder(tmp_path):
+    game = tmp_path / "game"
+    game.mkdir()
+    stage = StagedInstall(str(game))
+
+    with pytest.raises(GameFolderBusy):
+        StagedInstall(str(game))
+    with pytest.raises(GameFolderBusy):
+        uninstall(str(game))
+    StagedInstall(str(tmp_path)).abort()  # other game folders are not blocked
+
+    stage.extract(make_archive(tmp_path / "a.zip", {"a.dll": b"a"}), component="BepInEx", version="1")
+    stage.commit()
+    assert uninstall(str(game)) == ["a.dll"]
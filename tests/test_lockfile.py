@@ -0,0 +1,79 @@
+import json
+import types
+import urllib.parse
+
+import pytest
+
+import cli
+from oneclick import lockfile
+from oneclick.batch import INVALID
+from oneclick.artifacts import ArtifactStore
+from oneclick.installer import modding_stack, save_manifest
+from oneclick.lockfile import LockfileError, read_lockfile
+from mock_server import MockServer, make_zip
+
+
+@pytest.mark.parametrize("version, message", [
+    ("1", "invalid lockfile version"),
+    (None, "invalid lockfile version"),
+    (True, "invalid lockfile version"),
+    (lockfile.LOCKFILE_VERSION + 1, "needs a newer HornetMM"),
+])
+def test_bad_lockfile_versions_are_rejected(tmp_path, version, message):
+    path = tmp_path / "pack.hmmlock"
+    path.write_text(json.dumps({"format": lockfile.LOCKFILE_FORMAT, "version": version, "mods": []}))
+    with pytest.raises(LockfileError, match=message):
+        read_lockfile(str(path))
+
+
+def test_broken_mod_entries_are_rejected(tmp_path):
+    path = tmp_path / "pack.hmmlock"
+    path.write_text(json.dumps({"format": lockfile.LOCKFILE_FORMAT, "version": 1, "mods": ["12345"]}))
+    with pytest.raises(LockfileError, match="broken mod entry"):
+        read_lockfile(str(path))
+
+
+def test_stack_is_locked_at_the_installed_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(lockfile, "detect_platform", lambda: ("win", "x64"))
+    game = tmp_path / "game"
+    save_manifest(str(game), {"components": {
+        "BepInEx": {"version": "5.4.21.0", "files": {}},
+        "HKAPI": {"version": "1.5.78.11833-74", "files": {}},
+    }})
+    warnings = []
+
+    with MockServer() as mock:
+        mock.add_modding_stack(10000, 3)
+        old = modding_stack("win", "x64", {"BepInEx": "5.4.21.0"})[0]
+        mock.add_file(urllib.parse.urlsplit(old[1]).path, make_zip(10000, 3, seed=7))
+        handler = types.SimpleNamespace(store=ArtifactStore(str(tmp_path / "store")), session=mock.session())
+        stack = lockfile._lock_stack(handler, str(game), str(tmp_path), warnings.append)
+
+    locked = {component["name"]: component for component in stack["components"]}
+    assert locked["BepInEx"]["version"] == "5.4.21.0"
+    assert locked["BepInEx"]["url"] == old[1]
+    assert locked["HKAPI"]["version"] == "1.5.78.11833-74"
+    # MonoMod is missing from the game folder, the one this HornetMM installs is locked
+    assert warnings == [f"⚠️ MonoMod is not installed, locking {locked['MonoMod']['version']} which this HornetMM installs"]
+
+
+@pytest.mark.parametrize("stack", [
+    {"os": "win", "arch": "x64", "components": [{"name": "BepInEx"}]},
+    "x",
+    {"os": "win", "arch": "x64", "components": [1]},
+    {"os": "win", "arch": "x64", "components": {"name": "BepInEx"}},
+    {"os": None, "arch": "x64", "components": []},
+])
+def test_broken_stacks_are_rejected(tmp_path, stack):
+    path = tmp_path / "pack.hmmlock"
+    path.write_text(json.dumps({"format": lockfile.LOCKFILE_FORMAT, "version": 1, "mods": [], "stack": stack}))
+    with pytest.raises(LockfileError, match="broken modding stack"):
+        read_lockfile(str(path))
+
+
+def test_restore_of_a_broken_stack_exits_invalid(tmp_path, capsys):
+    path = tmp_path / "pack.hmmlock"
+    path.write_text(json.dumps({"format": lockfile.LOCKFILE_FORMAT, "version": 1, "mods": [],
+                                "stack": {"os": "win", "arch": "x64", "components": [{"name": "BepInEx"}]}}))
+    assert cli.main(["restore", str(path), "--mods-dir", str(tmp_path / "mods")]) == INVALID
+    assert "broken modding stack" in capsys.readouterr().err
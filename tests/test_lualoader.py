@@ -0,0 +1,249 @@
+import os
+import time
+
+import pytest
+from lupa import LuaRuntime, LuaMemoryError
+
+from lua import lualoader
+from lua.lualoader import ManifestCache, evaluate_manifest, load_manifests
+
+
+@pytest.mark.parametrize("path", [
+    'print.__self__',
+    'hmm.setname["__self__"]',
+    'python.eval',
+])
+def test_sandbox_cannot_reach_python(path, tmp_path):
+    marker = tmp_path / "escaped.txt"
+    result = evaluate_manifest(f'{path}.system("touch {marker}")')
+    assert not result["success"]
+    assert result["error"]["kind"] == "runtime"
+    assert not marker.exists()
+
+
+def test_escape_payload_from_a_manifest(tmp_path):
+    marker = tmp_path / "escaped.txt"
+    result = evaluate_manifest(
+        f'hmm.setname.__self__.__class__.__init__.__globals__["os"].system("touch {marker}")')
+    assert "cannot access Python attributes" in result["error"]["message"]
+    assert not os.path.exists(marker)
+
+
+def test_api_callbacks_still_work():
+    result = evaluate_manifest('''
+        local hmm = require("hmm")
+        function hmm.info()
+            hmm.setname("Mod")
+            hmm.setathour("Someone")
+            hmm.setversion()
+        end
+        function hmm.extfeatures()
+            hmm.addextfeature({"a", "b"})
+            hmm.addextfeaturevalue("c")
+            print("loaded")
+        end
+    ''')
+    assert result["success"], result["error"]
+    assert result["info"] == {"name": "Mod", "author": "Someone", "version": "Unknown"}
+    assert result["features"] == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize("source", [
+    'local x = string.find(string.rep("a", 30000), ".-.-.-.-b")',
+    'local x = (string.rep("a", 30000)):match(".-.-.-.-b")',
+    'for w in string.gmatch(string.rep("a", 30000), ".-.-.-b") do end',
+    'local ok = pcall(string.gsub, string.rep("a", 30000), ".-.-.-.-b", "")',
+    'local t = table.move({}, 1, 1e15, 2)',
+])
+def test_slow_c_functions_are_charged_to_the_budget(source):
+    start = time.perf_counter()
+    result = evaluate_manifest(source)
+    assert time.perf_counter() - start < 5
+    assert result["error"]["kind"] == "budget"
+    assert 0 < result["instructions"] <= lualoader.DEFAULT_INSTRUCTION_BUDGET
+
+
+def test_cheap_patterns_still_work():
+    result = evaluate_manifest('''
+        hmm.setname(("  My Mod  "):match("^%s*(.-)%s*$"))
+        hmm.setversion((string.gsub("1_2_3", "_", ".")))
+        for word in string.gmatch("a b", "%a+") do hmm.addextfeaturevalue(word) end
+        assert(string.find("a.b", ".", 1, true) == 2)
+    ''')
+    assert result["success"], result["error"]
+    assert result["info"] == {"name": "My Mod", "version": "1.2.3"}
+    assert result["features"] == ["a", "b"]
+
+
+def test_memory_errors_report_the_instructions_used():
+    result = evaluate_manifest("local t = {} for i = 1, 1e9 do t[i] = i end", memory_limit=512 * 1024)
+    assert result["error"]["kind"] == "memory"
+    assert result["instructions"] > 0
+
+
+def test_memory_error_raised_by_lua_keeps_the_count():
+    class Pool:
+        def acquire(self):
+            lua = LuaRuntime(max_memory=0)
+
+            def sandbox(api, code, name, log, budget, step, stats):
+                stats["used"] = 12000
+                raise LuaMemoryError("not enough memory")
+            return lua, sandbox
+
+        def release(self, runtime):
+            raise AssertionError("a runtime that ran out of memory must not be reused")
+
+    loader = lualoader.LuaModLoader(verbose=False, pool=Pool())
+    assert not loader.load_source("")
+    assert loader.error_kind == "memory"
+    assert loader.instructions == 12000
+
+
+def write_manifest(directory, name, mod_name, version="1.0"):
+    path = directory / f"{name}.lua"
+    path.write_text(f'''
+local NAME = "{mod_name}"
+local VER = "{version}"
+local hmm = require("hmm")
+function hmm.info()
+    hmm.setname(NAME)
+    hmm.setversion(VER)
+end
+''')
+    return path
+
+
+def without_timing(results):
+    return [{key: value for key, value in result.items() if key != "elapsed_ms"} for result in results]
+
+
+def test_unchanged_manifests_come_from_the_cache(tmp_path, monkeypatch):
+    mods = tmp_path / "mods"
+    mods.mkdir()
+    write_manifest(mods, "a", "A")
+    edited = write_manifest(mods, "b", "B")
+    cache_path = str(tmp_path / "manifests.json")
+
+    first = load_manifests(str(mods), cache=ManifestCache(cache_path))
+    assert [result["cached"] for result in first] == [False, False]
+
+    evaluated = []
+    monkeypatch.setattr(lualoader, "evaluate_manifest",
+                        lambda source, **limits: evaluated.append(source) or evaluate_manifest(source, **limits))
+    second = load_manifests(str(mods), cache=ManifestCache(cache_path))
+    assert evaluated == []
+    assert [result["cached"] for result in second] == [True, True]
+    assert [result["info"] for result in second] == [result["info"] for result in first]
+
+    write_manifest(mods, "b", "B", version="2.0")
+    third = load_manifests(str(mods), cache=ManifestCache(cache_path))
+    assert len(evaluated) == 1 and evaluated[0] == edited.read_text()
+    assert [result["cached"] for result in third] == [True, False]
+    assert third[1]["info"] == {"name": "B", "version": "2.0"}
+
+
+def test_metadata_only_matches_a_full_load(tmp_path):
+    mods = tmp_path / "mods"
+    mods.mkdir()
+    write_manifest(mods, "plain", "Plain")
+    # Computed values are not understood statically, that one is executed
+    (mods / "computed.lua").write_text('local NAME = "Comp" .. "uted"\nhmm.setname(NAME)\nhmm.setathour("X")\n')
+
+    full = load_manifests(str(mods), cache=ManifestCache(str(tmp_path / "full.json")))
+    metadata = load_manifests(str(mods), cache=ManifestCache(str(tmp_path / "meta.json")), metadata_only=True)
+
+    assert [result["static"] for result in metadata] == [False, True]
+    for quick, slow in zip(metadata, full):
+        assert quick["success"] and slow["success"]
+        info = {key: value for key, value in quick["info"].items() if key != "api_version"}
+        assert info == slow["info"]
+
+
+def test_process_pool_matches_serial_loading(tmp_path, monkeypatch):
+    mods = tmp_path / "mods"
+    mods.mkdir()
+    for i in range(lualoader.POOL_THRESHOLD + 2):
+        write_manifest(mods, f"mod{i:02}", f"Mod {i}", version=f"1.{i}")
+    (mods / "broken.lua").write_text("hmm.setname(")
+
+    pools = []
+
+    class RecordingPool(lualoader.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+    monkeypatch.setattr(lualoader, "ProcessPoolExecutor", RecordingPool)
+
+    serial = load_manifests(str(mods), workers=1, cache=ManifestCache(str(tmp_path / "serial.json")))
+    assert pools == []
+    pooled = load_manifests(str(mods), workers=2, cache=ManifestCache(str(tmp_path / "pooled.json")))
+    assert len(pools) == 1
+
+    assert without_timing(pooled) == without_timing(serial)
+    assert pooled[0]["error"]["kind"] == "syntax"
+    assert all(result["success"] for result in pooled[1:])
+
+
+def test_mods_on_a_pooled_runtime_cannot_see_each_other():
+    pool = lualoader.LuaRuntimePool(size=1)
+    runtime = pool.acquire()
+    pool.release(runtime)
+
+    first = lualoader.LuaModLoader(verbose=False, pool=pool)
+    assert first.load_source('''
+        LEAK = "a"
+        _G.ALSO = "a"
+        string.shout = function(s) return s .. "!" end
+        string.upper = nil
+        table.insert = nil
+        math.pi = 3
+        package.preload.extra = function() return "a" end
+        hmm.setname(("a"):shout())
+    '''), first.error
+    assert first.mod_info["name"] == "a!"
+
+    second = lualoader.LuaModLoader(verbose=False, pool=pool)
+    assert second.load_source('''
+        hmm.setname(tostring(LEAK) .. " " .. tostring(ALSO))
+        hmm.setathour(tostring(("b").shout))
+        hmm.setdescription(("b"):upper())
+        hmm.setversion(tostring(math.pi > 3.1 and table.insert ~= nil and package.preload.extra == nil))
+    '''), second.error
+    assert second.mod_info == {"name": "nil nil", "author": "nil", "description": "B", "version": "true"}
+
+    # Both ran on the same runtime, which is back to the plain string library
+    lua, _ = pool.acquire()
+    assert lua is runtime[0]
+    assert lua.eval('getmetatable("").__index == string and string.shout == nil')
+
+
+def test_mods_cannot_reach_the_string_metatable():
+    result = evaluate_manifest('getmetatable("").__index = {upper = function() return "x" end}')
+    assert result["error"]["kind"] == "runtime"
+    assert evaluate_manifest('hmm.setname(("b"):upper())')["info"]["name"] == "B"
+
+
+@pytest.mark.parametrize("source, kind", [
+    ("while true do end", "budget"),
+    ("pcall(function() while true do end end) while true do end", "budget"),
+    ("local t = {} while true do t[#t + 1] = {} end", "memory"),
+])
+def test_runaway_scripts_are_stopped_and_the_pool_keeps_working(source, kind):
+    pool = lualoader.LuaRuntimePool(size=1)
+    loader = lualoader.LuaModLoader(verbose=False, pool=pool, instruction_budget=1_000_000,
+                                    memory_limit=1024 * 1024)
+
+    start = time.perf_counter()
+    assert not loader.load_source(source)
+    assert time.perf_counter() - start < 5
+    assert loader.error_kind == kind
+    if kind == "budget":
+        assert "instruction budget of 1000000 exceeded" in loader.error
+    else:
+        assert "memory limit of 1048576 bytes exceeded" in loader.error
+
+    # The next mod runs normally, and without the previous one's memory limit being left behind
+    after = lualoader.LuaModLoader(verbose=False, pool=pool, memory_limit=0)
+    assert after.load_source('local t = {} for i = 1, 200000 do t[i] = "x" .. i end hmm.setname(t[200000])'), after.error
+    assert after.mod_info["name"] == "x200000"
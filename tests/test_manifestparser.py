@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from lua.lualoader import evaluate_manifest
+from lua.manifestparser import parse_manifest
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "hmm", "lua", "example.lua")
+
+INFO = '''
+local hmm = require("hmm")
+function hmm.info()
+    hmm.setname(NAME)
+    hmm.setathour(ATH)
+    hmm.setdescription(DESC)
+    hmm.setversion(VER)
+end
+'''
+
+DECLARED = 'local NAME = "a"\nlocal VER = "1.0"\n'
+
+
+def without_api_version(info):
+    return {key: value for key, value in info.items() if key != "api_version"}
+
+
+@pytest.mark.parametrize("later", [
+    'NAME, X = 1, 2',
+    'X, NAME = 1, 2',
+    'NAME = "b"',
+    'NAME.x = 1',
+    'print(NAME)',
+    'hmm.setname("b")',
+    'local set = hmm.setname\nset("b")',
+    'hmm["setname"]("b")',
+])
+def test_anything_but_the_plain_layout_is_executed(later):
+    assert parse_manifest(DECLARED + INFO + later) is None
+
+
+def test_setter_given_another_value_is_executed():
+    source = DECLARED + INFO.replace("hmm.setname(NAME)", 'hmm.setname("B")')
+    assert parse_manifest(source) is None
+    assert evaluate_manifest(source)["info"]["name"] == "B"
+
+
+def test_computed_constant_is_executed():
+    assert parse_manifest('local NAME = "a" .. "b"\n' + INFO) is None
+
+
+def test_example_matches_running_it():
+    with open(EXAMPLE, encoding="utf-8") as f:
+        source = f.read()
+    info = parse_manifest(source)
+    assert info["api_version"] == "Your HKMAPI Version"
+    assert without_api_version(info) == evaluate_manifest(source)["info"]
+
+
+def test_missing_fields_match_running_it():
+    source = 'local NAME = "Mod"\nlocal DESC = "Text" -- NAME = "comment"\nlocal APIVER = 73\n' + INFO
+    info = parse_manifest(source)
+    assert info["api_version"] == 73
+    assert without_api_version(info) == evaluate_manifest(source)["info"] == {
+        "name": "Mod", "author": None, "description": "Text", "version": "Unknown"}
+
+
+def test_setters_not_called_are_left_out():
+    source = DECLARED + INFO.replace("hmm.setversion(VER)", "").replace("hmm.setathour(ATH)", "")
+    assert without_api_version(parse_manifest(source)) == evaluate_manifest(source)["info"]
@@ -0,0 +1,47 @@
+import os
+import json
+import shutil
+
+from modindex import ModIndex
+
+
+def bump_mtime(path):
+    """Make sure a change is seen even on filesystems with coarse timestamps"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+
+
+def test_rescan_only_rereads_what_changed(tmp_path, monkeypatch):
+    mods = tmp_path / "mods"
+    for name in ("a", "b", "c"):
+        (mods / name / "sub").mkdir(parents=True)
+        (mods / name / "sub" / f"{name}.dll").write_bytes(b"x" * 10)
+    (mods / "b" / "manifest.json").write_text(json.dumps({"name": "Bee", "version_number": "1.0.0"}))
+    (mods / "loose.dll").write_bytes(b"y" * 20)
+    roots = [("local", str(mods))]
+    index = ModIndex(str(tmp_path / "mods.db"))
+
+    assert index.rescan(roots) == {'added': 4, 'updated': 0, 'removed': 0, 'unchanged': 0}
+
+    read = []
+    index_mod = index._index_mod
+    monkeypatch.setattr(index, "_index_mod", lambda source, root, path: read.append(path) or index_mod(source, root, path))
+    assert index.rescan(roots) == {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 4}
+    assert read == []
+
+    (mods / "d").mkdir()
+    (mods / "d" / "d.dll").write_bytes(b"z")
+    (mods / "b" / "sub" / "extra.dll").write_bytes(b"e" * 5)
+    bump_mtime(mods / "b" / "sub")
+    shutil.rmtree(mods / "c")
+    bump_mtime(mods)
+
+    assert index.rescan(roots) == {'added': 1, 'updated': 1, 'removed': 1, 'unchanged': 2}
+    assert sorted(read) == [str(mods / "b"), str(mods / "d")]
+
+    by_name = {mod.name: mod for mod in index.mods()}
+    assert set(by_name) == {"Bee", "a", "d", "loose"}
+    assert by_name["Bee"].version == "1.0.0"
+    assert by_name["Bee"].files == ["manifest.json", "sub/b.dll", "sub/extra.dll"]
+    assert by_name["Bee"].size == 15 + len((mods / "b" / "manifest.json").read_bytes())
+    index.close()
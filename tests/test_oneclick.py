@@ -0,0 +1,20 @@
+from oneclick.httpcache import HttpCache
+from oneclick.oneclick import GameBananaHandler
+from mock_server import MockServer
+
+
+def test_get_mods_info_fetches_each_mod_once_and_reports_missing_ones(tmp_path):
+    with MockServer() as mock:
+        mock.add_mod(1001, 1000, 1, name="First")
+        mock.add_mod(1002, 1000, 1, name="Second")
+        handler = GameBananaHandler(install_path=str(tmp_path / "mods"), session=mock.session(),
+                                    cache=HttpCache(str(tmp_path / "http")))
+
+        yielded = list(handler.get_mods_info([1001, "1002", "1001", "9999"]))
+
+        assert mock.request_count("item_data") == 3
+    assert sorted(mod_id for mod_id, _, _ in yielded) == ["1001", "1002", "9999"]
+    results = {mod_id: (success, result) for mod_id, success, result in yielded}
+    assert results["1001"][0] and results["1001"][1]["name"] == "First"
+    assert results["1002"][0] and results["1002"][1]["name"] == "Second"
+    assert results["9999"] == (False, "API request failed: 404")
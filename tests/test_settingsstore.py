@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import time
+import threading
+
+import pytest
+
+import settingsstore
+from settingsstore import SettingsStore
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def write_externally(path, data):
+    """Rewrite the file the way another HornetMM process does: temp file + rename"""
+    tmp_path = path + ".other"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settingsstore, "WRITE_DELAY", 0.05)
+    monkeypatch.setattr(settingsstore, "POLL_INTERVAL", 0.05)
+    path = str(tmp_path / "settings.json")
+    write_externally(path, dict(settingsstore.DEFAULTS))
+    store = SettingsStore(path)
+    yield store
+    store.close()
+
+
+def test_a_burst_of_sets_is_one_write(store, monkeypatch):
+    writes = []
+    write = store._write
+    monkeypatch.setattr(store, "_write", lambda data: writes.append(data) or write(data))
+
+    store.set("theme", "dark")
+    store.set("hollowknightpath", "/games/hk")
+    store.set("theme", "light")
+    assert store.get("theme") == "light"  # memory is updated right away
+
+    assert wait_for(lambda: writes)
+    time.sleep(0.2)
+    assert len(writes) == 1
+    with open(store.path) as f:
+        on_disk = json.load(f)
+    assert on_disk["theme"] == "light" and on_disk["hollowknightpath"] == "/games/hk"
+
+
+def watch_and_edit(store):
+    changes = []
+    lock = threading.Lock()
+
+    def on_change(key, old, new):
+        with lock:
+            changes.append((key, old, new))
+    store.subscribe(None, on_change)
+    store.watch()
+
+    write_externally(store.path, dict(settingsstore.DEFAULTS, theme="dark", silksongpath="/games/ss"))
+    assert wait_for(lambda: len(changes) >= 2)
+    time.sleep(0.2)  # a second reload of the same file must not notify again
+    return sorted(changes)
+
+
+def test_an_outside_edit_notifies_once_per_changed_key(store):
+    changes = watch_and_edit(store)
+
+    assert changes == [("silksongpath", "", "/games/ss"), ("theme", "system", "dark")]
+    assert store.get("theme") == "dark"
+    if sys.platform.startswith("linux"):
+        assert isinstance(store._watcher, settingsstore._InotifyWatcher)
+
+
+def test_polling_is_used_without_inotify(store, monkeypatch):
+    def unavailable(path):
+        raise OSError("inotify is not available")
+    monkeypatch.setattr(settingsstore, "_InotifyWatcher", unavailable)
+
+    changes = watch_and_edit(store)
+
+    assert isinstance(store._watcher, settingsstore._PollingWatcher)
+    assert changes == [("silksongpath", "", "/games/ss"), ("theme", "system", "dark")]
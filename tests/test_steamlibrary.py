@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+import steamlibrary
+from steamlibrary import SteamLibraryScanner, HOLLOW_KNIGHT_APPID, SILKSONG_APPID
+
+
+LIBRARY_FOLDERS = """
+"libraryfolders"
+{{
+    "contentstatsid"    "-1234"
+    "0"
+    {{
+        "path"      "{steam}"
+        "label"     ""
+        "apps"
+        {{
+            "228980"    "0"
+        }}
+    }}
+    "1"
+    {{
+        "path"      "{games}"
+        "apps"
+        {{
+            "367520"    "9000000"
+        }}
+    }}
+}}
+"""
+
+APP_MANIFEST = """
+"AppState"
+{{
+    "appid"     "{appid}"
+    "name"      "{name}"
+    "installdir"    "{installdir}"
+}}
+"""
+
+
+def add_game(library, appid, name, installdir):
+    steamapps = library / "steamapps"
+    (steamapps / "common" / installdir).mkdir(parents=True)
+    (steamapps / f"appmanifest_{appid}.acf").write_text(
+        APP_MANIFEST.format(appid=appid, name=name, installdir=installdir))
+
+
+@pytest.fixture
+def steam(tmp_path):
+    """A Steam install with a second library on another drive holding Hollow Knight"""
+    root, games = tmp_path / "Steam", tmp_path / "Games"
+    (root / "steamapps").mkdir(parents=True)
+    (games / "steamapps").mkdir(parents=True)
+    (root / "steamapps" / "libraryfolders.vdf").write_text(LIBRARY_FOLDERS.format(steam=root, games=games))
+    add_game(games, HOLLOW_KNIGHT_APPID, "Hollow Knight", "Hollow Knight")
+    return root, games
+
+
+def test_finds_games_in_every_library(steam):
+    root, games = steam
+    scanner = SteamLibraryScanner(roots=[str(root)])
+
+    assert scanner.libraries() == [str(root), str(games)]
+    [install] = scanner.find(HOLLOW_KNIGHT_APPID)
+    assert install.name == "Hollow Knight"
+    assert install.path == os.path.join(str(games), "steamapps", "common", "Hollow Knight")
+    assert install.library == str(games)
+    assert scanner.find(SILKSONG_APPID) == []
+
+
+def test_unchanged_files_are_not_parsed_again(steam, monkeypatch):
+    root, games = steam
+    scanner = SteamLibraryScanner(roots=[str(root)])
+    scanner.find(HOLLOW_KNIGHT_APPID)
+
+    loads = []
+    real_load = steamlibrary.vdf.load
+    monkeypatch.setattr(steamlibrary.vdf, "load", lambda f: loads.append(f.name) or real_load(f))
+    scanner.find(HOLLOW_KNIGHT_APPID)
+    assert loads == []
+
+    # A new install rewrites its appmanifest, only that file is parsed again
+    add_game(games, SILKSONG_APPID, "Hollow Knight: Silksong", "Hollow Knight Silksong")
+    assert [i.name for i in scanner.find(SILKSONG_APPID)] == ["Hollow Knight: Silksong"]
+    assert loads == [str(games / "steamapps" / f"appmanifest_{SILKSONG_APPID}.acf")]
+
+
+def test_changed_library_list_is_picked_up(steam):
+    root, games = steam
+    scanner = SteamLibraryScanner(roots=[str(root)])
+    assert len(scanner.find(HOLLOW_KNIGHT_APPID)) == 1
+
+    # The second library was removed in Steam: the cached parse must not be reused
+    (root / "steamapps" / "libraryfolders.vdf").write_text(f'"libraryfolders" {{ "0" {{ "path" "{root}" }} }}')
+    assert scanner.libraries() == [str(root)]
+    assert scanner.find(HOLLOW_KNIGHT_APPID) == []
+
+
+def test_broken_vdf_is_skipped(steam):
+    root, games = steam
+    (root / "steamapps" / "libraryfolders.vdf").write_text('"libraryfolders" { "0" { "path" ')
+    assert SteamLibraryScanner(roots=[str(root)]).libraries() == [str(root)]
@@ -0,0 +1,75 @@
+import json
+import threading
+
+import pytest
+
+import tracing
+from tracing import Tracer, span
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    return tracer
+
+
+def work(label):
+    with span("outer", label=label) as outer:
+        for i in range(3):
+            with span("inner", i=i) as inner:
+                inner.add("bytes", 100)
+            outer.add("bytes", 100)
+        tracing.record("measured", 0.0, 0.0)
+
+
+def run_threads():
+    threads = [threading.Thread(target=work, args=(label,), name=f"worker-{label}") for label in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return threads
+
+
+def test_chrome_trace_nests_spans_per_thread(tracer, tmp_path):
+    path = tmp_path / "trace.json"
+    tracer.enable(trace_path=str(path))
+    run_threads()
+    tracer.disable()
+
+    trace = json.loads(path.read_text())["traceEvents"]
+    names = {event["tid"]: event["args"]["name"] for event in trace if event["name"] == "thread_name"}
+    assert sorted(names.values()) == ["worker-a", "worker-b"]
+
+    spans = [event for event in trace if event["ph"] == "X" and event["name"] != "measured"]
+    assert len(spans) == 8
+    by_id = {event["args"]["id"]: event for event in spans}
+    outers = [event for event in spans if event["name"] == "outer"]
+    assert {names[event["tid"]] for event in outers} == {"worker-a", "worker-b"}
+    for outer in outers:
+        assert outer["args"]["parent"] is None and outer["args"]["bytes"] == 300
+        assert names[outer["tid"]] == f"worker-{outer['args']['label']}"
+    for inner in (event for event in spans if event["name"] == "inner"):
+        outer = by_id[inner["args"]["parent"]]
+        # Begins and ends inside its parent, on the parent's thread
+        assert outer["name"] == "outer" and inner["tid"] == outer["tid"]
+        assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+        assert inner["args"]["bytes"] == 100
+
+    measured = [event for event in trace if event["name"] == "measured"]
+    assert sorted(by_id[event["args"]["parent"]]["tid"] for event in measured) == sorted(names)
+    summary = tracer.summary()["inner"]
+    assert summary["count"] == 6 and summary["bytes"] == 600
+
+
+def test_disabled_tracer_records_nothing(tracer, tmp_path):
+    assert span("anything") is tracing.NULL_SPAN
+    run_threads()
+    assert tracer.events() == []
+
+    tracer.enable()
+    tracer.disable()
+    run_threads()
+    assert tracer.events() == []
+    assert tracing.current() is None